@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Started by run.py in its own process, so the memory it reports belongs to the load balancer alone. The work
+# directory holds the configs/config.json pointing at the stand-in instances.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workdir', required=True)
+    parser.add_argument('--port', type=int, required=True)
+    args = parser.parse_args()
+
+    os.chdir(args.workdir)
+    sys.path.insert(0, SRC)
+
+    import uvicorn
+
+    import main
+    from async_load_balancer import AsyncMinIO
+    from load_balancer import MinIO
+
+    main.minio_instance = AsyncMinIO(MinIO())
+
+    uvicorn.run(main.app, host='127.0.0.1', port=args.port, log_level='warning')
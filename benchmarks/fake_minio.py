@@ -0,0 +1,357 @@
+import bisect
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+S3_NS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
+
+class StoredObject:
+
+    def __init__(self, data: bytes, content_type: str, tags: Dict[str, str], metadata: Dict[str, str]):
+        self.data = data
+        self.content_type = content_type
+        self.tags = tags
+        self.metadata = metadata
+        self.etag = hashlib.md5(data).hexdigest()
+        self.last_modified = time.time()
+
+
+class Bucket:
+
+    def __init__(self):
+        self.objects: Dict[str, StoredObject] = {}
+        self.keys: List[str] = []
+
+    def put(self, key: str, obj: StoredObject):
+        if key not in self.objects:
+            bisect.insort(self.keys, key)
+        self.objects[key] = obj
+
+    def delete(self, key: str):
+        if self.objects.pop(key, None) is not None:
+            self.keys.pop(bisect.bisect_left(self.keys, key))
+
+
+class FakeMinIO:
+    # A single process stand-in for a Minio instance: the S3 calls the balancer makes, the health check, and a
+    # cluster metrics page reporting `capacity` bytes. Requests are not authenticated.
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, capacity: int = 1024 ** 4, latency: float = 0.0):
+        self.buckets: Dict[str, Bucket] = {}
+        self.uploads: Dict[str, Tuple[str, str, Dict[int, bytes], Dict[str, str]]] = {}
+        self.capacity = capacity
+        self.latency = latency
+        self.requests = 0
+        self.listens = 0
+        self.dropped = 0
+        # Called with the method, path and query of every S3 request, a (status, code) it returns is answered as an
+        # error instead. The health check and the metrics page are not affected.
+        self.fault: Callable[[str, str, Dict[str, str]], Tuple[int, str] | None] | None = None
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.server = ThreadingHTTPServer((host, port), self.__handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_bucket(self, bucket: str):
+        with self.lock:
+            self.buckets.setdefault(bucket, Bucket())
+
+    def put(self, bucket: str, key: str, data: bytes, content_type: str = 'application/octet-stream',
+            tags: Dict[str, str] | None = None, metadata: Dict[str, str] | None = None):
+        with self.lock:
+            self.buckets.setdefault(bucket, Bucket()).put(key, StoredObject(data, content_type, tags or {},
+                                                                            metadata or {}))
+
+    def drop_listeners(self):
+        # Ends the open notification streams the way a restarting instance would.
+        with self.lock:
+            self.dropped += 1
+
+    def used(self) -> int:
+        with self.lock:
+            return sum(len(obj.data) for bucket in self.buckets.values() for obj in bucket.objects.values())
+
+    def __handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, with Nagle's algorithm every response would wait for an ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                fake.handle(self, 'GET')
+
+            def do_HEAD(self):
+                fake.handle(self, 'HEAD')
+
+            def do_PUT(self):
+                fake.handle(self, 'PUT')
+
+            def do_POST(self):
+                fake.handle(self, 'POST')
+
+            def do_DELETE(self):
+                fake.handle(self, 'DELETE')
+
+        return Handler
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        with self.lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        url = urlsplit(request.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length > 0 else b''
+
+        if url.path == '/minio/health/live':
+            return self.__send(request, 200)
+        if url.path == '/minio/v2/metrics/cluster':
+            return self.__send(request, 200, self.__metrics().encode(), {'Content-Type': 'text/plain'})
+
+        fault = None if self.fault is None else self.fault(method, unquote(url.path), query)
+        if fault is not None:
+            return self.__error(request, fault[0], fault[1], url.path)
+
+        bucket_name, _, key = unquote(url.path.lstrip('/')).partition('/')
+        with self.lock:
+            if bucket_name == '':
+                return self.__list_buckets(request)
+            if method == 'PUT' and key == '':
+                self.buckets.setdefault(bucket_name, Bucket())
+                return self.__send(request, 200)
+            bucket = self.buckets.get(bucket_name)
+            if bucket is None:
+                return self.__error(request, 404, 'NoSuchBucket', bucket_name)
+
+            if key == '':
+                if 'location' in query:
+                    return self.__xml(request, f'<LocationConstraint xmlns="{S3_NS}"></LocationConstraint>')
+                if 'events' in query:
+                    return self.__listen(request)
+                if method == 'HEAD':
+                    return self.__send(request, 200)
+                return self.__list_objects(request, bucket_name, bucket, query)
+
+            if method == 'POST' and 'uploads' in query:
+                upload_id = uuid.uuid4().hex
+                self.uploads[upload_id] = (bucket_name, key, {}, dict(request.headers))
+                return self.__xml(request, f'<InitiateMultipartUploadResult xmlns="{S3_NS}"><Bucket>'
+                                           f'{escape(bucket_name)}</Bucket><Key>{escape(key)}</Key><UploadId>'
+                                           f'{upload_id}</UploadId></InitiateMultipartUploadResult>')
+            if 'uploadId' in query:
+                return self.__multipart(request, method, bucket, query, body)
+            if method == 'PUT':
+                return self.__put(request, bucket, key, body)
+            if method == 'DELETE':
+                bucket.delete(key)
+                return self.__send(request, 204)
+
+            obj = bucket.objects.get(key)
+            if obj is None:
+                return self.__error(request, 404, 'NoSuchKey', key)
+            if 'tagging' in query:
+                tags = ''.join(f'<Tag><Key>{escape(k)}</Key><Value>{escape(v)}</Value></Tag>'
+                               for k, v in obj.tags.items())
+                return self.__xml(request, f'<Tagging xmlns="{S3_NS}"><TagSet>{tags}</TagSet></Tagging>')
+            return self.__get(request, method, obj)
+
+    def __put(self, request: BaseHTTPRequestHandler, bucket: Bucket, key: str, body: bytes):
+        source = request.headers.get('x-amz-copy-source')
+        if source is not None:
+            source_bucket, _, source_key = unquote(source.lstrip('/')).partition('/')
+            source_obj = self.buckets.get(source_bucket, Bucket()).objects.get(source_key)
+            if source_obj is None:
+                return self.__error(request, 404, 'NoSuchKey', source_key)
+            obj = StoredObject(source_obj.data, source_obj.content_type, dict(source_obj.tags),
+                               dict(source_obj.metadata))
+            bucket.put(key, obj)
+            return self.__xml(request, f'<CopyObjectResult xmlns="{S3_NS}"><ETag>"{obj.etag}"</ETag><LastModified>'
+                                       f'{_iso(obj.last_modified)}</LastModified></CopyObjectResult>')
+
+        obj = self.__new_object(body, request.headers)
+        bucket.put(key, obj)
+        return self.__send(request, 200, headers={'ETag': f'"{obj.etag}"'})
+
+    def __multipart(self, request: BaseHTTPRequestHandler, method: str, bucket: Bucket, query: Dict[str, str],
+                    body: bytes):
+        upload = self.uploads.get(query['uploadId'])
+        if upload is None:
+            return self.__error(request, 404, 'NoSuchUpload', query['uploadId'])
+        bucket_name, key, parts, headers = upload
+
+        if method == 'PUT':
+            parts[int(query['partNumber'])] = body
+            return self.__send(request, 200, headers={'ETag': f'"{hashlib.md5(body).hexdigest()}"'})
+        if method == 'DELETE':
+            del self.uploads[query['uploadId']]
+            return self.__send(request, 204)
+
+        numbers = [int(e.text) for e in ElementTree.fromstring(body).iter() if e.tag.endswith('PartNumber')]
+        obj = self.__new_object(b''.join(parts[n] for n in numbers), headers)
+        bucket.put(key, obj)
+        del self.uploads[query['uploadId']]
+        return self.__xml(request, f'<CompleteMultipartUploadResult xmlns="{S3_NS}"><Location></Location><Bucket>'
+                                   f'{escape(bucket_name)}</Bucket><Key>{escape(key)}</Key><ETag>"{obj.etag}"</ETag>'
+                                   f'</CompleteMultipartUploadResult>')
+
+    @staticmethod
+    def __new_object(data: bytes, headers) -> StoredObject:
+        tags = {k: v[-1] for k, v in parse_qs(headers.get('x-amz-tagging', '')).items()}
+        metadata = {k[len('x-amz-meta-'):]: v for k, v in headers.items() if k.lower().startswith('x-amz-meta-')}
+        return StoredObject(data, headers.get('Content-Type', 'application/octet-stream'), tags, metadata)
+
+    def __get(self, request: BaseHTTPRequestHandler, method: str, obj: StoredObject):
+        headers = {
+            'Content-Type': obj.content_type,
+            'ETag': f'"{obj.etag}"',
+            'Last-Modified': formatdate(obj.last_modified, usegmt=True),
+            'Accept-Ranges': 'bytes'
+        }
+        headers.update({f'X-Amz-Meta-{k}': v for k, v in obj.metadata.items()})
+        if len(obj.tags) > 0:
+            headers['x-amz-tagging-count'] = str(len(obj.tags))
+
+        data = obj.data
+        status = 200
+        byte_range = request.headers.get('Range')
+        if byte_range is not None and byte_range.startswith('bytes='):
+            first, _, last = byte_range[len('bytes='):].partition('-')
+            start = int(first) if first else max(len(data) - int(last), 0)
+            end = int(last) if first and last else len(data) - 1
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+            data = data[start:end + 1]
+            status = 206
+
+        if method == 'HEAD':
+            headers['Content-Length'] = str(len(data))
+            return self.__send(request, status, None, headers)
+        return self.__send(request, status, data, headers)
+
+    def __list_buckets(self, request: BaseHTTPRequestHandler):
+        buckets = ''.join(f'<Bucket><Name>{escape(name)}</Name><CreationDate>2024-01-01T00:00:00.000Z</CreationDate>'
+                          f'</Bucket>' for name in sorted(self.buckets))
+        return self.__xml(request, f'<ListAllMyBucketsResult xmlns="{S3_NS}"><Owner><ID>fake</ID><DisplayName>fake'
+                                   f'</DisplayName></Owner><Buckets>{buckets}</Buckets></ListAllMyBucketsResult>')
+
+    def __list_objects(self, request: BaseHTTPRequestHandler, bucket_name: str, bucket: Bucket,
+                       query: Dict[str, str]):
+        prefix = query.get('prefix', '')
+        max_keys = int(query.get('max-keys') or 1000)
+        after = query.get('continuation-token') or query.get('start-after') or ''
+        include_metadata = query.get('metadata') == 'true'
+
+        start = bisect.bisect_right(bucket.keys, after) if after else bisect.bisect_left(bucket.keys, prefix)
+        keys = []
+        for key in bucket.keys[start:]:
+            if not key.startswith(prefix):
+                if key > prefix:
+                    break
+                continue
+            keys.append(key)
+            if len(keys) > max_keys:
+                break
+
+        truncated = len(keys) > max_keys
+        keys = keys[:max_keys]
+        contents = []
+        for key in keys:
+            obj = bucket.objects[key]
+            metadata = f'<UserMetadata><content-type>{escape(obj.content_type)}</content-type></UserMetadata>' \
+                if include_metadata else ''
+            contents.append(f'<Contents><Key>{escape(key)}</Key><LastModified>{_iso(obj.last_modified)}'
+                            f'</LastModified><ETag>"{obj.etag}"</ETag><Size>{len(obj.data)}</Size><StorageClass>'
+                            f'STANDARD</StorageClass>{metadata}</Contents>')
+        token = f'<NextContinuationToken>{escape(keys[-1])}</NextContinuationToken>' if truncated else ''
+        return self.__xml(request, f'<ListBucketResult xmlns="{S3_NS}"><Name>{escape(bucket_name)}</Name><Prefix>'
+                                   f'{escape(prefix)}</Prefix><KeyCount>{len(keys)}</KeyCount><MaxKeys>{max_keys}'
+                                   f'</MaxKeys><IsTruncated>{str(truncated).lower()}</IsTruncated>{token}'
+                                   f'{"".join(contents)}</ListBucketResult>')
+
+    def __listen(self, request: BaseHTTPRequestHandler):
+        # Keep the notification stream open with blank lines, an empty stream would make the client reconnect
+        # in a loop. The lock is released while the stream is held.
+        self.listens += 1
+        dropped = self.dropped
+        self.lock.release()
+        try:
+            request.send_response(200)
+            request.send_header('Transfer-Encoding', 'chunked')
+            request.end_headers()
+            waited = 0.0
+            while not self.stopped.wait(0.05) and self.dropped == dropped:
+                waited += 0.05
+                if waited >= 1:
+                    waited = 0.0
+                    request.wfile.write(b'1\r\n\n\r\n')
+                    request.wfile.flush()
+            if self.dropped != dropped:
+                request.wfile.write(b'0\r\n\r\n')
+                request.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.lock.acquire()
+        request.close_connection = True
+
+    def __metrics(self) -> str:
+        used = self.used()
+        return (f'minio_cluster_capacity_usable_total_bytes{{server="{self.url}"}} {self.capacity}\n'
+                f'minio_cluster_capacity_usable_free_bytes{{server="{self.url}"}} {max(self.capacity - used, 0)}\n'
+                f'minio_cluster_drive_online_total{{server="{self.url}"}} 1\n'
+                f'minio_cluster_drive_offline_total{{server="{self.url}"}} 0\n'
+                f'minio_s3_requests_total{{server="{self.url}",api="all"}} {self.requests}\n')
+
+    def __xml(self, request: BaseHTTPRequestHandler, xml: str):
+        return self.__send(request, 200, ('<?xml version="1.0" encoding="UTF-8"?>' + xml).encode(),
+                           {'Content-Type': 'application/xml'})
+
+    def __error(self, request: BaseHTTPRequestHandler, status: int, code: str, resource: str):
+        return self.__send(request, status, (f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code>'
+                                             f'<Message>{code}</Message><Resource>{escape(resource)}</Resource>'
+                                             f'<RequestId>fake</RequestId><HostId>fake</HostId></Error>').encode(),
+                           {'Content-Type': 'application/xml'})
+
+    @staticmethod
+    def __send(request: BaseHTTPRequestHandler, status: int, body: bytes | None = b'',
+               headers: Dict[str, str] | None = None):
+        request.send_response(status)
+        for k, v in (headers or {}).items():
+            request.send_header(k, v)
+        if body is not None:
+            request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if body:
+            request.wfile.write(body)
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(timestamp))
@@ -0,0 +1,277 @@
+import argparse
+import base64
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import requests
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from fake_minio import FakeMinIO
+
+EXTENSIONS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'jsonld': 'application/ld+json',
+    'parquet': 'application/octet-stream'
+}
+BUCKETS = ('dataspace', 'archive', 'raw')
+WORKLOADS = ('search_by_tags', 'search_by_extension', 'search_by_content_type', 'search', 'get_all_objects',
+             'get_all_objects_page', 'get_all_objects_with_details', 'get_dataset', 'upload_object')
+
+
+def populate(fakes: List[FakeMinIO], objects: int, tag_keys: int, tag_values: int, tags_per_object: int,
+             object_size: int, rng: random.Random) -> Dict[str, List[str]]:
+    names = {}
+    for fake in fakes:
+        for bucket in BUCKETS:
+            fake.make_bucket(bucket)
+        names[fake.url] = []
+        for i in range(objects):
+            extension = list(EXTENSIONS)[i % len(EXTENSIONS)]
+            name = f'object-{i:07d}.{extension}'
+            tags = {f'key{rng.randrange(tag_keys)}': f'value{rng.randrange(tag_values)}'
+                    for _ in range(tags_per_object)}
+            fake.put(BUCKETS[i % len(BUCKETS)], f'{i % 100:02d}/{name}', rng.randbytes(object_size),
+                     EXTENSIONS[extension], tags, {'MetaAccess': 'public', 'MetaUploadDate': '2024-01-01'})
+            names[fake.url].append(name)
+    return names
+
+
+def write_config(workdir: str, fakes: List[FakeMinIO]):
+    os.makedirs(os.path.join(workdir, 'configs'), exist_ok=True)
+    secret = base64.b64encode(b'benchmark').decode('utf-8')
+    config = [{'site': fake.url, 'token': 'benchmark', 'alias': f'minio{i + 1}', 'access_key': secret,
+               'secret_key': secret} for i, fake in enumerate(fakes)]
+    with open(os.path.join(workdir, 'configs', 'config.json'), 'w') as json_out:
+        json_out.write(json.dumps(config, indent=4))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, expected: int, timeout: float):
+    # The balancer is ready once the health checks let every instance through and the catalog holds all objects.
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'The load balancer exited with code {process.returncode}')
+        try:
+            response = requests.get(f'{url}/get_all_objects', timeout=5)
+            if response.status_code == 200 and \
+                    sum(len(paths) for entry in response.json() for paths in entry.values()) >= expected:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError('The load balancer did not become ready in time')
+
+
+def memory(pid: int) -> Dict[str, int]:
+    # Resident and peak resident set size in KiB of the running load balancer, from /proc or else from psutil.
+    try:
+        with open(f'/proc/{pid}/status') as status_in:
+            fields = dict(line.split(':', 1) for line in status_in if ':' in line)
+        return {'rss_kib': int(fields['VmRSS'].split()[0]), 'peak_rss_kib': int(fields['VmHWM'].split()[0])}
+    except (OSError, KeyError):
+        pass
+    if psutil is not None:
+        try:
+            info = psutil.Process(pid).memory_info()
+            peak = getattr(info, 'peak_wset', None)
+            return {'rss_kib': info.rss // 1024, 'peak_rss_kib': peak // 1024 if peak is not None else None}
+        except psutil.Error:
+            pass
+    return {'rss_kib': None, 'peak_rss_kib': None}
+
+
+def exited_peak_memory() -> int:
+    # Peak resident set size in KiB of the children that were waited for, only meaningful once the load balancer
+    # exited, ru_maxrss is in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def workloads(url: str, names: Dict[str, List[str]], args: argparse.Namespace) \
+        -> Dict[str, Callable[[requests.Session, random.Random], requests.Response]]:
+    sites = list(names)
+
+    def tag(rng: random.Random) -> Dict[str, str]:
+        return {f'key{rng.randrange(args.tag_keys)}': f'value{rng.randrange(args.tag_values)}'}
+
+    def upload(session: requests.Session, rng: random.Random) -> requests.Response:
+        return session.put(f'{url}/upload_object', files={
+            'file': (f'upload-{rng.getrandbits(64):016x}.csv', rng.randbytes(args.upload_size), 'text/csv')
+        }, data={'tags': json.dumps(tag(rng))})
+
+    def dataset(session: requests.Session, rng: random.Random) -> requests.Response:
+        site = rng.choice(sites)
+        return session.post(f'{url}/get_dataset', json={'url': site, 'name': rng.choice(names[site])})
+
+    return {
+        'search_by_tags': lambda s, rng: s.post(f'{url}/search_by_tags', json={'tags': tag(rng)}),
+        'search_by_extension': lambda s, rng: s.post(f'{url}/search_by_extension',
+                                                     json={'extension': rng.choice(list(EXTENSIONS))}),
+        'search_by_content_type': lambda s, rng: s.post(f'{url}/search_by_content_type',
+                                                        json={'content_type': rng.choice(list(EXTENSIONS.values()))}),
+        'search': lambda s, rng: s.post(f'{url}/search', json={'filter': {'and': [
+            {'tags': tag(rng)}, {'extension': rng.choice(list(EXTENSIONS))}]}}),
+        'get_all_objects': lambda s, rng: s.get(f'{url}/get_all_objects'),
+        'get_all_objects_page': lambda s, rng: s.get(f'{url}/get_all_objects', params={'limit': args.page_size}),
+        'get_all_objects_with_details': lambda s, rng: s.get(f'{url}/get_all_objects_with_details',
+                                                             params={'limit': args.page_size}),
+        'get_dataset': dataset,
+        'upload_object': upload
+    }
+
+
+def drive(request: Callable[[requests.Session, random.Random], requests.Response], concurrency: int, total: int,
+          duration: float | None, seed: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    issued = [0]
+    lock = threading.Lock()
+    local = threading.local()
+    stop_at = None if duration is None else time.monotonic() + duration
+
+    def next_request() -> bool:
+        with lock:
+            if stop_at is None and issued[0] >= total:
+                return False
+            issued[0] += 1
+        return stop_at is None or time.monotonic() < stop_at
+
+    def worker(index: int):
+        local.session = requests.Session()
+        rng = random.Random(seed + index)
+        while next_request():
+            start = time.perf_counter()
+            try:
+                ok = request(local.session, rng).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / wall if wall > 0 else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0
+    }
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the load balancer against local stand-in Minio instances.')
+    parser.add_argument('--sites', type=int, default=3, help='number of stand-in instances')
+    parser.add_argument('--objects', type=int, default=10000, help='objects stored on every instance')
+    parser.add_argument('--tag-keys', type=int, default=10, help='distinct tag keys')
+    parser.add_argument('--tag-values', type=int, default=100, help='distinct values of every tag key')
+    parser.add_argument('--tags-per-object', type=int, default=2)
+    parser.add_argument('--object-size', type=int, default=256, help='bytes of every stored object')
+    parser.add_argument('--upload-size', type=int, default=64 * 1024, help='bytes of every uploaded file')
+    parser.add_argument('--site-latency', type=float, default=0.0, help='seconds added to every instance request')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='requests per workload')
+    parser.add_argument('--duration', type=float, default=None, help='seconds per workload, overrides --requests')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help='comma separated, from ' + ', '.join(WORKLOADS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    selected = [w.strip() for w in args.workloads.split(',') if w.strip()]
+    unknown = [w for w in selected if w not in WORKLOADS]
+    if unknown:
+        parser.error(f'unknown workloads: {", ".join(unknown)}')
+
+    rng = random.Random(args.seed)
+    fakes = [FakeMinIO(latency=args.site_latency) for _ in range(args.sites)]
+    for fake in fakes:
+        fake.start()
+    names = populate(fakes, args.objects, args.tag_keys, args.tag_values, args.tags_per_object, args.object_size,
+                     rng)
+
+    workdir = tempfile.mkdtemp(prefix='balancer-benchmark-')
+    write_config(workdir, fakes)
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = {**os.environ, 'HEALTH_INTERVAL': os.environ.get('HEALTH_INTERVAL', '1'),
+           'HEALTH_SUCCESS_THRESHOLD': os.environ.get('HEALTH_SUCCESS_THRESHOLD', '1')}
+    process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             'balancer.py'),
+                                '--workdir', workdir, '--port', str(port)], env=env)
+
+    results = {}
+    try:
+        wait_ready(url, process, args.sites * args.objects, 120)
+        results['startup'] = memory(process.pid)
+        requests_by_workload = workloads(url, names, args)
+        for workload in selected:
+            result = drive(requests_by_workload[workload], args.concurrency, args.requests, args.duration, args.seed)
+            result.update(memory(process.pid))
+            results[workload] = result
+            if not args.json:
+                print(f'{workload:<30} {result["requests"]:>7} req {result["rps"]:>9.1f} rps  '
+                      f'p50 {result["p50_ms"]:>8.1f} ms  p95 {result["p95_ms"]:>8.1f} ms  '
+                      f'p99 {result["p99_ms"]:>8.1f} ms  errors {result["errors"]:>5}  '
+                      f'rss {result["rss_kib"] or 0:>8} KiB', flush=True)
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        results['exit'] = {'peak_rss_kib': exited_peak_memory()}
+        for fake in fakes:
+            fake.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        # Without /proc or psutil only the peak of the exited load balancer is known.
+        peak = results.get(selected[-1], results.get('startup', {})).get('peak_rss_kib')
+        peak = peak if peak is not None else results['exit']['peak_rss_kib']
+        print(f'peak rss {peak} KiB, '
+              f'rss after startup {results.get("startup", {}).get("rss_kib")} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import asyncio
+import functools
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Tuple
+
+import fastapi
+from minio.datatypes import Object
+
+import metrics
+import settings
+from pools import WorkerPool
+
+
+class AsyncMinIO:
+
+    def __init__(self, minio):
+        self.minio = minio
+        self.executor = WorkerPool('requests', settings.REQUEST_EXECUTOR_WORKERS)
+
+    async def __run(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def __iterate(self, iterator: Iterator) -> AsyncIterator:
+        try:
+            while True:
+                item = await self.__run(next, iterator, StopIteration)
+                if item is StopIteration:
+                    break
+                yield item
+        finally:
+            await self.__run(iterator.close)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {'requests': self.executor.stats(), **self.minio.pool_stats()}
+
+    def site_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.minio.site_stats()
+
+    def render_metrics(self) -> str:
+        pool = self.executor.stats()
+        metrics.POOL_SIZE.set(pool['size'], pool='requests')
+        metrics.POOL_QUEUED.set(pool['queued'], pool='requests')
+        metrics.POOL_ACTIVE.set(pool['active'], pool='requests')
+        metrics.POOL_COMPLETED.sample(pool['completed'], pool='requests')
+        return self.minio.render_metrics()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.minio.cache_stats()
+
+    def rebalance(self) -> Dict[str, Any]:
+        return self.minio.rebalance()
+
+    def rebalance_stats(self) -> Dict[str, Any]:
+        return self.minio.rebalance_stats()
+
+    async def add_instances(self, sites: List[Dict[str, str]]) -> List[str]:
+        return await self.__run(self.minio.add_instances, sites)
+
+    async def search_by_tags(self, tags: Dict[str, str]) -> List[Dict[str, List[str]]]:
+        return await self.__run(self.minio.search_by_tags, tags)
+
+    async def search_by_file_extension(self, extension: str) -> List[Dict[str, List[str]]]:
+        return await self.__run(self.minio.search_by_file_extension, extension)
+
+    async def search_by_content_type(self, content_type: str) -> List[Dict[str, List[str]]]:
+        return await self.__run(self.minio.search_by_content_type, content_type)
+
+    async def search(self, query: Dict[str, Any]) -> List[Dict[str, List[str]]]:
+        return await self.__run(self.minio.search, query)
+
+    async def search_live(self, query: Dict[str, Any]) \
+            -> (List[Dict[str, List[str]]], Dict[str, Dict[str, Any]]):
+        return await self.__run(self.minio.search_live, query)
+
+    async def get_all_objects(self) -> List[Dict[str, List[str]]]:
+        return await self.__run(self.minio.get_all_objects)
+
+    async def list_objects_page(self, limit: int, continuation_token: str | None = None) \
+            -> (List[Dict[str, str]], str | None):
+        return await self.__run(self.minio.list_objects_page, limit, continuation_token)
+
+    def stream_by_tags(self, tags: Dict[str, str]) -> AsyncIterator[Dict[str, List[str]]]:
+        return self.__iterate(self.minio.stream_by_tags(tags))
+
+    def stream_by_file_extension(self, extension: str) -> AsyncIterator[Dict[str, List[str]]]:
+        return self.__iterate(self.minio.stream_by_file_extension(extension))
+
+    def stream_by_content_type(self, content_type: str) -> AsyncIterator[Dict[str, List[str]]]:
+        return self.__iterate(self.minio.stream_by_content_type(content_type))
+
+    def stream_all_objects(self) -> AsyncIterator[Dict[str, List[str]]]:
+        return self.__iterate(self.minio.stream_all_objects())
+
+    async def put_object(self, file: (BinaryIO, str), file_size: int | None, tags: Dict[str, str]) -> (str, str):
+        return await self.__run(self.minio.put_object, file, file_size, tags)
+
+    async def upload_object(self, file: fastapi.UploadFile, tags: Dict[str, str]) -> (str, str):
+        return await self.__run(self.minio.upload_object, file, tags)
+
+    async def get_dataset(self, url: str, name: str) -> str:
+        return await self.__run(self.minio.get_dataset, url, name)
+
+    async def stat_dataset(self, url: str, name: str) -> Object | None:
+        return await self.__run(self.minio.stat_dataset, url, name)
+
+    def download_dataset(self, url: str, name: str, offset: int = 0, length: int = 0) -> AsyncIterator[bytes]:
+        return self.__iterate(self.minio.download_dataset(url, name, offset, length))
+
+    async def get_dataset_tags(self, url: str, name: str) -> Dict[str, str] | str:
+        return await self.__run(self.minio.get_dataset_tags, url, name)
+
+    async def get_dataset_metadata(self, url: str, name: str) -> Dict[str, str] | str:
+        return await self.__run(self.minio.get_dataset_metadata, url, name)
+
+    async def get_datasets_details(self, datasets: List[Tuple[str, str]]) \
+            -> (List[Dict[str, Any] | None], Dict[int, str], Dict[str, Dict[str, Any]]):
+        return await self.__run(self.minio.get_datasets_details, datasets)
+
+    def stream_datasets_details(self, datasets: List[Tuple[str, str]]) \
+            -> AsyncIterator[Tuple[Tuple[str, str], Dict[str, Any] | None, str | None]]:
+        return self.__iterate(self.minio.stream_datasets_details(datasets))
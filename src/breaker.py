@@ -0,0 +1,151 @@
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from minio.error import S3Error
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Error codes that mean the instance itself is in trouble, any other S3 error is an answer about the object.
+SERVER_ERRORS = ('InternalError', 'ServiceUnavailable', 'SlowDown', 'XMinioServerNotInitialized',
+                 'XMinioStorageFull', 'XMinioReadQuorum', 'XMinioWriteQuorum')
+
+
+def is_site_failure(error: BaseException) -> bool:
+    if isinstance(error, S3Error):
+        return error.code in SERVER_ERRORS
+    return isinstance(error, Exception)
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int, open_interval: float, latency_alpha: float, outlier_factor: float,
+                 outlier_min_latency: float, outlier_min_samples: int, max_ejected: float):
+        self.failure_threshold = failure_threshold
+        self.open_interval = open_interval
+        self.latency_alpha = latency_alpha
+        self.outlier_factor = outlier_factor
+        self.outlier_min_latency = outlier_min_latency
+        self.outlier_min_samples = outlier_min_samples
+        self.max_ejected = max_ejected
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def allows(self, site: str, trial: bool = False) -> bool:
+        # A half open site only takes one trial request at a time, and only from callers that report its outcome.
+        now = time.monotonic()
+        with self.lock:
+            state = self.__site(site)
+            if state['state'] == OPEN and now >= state['opened_at'] + self.open_interval:
+                state['state'] = HALF_OPEN
+                state['trial_at'] = None
+            if state['state'] == CLOSED:
+                return True
+            if state['state'] == OPEN or not trial:
+                return False
+            if state['trial_at'] is not None and now < state['trial_at'] + self.open_interval:
+                return False
+            state['trial_at'] = now
+            return True
+
+    def record(self, site: str, success: bool, latency: float | None = None):
+        now = time.monotonic()
+        with self.lock:
+            state = self.__site(site)
+            if success:
+                state['failures'] = 0
+                if state['state'] == HALF_OPEN:
+                    self.__close(state, latency)
+                    return
+            else:
+                state['failures'] += 1
+                if state['state'] == HALF_OPEN or (
+                        state['state'] == CLOSED and state['failures'] >= self.failure_threshold):
+                    self.__open(state, now, 'failures')
+                return
+
+            if latency is not None and state['state'] == CLOSED:
+                state['latency'] = latency if state['latency'] is None else \
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * state['latency']
+                state['samples'] += 1
+                self.__eject_outliers(now)
+
+    def probed(self, site: str, alive: bool) -> bool:
+        # A health check that passes once the open interval is over only makes the site half open, whether it closes
+        # is left to a trial request. Returns whether the site is half open.
+        now = time.monotonic()
+        with self.lock:
+            state = self.sites.get(site)
+            if not alive or state is None or state['state'] == CLOSED:
+                return False
+            if state['state'] == OPEN and now >= state['opened_at'] + self.open_interval:
+                state['state'] = HALF_OPEN
+                state['trial_at'] = None
+            return state['state'] == HALF_OPEN
+
+    @contextmanager
+    def track(self, site: str, measure_latency: bool = True) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.record(site, not is_site_failure(e), time.monotonic() - start if measure_latency else None)
+            raise
+        self.record(site, True, time.monotonic() - start if measure_latency else None)
+
+    def latency(self, site: str) -> float | None:
+        with self.lock:
+            state = self.sites.get(site)
+            return None if state is None else state['latency']
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {
+                site: {
+                    'state': state['state'],
+                    'reason': state['reason'],
+                    'failures': state['failures'],
+                    'latency_ms': None if state['latency'] is None else round(state['latency'] * 1000, 1),
+                    'samples': state['samples']
+                }
+                for site, state in self.sites.items()
+            }
+
+    def __site(self, site: str) -> Dict[str, Any]:
+        if site not in self.sites:
+            self.sites[site] = {'state': CLOSED, 'reason': None, 'failures': 0, 'latency': None, 'samples': 0,
+                                'opened_at': 0.0, 'trial_at': None}
+        return self.sites[site]
+
+    def __open(self, state: Dict[str, Any], now: float, reason: str):
+        state['state'] = OPEN
+        state['reason'] = reason
+        state['opened_at'] = now
+        state['trial_at'] = None
+
+    def __close(self, state: Dict[str, Any], latency: float | None):
+        state['state'] = CLOSED
+        state['reason'] = None
+        # Start the latency history over, otherwise an ejected site would be ejected again right away.
+        state['latency'] = latency
+        state['samples'] = 0 if latency is None else 1
+
+    def __eject_outliers(self, now: float):
+        measured = {site: state for site, state in self.sites.items()
+                    if state['state'] == CLOSED and state['samples'] >= self.outlier_min_samples}
+        if len(measured) < 2:
+            return
+
+        median = statistics.median(state['latency'] for state in measured.values())
+        ejected = sum(1 for state in self.sites.values() if state['state'] != CLOSED)
+        for state in sorted(measured.values(), key=lambda s: s['latency'], reverse=True):
+            if state['latency'] < max(self.outlier_factor * median, self.outlier_min_latency):
+                break
+            if ejected + 1 > self.max_ejected * len(self.sites):
+                break
+            self.__open(state, now, 'latency')
+            ejected += 1
@@ -0,0 +1,98 @@
+import functools
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+import requests
+
+import settings
+from metrics import HTTP_CALLS
+from pools import HttpPools, WorkerPool
+from prometheus import SiteMetrics, aggregate, parse
+from scatter import OK, gather
+import tracing
+
+
+class CapacityMonitor:
+
+    def __init__(self, tokens: Dict[str, str], workers: WorkerPool, http_pools: HttpPools):
+        self.tokens = tokens
+        self.site_metrics: Dict[str, Tuple[SiteMetrics, float]] = {}
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.http_pools = http_pools
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__run, name='capacity-monitor', daemon=True)
+
+    def add(self, sites: Iterable[str]):
+        self.__scrape(list(sites))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def free(self, sites: Iterable[str]) -> Dict[str, float]:
+        return {
+            site: metrics.free_bytes
+            for site, metrics in self.metrics(sites).items()
+            if metrics.free_bytes is not None
+        }
+
+    def metrics(self, sites: Iterable[str], newer_than: float = 0.0) -> Dict[str, SiteMetrics]:
+        sites = list(sites)
+        now = time.monotonic()
+        with self.lock:
+            stale = [site for site in sites
+                     if site not in self.site_metrics or now - self.site_metrics[site][1] > settings.CAPACITY_TTL
+                     or self.site_metrics[site][1] < newer_than]
+        if len(stale) > 0:
+            self.__scrape(stale)
+
+        with self.lock:
+            return {site: self.site_metrics[site][0] for site in sites if site in self.site_metrics}
+
+    def cached(self) -> Dict[str, SiteMetrics]:
+        with self.lock:
+            return {site: metrics for site, (metrics, _) in self.site_metrics.items()}
+
+    def __run(self):
+        while not self.stopped.wait(settings.CAPACITY_INTERVAL):
+            self.__scrape(list(self.tokens.keys()))
+
+    def __scrape(self, sites: Iterable[str]):
+        outcomes = gather(self.workers, {site: functools.partial(self.__get_metrics, site) for site in sites},
+                          settings.CAPACITY_TIMEOUT)
+
+        for site, outcome in outcomes.items():
+            metrics = outcome.value if outcome.status == OK else None
+            now = time.monotonic()
+            with self.lock:
+                if metrics is None:
+                    self.site_metrics.pop(site, None)
+                    continue
+                if site in self.site_metrics:
+                    previous, scraped_at = self.site_metrics[site]
+                    if now > scraped_at and metrics.requests_total >= previous.requests_total:
+                        metrics.requests_rate = (metrics.requests_total - previous.requests_total) / (now - scraped_at)
+                self.site_metrics[site] = (metrics, now)
+
+    def __get_metrics(self, site: str) -> SiteMetrics | None:
+        headers = {'Authorization': f'Bearer {self.tokens[site]}'}
+        with tracing.span('metrics_scrape', site=site):
+            return self.__scrape_site(site, headers)
+
+    def __scrape_site(self, site: str, headers: Dict[str, str]) -> SiteMetrics | None:
+        try:
+            with self.http_pools.session(site).get(f'{site}/minio/v2/metrics/cluster', headers=headers, stream=True,
+                                                   timeout=settings.CAPACITY_TIMEOUT) as response:
+                if response.status_code != 200:
+                    HTTP_CALLS.inc(site=site, call='metrics', outcome=str(response.status_code))
+                    return None
+                response.encoding = 'utf-8'
+                HTTP_CALLS.inc(site=site, call='metrics', outcome=str(response.status_code))
+                return aggregate(parse(response.iter_lines(decode_unicode=True)))
+        except requests.RequestException:
+            HTTP_CALLS.inc(site=site, call='metrics', outcome='error')
+            return None
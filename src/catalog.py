@@ -0,0 +1,210 @@
+import fnmatch
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+class Catalog:
+
+    def __init__(self, path: str = ''):
+        self.lock = threading.RLock()
+        self.entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.sites: Dict[str, Set[str]] = {}
+        self.tag_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self.extension_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self.content_type_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self.name_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self.path_index: Dict[str, Set[str]] = {}
+        self.placements: Dict[str, List[str]] = {}
+        self.moves: Dict[str, Set[str]] = {}
+        self.db = None
+
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS objects ('
+                            'site TEXT NOT NULL, path TEXT NOT NULL, size INTEGER, content_type TEXT, '
+                            'last_modified TEXT, tags TEXT, PRIMARY KEY (site, path))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS placements (path TEXT PRIMARY KEY, sites TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS moves (site TEXT NOT NULL, path TEXT NOT NULL, '
+                            'PRIMARY KEY (site, path))')
+            self.db.commit()
+            for path, sites in self.db.execute('SELECT * FROM placements'):
+                self.placements[path] = json.loads(sites)
+            for site, path in self.db.execute('SELECT * FROM moves'):
+                self.moves.setdefault(site, set()).add(path)
+            for site, path, size, content_type, last_modified, tags in self.db.execute('SELECT * FROM objects'):
+                self.__index(site, path, {
+                    'size': size,
+                    'content_type': content_type,
+                    'last_modified': last_modified,
+                    'tags': json.loads(tags)
+                })
+
+    def put(self, site: str, path: str, size: int | None, content_type: str | None,
+            tags: Dict[str, str], last_modified: str | None = None):
+        entry = {'size': size, 'content_type': content_type, 'last_modified': last_modified, 'tags': dict(tags)}
+        with self.lock:
+            self.__unindex(site, path)
+            self.__index(site, path, entry)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)',
+                                (site, path, size, content_type, last_modified, json.dumps(entry['tags'])))
+                self.db.commit()
+
+    def remove(self, site: str, path: str):
+        with self.lock:
+            self.__unindex(site, path)
+            if self.db is not None:
+                self.db.execute('DELETE FROM objects WHERE site = ? AND path = ?', (site, path))
+                self.db.commit()
+
+    def replace_site(self, site: str, entries: Iterable[Dict[str, Any]], prefix: str = ''):
+        entries = list(entries)
+        with self.lock:
+            for path in [p for p in self.sites.get(site, ()) if p.startswith(prefix)]:
+                self.__unindex(site, path)
+            for entry in entries:
+                self.__index(site, entry['path'], {k: v for k, v in entry.items() if k != 'path'})
+            if self.db is not None:
+                self.db.execute('DELETE FROM objects WHERE site = ? AND substr(path, 1, ?) = ?',
+                                (site, len(prefix), prefix))
+                self.db.executemany('INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)', [
+                    (site, e['path'], e['size'], e['content_type'], e['last_modified'], json.dumps(e['tags']))
+                    for e in entries
+                ])
+                self.db.commit()
+
+    def place(self, path: str, sites: List[str]):
+        # Records the sites an upload was sent to, whether or not all of its replicas were written yet.
+        with self.lock:
+            self.placements[path] = list(sites)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO placements VALUES (?, ?)', (path, json.dumps(sites)))
+                self.db.commit()
+
+    def placement(self, path: str) -> List[str]:
+        with self.lock:
+            return list(self.placements.get(path, ()))
+
+    def replicas(self, path: str) -> List[str]:
+        # Sites holding the object, the ones it was placed on first.
+        with self.lock:
+            holding = self.path_index.get(path, set())
+            placed = [site for site in self.placements.get(path, ()) if site in holding]
+            return placed + sorted(holding.difference(placed))
+
+    def move(self, source: str, path: str):
+        # Records an object moved away from `source`, so links naming the site it was reported on keep working.
+        with self.lock:
+            self.moves.setdefault(source, set()).add(path)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO moves VALUES (?, ?)', (source, path))
+                self.db.commit()
+
+    def search_moved(self, name: str, site: str) -> List[str]:
+        # Paths with the given name that were moved away from the site and are still held somewhere.
+        with self.lock:
+            return sorted(path for path in self.moves.get(site, ())
+                          if path in self.path_index and fnmatch.fnmatchcase(path.split('/')[-1], name))
+
+    def objects(self, site: str) -> List[Tuple[str, Dict[str, Any]]]:
+        with self.lock:
+            return [(path, dict(self.entries[(site, path)])) for path in self.sites.get(site, ())]
+
+    def get(self, site: str, path: str) -> Dict[str, Any] | None:
+        with self.lock:
+            entry = self.entries.get((site, path))
+            return None if entry is None else dict(entry)
+
+    def all(self, sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        sites = list(sites)
+        with self.lock:
+            return self.__group(sites, {(site, path) for site in sites for path in self.sites.get(site, ())})
+
+    def search_tags(self, tags: Dict[str, str], sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        with self.lock:
+            postings = sorted((self.tag_index.get(f'{k}={v}', set()) for k, v in tags.items()), key=len)
+            if len(postings) == 0:
+                return self.all(sites)
+            found = set(postings[0])
+            for posting in postings[1:]:
+                found &= posting
+            return self.__group(sites, found)
+
+    def search_extension(self, extension: str, sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        extension = extension.lower()
+        with self.lock:
+            if '.' in extension:
+                return self.__group(sites, {key for key in self.entries if key[1].lower().endswith(f'.{extension}')})
+            return self.__group(sites, self.extension_index.get(extension, set()))
+
+    def search_content_type(self, content_type: str, sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        with self.lock:
+            return self.__group(sites, self.content_type_index.get(content_type, set()))
+
+    def search(self, query, sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        sites = list(sites)
+        with self.lock:
+            return self.__group(sites, query.select(self, sites))
+
+    def search_name(self, name: str, sites: Iterable[str]) -> List[Dict[str, List[str]]]:
+        sites = list(sites)
+        with self.lock:
+            if any(c in name for c in '*?['):
+                return self.__group(sites, {
+                    (site, path) for site in sites for path in self.sites.get(site, ())
+                    if fnmatch.fnmatchcase(path.split('/')[-1], name)
+                })
+            return self.__group(sites, self.name_index.get(name, set()))
+
+    def __group(self, sites: Iterable[str], found: Set[Tuple[str, str]]) -> List[Dict[str, List[str]]]:
+        grouped = {}
+        for site, path in found:
+            grouped.setdefault(site, []).append(path)
+
+        return [{site: sorted(grouped[site])} for site in sites if site in grouped]
+
+    def __index(self, site: str, path: str, entry: Dict[str, Any]):
+        key = (site, path)
+        self.entries[key] = entry
+        self.sites.setdefault(site, set()).add(path)
+        self.path_index.setdefault(path, set()).add(site)
+        self.name_index.setdefault(path.split('/')[-1], set()).add(key)
+        for k, v in entry['tags'].items():
+            self.tag_index.setdefault(f'{k}={v}', set()).add(key)
+        extension = self.__extension(path)
+        if extension is not None:
+            self.extension_index.setdefault(extension, set()).add(key)
+        if entry['content_type'] is not None:
+            self.content_type_index.setdefault(entry['content_type'], set()).add(key)
+
+    def __unindex(self, site: str, path: str):
+        key = (site, path)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.sites[site].discard(path)
+        self.__discard(self.path_index, path, site)
+        self.__discard(self.name_index, path.split('/')[-1], key)
+        for k, v in entry['tags'].items():
+            self.__discard(self.tag_index, f'{k}={v}', key)
+        extension = self.__extension(path)
+        if extension is not None:
+            self.__discard(self.extension_index, extension, key)
+        if entry['content_type'] is not None:
+            self.__discard(self.content_type_index, entry['content_type'], key)
+
+    @staticmethod
+    def __discard(index: Dict[str, Set[Any]], term: str, key: Any):
+        posting = index.get(term)
+        if posting is not None:
+            posting.discard(key)
+            if len(posting) == 0:
+                del index[term]
+
+    @staticmethod
+    def __extension(path: str) -> str | None:
+        name = path.split('/')[-1]
+        return name.rsplit('.', 1)[-1].lower() if '.' in name else None
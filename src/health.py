@@ -0,0 +1,89 @@
+import functools
+import threading
+from typing import Callable, Dict
+
+import requests
+
+import settings
+from metrics import HTTP_CALLS
+from pools import HttpPools, WorkerPool
+from scatter import OK, gather
+import tracing
+
+
+class HealthMonitor:
+
+    def __init__(self, workers: WorkerPool, http_pools: HttpPools, on_probe: Callable[[str, bool], None] | None = None):
+        self.aliases: Dict[str, str] = {}
+        self.healthy: Dict[str, str] = {}
+        self.version = 0
+        self.successes: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.http_pools = http_pools
+        self.on_probe = on_probe
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__run, name='health-monitor', daemon=True)
+
+    def add(self, aliases: Dict[str, str]):
+        with self.lock:
+            self.aliases.update(aliases)
+        self.__check(aliases, initial=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def snapshot(self) -> (int, Dict[str, str]):
+        with self.lock:
+            return self.version, self.healthy
+
+    def __run(self):
+        while not self.stopped.wait(settings.HEALTH_INTERVAL):
+            with self.lock:
+                aliases = dict(self.aliases)
+            self.__check(aliases)
+
+    def __check(self, aliases: Dict[str, str], initial: bool = False):
+        outcomes = gather(self.workers, {site: functools.partial(self.__probe, site) for site in aliases},
+                          settings.HEALTH_TIMEOUT)
+        results = [(site, outcomes[site].status == OK and outcomes[site].value) for site in aliases]
+
+        with self.lock:
+            healthy = set(self.healthy)
+            for site, alive in results:
+                if alive:
+                    self.successes[site] = self.successes.get(site, 0) + 1
+                    self.failures[site] = 0
+                    if initial or self.successes[site] >= settings.HEALTH_SUCCESS_THRESHOLD:
+                        healthy.add(site)
+                else:
+                    self.failures[site] = self.failures.get(site, 0) + 1
+                    self.successes[site] = 0
+                    if initial or self.failures[site] >= settings.HEALTH_FAILURE_THRESHOLD:
+                        healthy.discard(site)
+
+            if healthy != set(self.healthy):
+                self.healthy = {site: alias for site, alias in self.aliases.items() if site in healthy}
+                self.version += 1
+
+        if self.on_probe is not None:
+            for site, alive in results:
+                self.on_probe(site, alive)
+
+    def __probe(self, site: str) -> bool:
+        with tracing.span('health_check', site=site):
+            return self.__get_live(site)
+
+    def __get_live(self, site: str) -> bool:
+        try:
+            response = self.http_pools.session(site).get(f'{site}/minio/health/live',
+                                                         timeout=settings.HEALTH_TIMEOUT)
+            HTTP_CALLS.inc(site=site, call='health', outcome=str(response.status_code))
+            return response.status_code == 200
+        except requests.RequestException:
+            HTTP_CALLS.inc(site=site, call='health', outcome='error')
+            return False
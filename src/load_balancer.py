@@ -1,16 +1,37 @@
-import io
-import re
-from multiprocessing.pool import ThreadPool
-import subprocess
+import functools
 import json
 import os
 import base64
+import threading
+import time
+from contextlib import contextmanager
 
 import fastapi
-import requests
 from minio import Minio
 from minio.commonconfig import Tags
-from typing import List, Dict, Any
+from minio.datatypes import Object
+from minio.error import S3Error
+from typing import BinaryIO, Callable, Iterator, List, Dict, Any, Tuple
+
+import settings
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_site_failure
+from capacity import CapacityMonitor
+from catalog import Catalog
+from health import HealthMonitor
+import metrics
+from multipart import MultipartUploader
+from notifications import NotificationStreams, SiteListener
+from pagination import paginate
+from placement import Inflight, ReplicaSelector, create_strategy
+from pools import HttpPools, WorkerPool, manager_options
+from presign import PresignedUrlCache
+from query import parse as parse_query
+from rebalancer import Rebalancer
+from replication import replicate
+from scatter import OK, TIMEOUT, by_site, gather
+from search_cache import SearchCache
+from search_engine import SearchEngine
+import tracing
 
 
 class MinIO:
@@ -19,7 +40,35 @@ class MinIO:
         self.aliases = {}
         self.clients = {}
         self.tokens = {}
+        self.credentials = {}
         self.current_index = 1
+        self.search_engine = SearchEngine(self.clients)
+        self.catalog = Catalog(settings.CATALOG_PATH)
+        self.listeners = {}
+        self.workers = WorkerPool('workers', settings.WORKER_POOL_SIZE)
+        self.upload_workers = WorkerPool('uploads', settings.UPLOAD_POOL_SIZE)
+        self.replication_workers = WorkerPool('replication', settings.REPLICATION_POOL_SIZE)
+        self.http_pools = HttpPools(settings.HTTP_POOL_SIZE)
+        # Health checks and scrapes get their own threads, calls left running by a timed out request cannot starve them.
+        self.monitor_workers = WorkerPool('monitors', settings.MONITOR_POOL_SIZE)
+        self.health_monitor = HealthMonitor(self.monitor_workers, self.http_pools,
+                                            lambda site, alive: self.__probed(site, alive))
+        self.capacity_monitor = CapacityMonitor(self.tokens, self.monitor_workers, self.http_pools)
+        self.inflight = Inflight()
+        self.placement = create_strategy(settings.PLACEMENT_STRATEGY, self.inflight)
+        self.uploader = MultipartUploader(settings.UPLOAD_PART_SIZE, settings.UPLOAD_PARALLELISM,
+                                          settings.UPLOAD_PART_RETRIES, self.upload_workers)
+        self.presigned_urls = PresignedUrlCache(settings.PRESIGN_EXPIRY, settings.PRESIGN_REFRESH_MARGIN,
+                                                settings.PRESIGN_CACHE_SIZE)
+        self.breaker = CircuitBreaker(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_OPEN_INTERVAL,
+                                      settings.BREAKER_LATENCY_ALPHA, settings.BREAKER_OUTLIER_FACTOR,
+                                      settings.BREAKER_OUTLIER_MIN_LATENCY, settings.BREAKER_OUTLIER_MIN_SAMPLES,
+                                      settings.BREAKER_MAX_EJECTED)
+        self.replica_selector = ReplicaSelector(self.inflight, self.breaker.latency)
+        self.rebalancer = Rebalancer(self.clients, self.catalog, self.capacity_monitor, self.uploader, self.__health,
+                                     self.__track, self.__moved)
+        self.search_cache = SearchCache(settings.SEARCH_CACHE_TTL, settings.SEARCH_CACHE_SIZE,
+                                        settings.SEARCH_CACHE_MAX_PATHS)
 
         with open('./configs/config.json', 'r') as json_in:
             config: List[Dict[str, str]] = json.loads(json_in.read())
@@ -31,31 +80,48 @@ class MinIO:
             secret_key = base64.b64decode(instance['secret_key'].encode('utf-8')).decode('utf-8')
             client = Minio(f'{instance["site"].split(":")[1][2:]}:{instance["site"].split(":")[2]}',
                            access_key=access_key,
-                           secret_key=secret_key
+                           secret_key=secret_key,
+                           secure=instance['site'].startswith('https'),
+                           http_client=self.http_pools.manager(instance['site'])
                            )
             self.clients[instance['site']] = client
             self.aliases[instance['site']] = instance['alias']
             self.tokens[instance['site']] = instance['token']
+            self.credentials[instance['site']] = (access_key, secret_key)
 
             result = os.system('mc.exe alias set minio{} {} {} {}'.format(
                 instance['alias'].split('o')[-1], instance['site'], access_key, secret_key))
+            metrics.SUBPROCESS_CALLS.inc(command='mc alias set', outcome='ok' if result == 0 else 'error')
 
             if result == 0:
                 print('Added successfully!')
 
+        self.health_monitor.add(self.aliases)
+        self.health_monitor.start()
+        self.capacity_monitor.add(self.clients.keys())
+        self.capacity_monitor.start()
+
+        self.__index_sites(list(self.clients.keys()))
+        self.__listen(list(self.clients.keys()))
+        self.rebalancer.start()
+
     def add_instances(self, sites: List[Dict[str, str]]) -> List[str]:
         with open('./configs/config.json', 'r') as json_in:
             config: List[Dict[str, str]] = json.loads(json_in.read())
 
         errors = []
+        added = []
         for site in sites:
             client = Minio(f'{site["url"].split(":")[1][2:]}:{site["url"].split(":")[2]}',
                            access_key=site['access_key'],
-                           secret_key=site['secret_key']
+                           secret_key=site['secret_key'],
+                           secure=site['url'].startswith('https'),
+                           http_client=self.http_pools.manager(site['url'])
                            )
             self.clients[site['url']] = client
             self.aliases[site['url']] = f'minio{self.current_index}'
             self.tokens[site['url']] = site['token']
+            self.credentials[site['url']] = (site['access_key'], site['secret_key'])
             instance = {
                 'site': site['url'],
                 'token': site['token'],
@@ -65,290 +131,524 @@ class MinIO:
             }
             result = os.system('mc.exe alias set minio{} {} {} {}'.format(
                 self.current_index, site['url'], site['access_key'], site['secret_key']))
+            metrics.SUBPROCESS_CALLS.inc(command='mc alias set', outcome='ok' if result == 0 else 'error')
             if result != 0:
                 errors.append(site['url'])
             else:
                 config.append(instance)
+                added.append(site['url'])
 
             self.current_index += 1
 
         with open('./configs/config.json', 'w') as json_out:
             json_out.write(json.dumps(config, indent=4))
 
-        return errors
+        self.health_monitor.add({url: self.aliases[url] for url in added})
+        self.capacity_monitor.add(added)
+        self.__index_sites(added)
+        self.__listen(added)
+        if settings.REBALANCE_ENABLED and len(added) > 0:
+            self.rebalancer.trigger()
 
-    def __health(self) -> Dict[str, str]:
-        healthy = {}
-
-        pool = ThreadPool(processes=10)
+        return errors
 
-        async_results = []
-        for site, alias in self.aliases.items():
-            async_result = pool.apply_async(self.__get_health, (alias, site))
-            async_results.append(async_result)
+    def __index_sites(self, sites: List[str]):
+        futures = []
+        for site in sites:
+            future = self.workers.submit(self.__index_site, site)
+            futures.append(future)
 
-        for async_result in async_results:
-            status, site, alias = async_result.get()
-            if status == "success":
-                healthy[site] = alias
+        for future in futures:
+            future.result()
 
-        pool.close()
-        pool.join()
+    def __index_site(self, site: str):
+        try:
+            self.catalog.replace_site(site, self.search_engine.describe(site))
+        except Exception as e:
+            print(f'Could not index {site}: {e}')
 
-        return healthy
+    def __listen(self, sites: List[str]):
+        for site in sites:
+            if site in self.listeners:
+                self.listeners[site].stop()
+            # The listener gets a client of its own, whose http_client lets it notice dropped streams and stop them.
+            streams = NotificationStreams(**manager_options(settings.HTTP_POOL_SIZE))
+            access_key, secret_key = self.credentials[site]
+            client = Minio(f'{site.split(":")[1][2:]}:{site.split(":")[2]}', access_key=access_key,
+                           secret_key=secret_key, secure=site.startswith('https'), http_client=streams)
+            self.listeners[site] = SiteListener(site, client, streams, self.catalog, self.search_engine)
+            self.listeners[site].start()
+
+    def __health(self, trial: bool = False) -> Dict[str, str]:
+        # Sites that answer the health checks but whose circuit breaker is open get no traffic.
+        return {site: alias for site, alias in self.health_monitor.healthy.items() if self.breaker.allows(site, trial)}
+
+    def __probed(self, site: str, alive: bool):
+        # The liveness check says nothing about the S3 calls, so a half open site gets a bucket listing as its trial
+        # request, it closes the circuit breaker if it succeeds and opens it again if it fails.
+        if self.breaker.probed(site, alive) and self.breaker.allows(site, trial=True):
+            self.monitor_workers.submit(self.__trial, site)
+
+    def __trial(self, site: str):
+        try:
+            with self.__track(site, 'trial', measure_latency=False):
+                self.clients[site].list_buckets()
+        except Exception as e:
+            print(f'Trial request to {site} failed: {e}')
+
+    @contextmanager
+    def __track(self, site: str, operation: str, measure_latency: bool = True) -> Iterator[None]:
+        start = time.monotonic()
+        outcome = 'ok'
+        try:
+            with tracing.span(operation, site=site), self.breaker.track(site, measure_latency):
+                yield
+        except BaseException as e:
+            outcome = 'failure' if is_site_failure(e) else 'error'
+            raise
+        finally:
+            metrics.SITE_OPERATIONS.inc(site=site, operation=operation, outcome=outcome)
+            metrics.SITE_OPERATION_DURATION.observe(time.monotonic() - start, site=site, operation=operation)
+
+    def __snapshot(self) -> (int, Dict[str, str]):
+        # Answers from the catalog never reach the sites, so only their health decides which ones are included, an
+        # open circuit breaker does not.
+        return self.health_monitor.snapshot()
 
     def search_by_tags(self, tags: Dict[str, str]) -> List[Dict[str, List[str]]]:
-        healthy = self.__health()
-
-        find_tags = [f' --tags="{k}={v}" ' for k, v in tags.items()]
-
-        pool = ThreadPool(processes=10)
-
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__search_tags, ((k, v), find_tags))
-            async_results.append(async_result)
-
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
+        version, healthy = self.__snapshot()
 
-        pool.close()
-        pool.join()
-
-        return found
+        return self.search_cache.get(('tags', tuple(sorted(tags.items()))), version,
+                                     lambda: self.catalog.search_tags(tags, healthy.keys()))
 
     def search_by_file_extension(self, extension: str) -> List[Dict[str, List[str]]]:
-        healthy = self.__health()
-
-        find_extension = f' --name="*.{extension}" '
-
-        pool = ThreadPool(processes=10)
+        version, healthy = self.__snapshot()
 
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__search_extension, ((k, v), find_extension))
-            async_results.append(async_result)
-
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
-
-        pool.close()
-        pool.join()
-
-        return found
+        return self.search_cache.get(('extension', extension.lower()), version,
+                                     lambda: self.catalog.search_extension(extension, healthy.keys()))
 
     def search_by_content_type(self, content_type: str) -> List[Dict[str, List[str]]]:
-        healthy = self.__health()
-
-        find_content_type = f' --metadata="content-type={content_type}" '
-
-        pool = ThreadPool(processes=10)
-
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__search_content_type, ((k, v), find_content_type))
-            async_results.append(async_result)
-
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
-
-        pool.close()
-        pool.join()
-
-        return found
+        version, healthy = self.__snapshot()
+
+        return self.search_cache.get(('content_type', content_type), version,
+                                     lambda: self.catalog.search_content_type(content_type, healthy.keys()))
+
+    def search(self, query: Dict[str, Any]) -> List[Dict[str, List[str]]]:
+        query_filter = parse_query(query)
+        version, healthy = self.__snapshot()
+
+        return self.search_cache.get(('search', json.dumps(query, sort_keys=True)), version,
+                                     lambda: self.catalog.search(query_filter, healthy.keys()))
+
+    def search_live(self, query: Dict[str, Any]) -> (List[Dict[str, List[str]]], Dict[str, Dict[str, Any]]):
+        query_filter = parse_query(query)
+        healthy = self.__health(trial=True)
+
+        outcomes = gather(self.workers, {
+            site: functools.partial(self.__search_site, site, query_filter) for site in healthy
+        }, settings.SCATTER_DEADLINE, settings.SCATTER_SITE_TIMEOUT, settings.SCATTER_HEDGE_AFTER)
+
+        results = []
+        for site in healthy:
+            outcome = outcomes[site]
+            # Listing time grows with the number of objects, so only the outcome is reported, not the latency, and
+            # a search that timed out says nothing about the instance.
+            if outcome.status != TIMEOUT:
+                self.breaker.record(site, outcome.status == OK)
+            metrics.SITE_OPERATIONS.inc(site=site, operation='search', outcome=outcome.status)
+            metrics.SITE_OPERATION_DURATION.observe(outcome.elapsed, site=site, operation='search')
+            if outcome.status != OK:
+                print(f'Could not search {site}: {outcome.error}')
+            elif len(outcome.value) > 0:
+                results.append({site: outcome.value})
+
+        return results, by_site(outcomes, lambda site: site)
+
+    def __search_site(self, site: str, query_filter) -> List[str]:
+        with tracing.span('search', site=site):
+            return sorted(self.search_engine.query(site, query_filter))
 
     def get_all_objects(self) -> List[Dict[str, List[str]]]:
-        healthy = self.__health()
-
-        pool = ThreadPool(processes=10)
-
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__get_all, (k, v))
-            async_results.append(async_result)
-
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
-
-        pool.close()
-        pool.join()
+        healthy = self.health_monitor.healthy
 
-        return found
+        return self.catalog.all(healthy.keys())
 
-    def put_object(self, file: (bytes, str), file_size: int, tags: Dict[str, str]) -> (str, str):
+    def list_objects_page(self, limit: int, continuation_token: str | None = None) \
+            -> (List[Dict[str, str]], str | None):
         healthy = self.__health()
 
-        pool = ThreadPool(processes=10)
+        return paginate(list(healthy.keys()), self.search_engine.iterate, limit, continuation_token)
 
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__get_total_bytes, ((k, v), file_size))
-            async_results.append(async_result)
+    def stream_by_tags(self, tags: Dict[str, str]) -> Iterator[Dict[str, List[str]]]:
+        return self.__stream(lambda sites: self.catalog.search_tags(tags, sites))
 
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
+    def stream_by_file_extension(self, extension: str) -> Iterator[Dict[str, List[str]]]:
+        return self.__stream(lambda sites: self.catalog.search_extension(extension, sites))
 
-        max_dict = max(found, key=lambda d: max(d.values()))
+    def stream_by_content_type(self, content_type: str) -> Iterator[Dict[str, List[str]]]:
+        return self.__stream(lambda sites: self.catalog.search_content_type(content_type, sites))
 
-        max_key = max(max_dict, key=max_dict.get)
+    def stream_all_objects(self) -> Iterator[Dict[str, List[str]]]:
+        return self.__stream(lambda sites: self.catalog.all(sites))
 
-        client = self.clients[max_key]
+    def __stream(self, lookup: Callable[[List[str]], List[Dict[str, List[str]]]]) -> Iterator[Dict[str, List[str]]]:
+        for site in self.health_monitor.healthy:
+            for entry in lookup([site]):
+                paths = entry[site]
+                for i in range(0, len(paths), settings.STREAM_BATCH_SIZE):
+                    yield {site: paths[i:i + settings.STREAM_BATCH_SIZE]}
 
-        object_tags = self.__create_tags(tags)
-
-        result = client.put_object(
-            'dataspace',
-            file[1],
-            io.BytesIO(file[0]),
-            -1,
-            'application/json',
-            part_size=1024*1024*5,
-            tags=object_tags
-        )
-
-        pool.close()
-        pool.join()
-
-        if result is not None:
-            return result.bucket_name + '/' + result.object_name, max_key
+    def put_object(self, file: (BinaryIO, str), file_size: int | None, tags: Dict[str, str]) -> (str, str):
+        return self.__store(file[1], file[0], self.__file_size(file[0], file_size), 'application/json', tags)
 
     def upload_object(self, file: fastapi.UploadFile, tags: Dict[str, str]) -> (str, str):
-        healthy = self.__health()
-        file_size = file.size
+        return self.__store(file.filename, file.file, self.__file_size(file.file, file.size), file.content_type, tags)
+
+    def __store(self, object_name: str, data: BinaryIO, length: int, content_type: str | None,
+                tags: Dict[str, str]) -> (str, str):
+        sites = self.__place(object_name, length)
+        quorum = max(1, min(settings.WRITE_QUORUM, settings.REPLICATION_FACTOR))
+        if len(sites) < quorum:
+            metrics.REPLICATED_WRITES.inc(outcome='no_placement')
+            return None, None
+        if len(sites) < settings.REPLICATION_FACTOR:
+            print(f'Only {len(sites)} of {settings.REPLICATION_FACTOR} replicas of {object_name} could be placed')
+
+        path = 'dataspace/' + object_name
+        self.catalog.place(path, sites)
+
+        write = functools.partial(self.__write_replica, object_name, length, content_type, self.__create_tags(tags),
+                                  tags)
+        acknowledged, errors = replicate(self.replication_workers, sites, write, data, length, quorum,
+                                         functools.partial(self.__replica_failed, path))
+        if len(acknowledged) >= quorum:
+            metrics.REPLICATED_WRITES.inc(outcome='acknowledged')
+            return path, ', '.join(acknowledged)
+
+        metrics.REPLICATED_WRITES.inc(outcome='failed')
+        if len(acknowledged) == 0 and len(errors) > 0:
+            raise next(iter(errors.values()))
+        for site, e in errors.items():
+            print(f'Could not write {path} to {site}: {e}')
+        return None, None
+
+    def __write_replica(self, object_name: str, length: int, content_type: str | None, object_tags: Tags,
+                        tags: Dict[str, str], site: str, data: BinaryIO) -> str:
+        start = time.monotonic()
+        with self.inflight.track(site), self.__track(site, 'upload', measure_latency=False):
+            result = self.uploader.upload(
+                self.clients[site],
+                'dataspace',
+                object_name,
+                data,
+                length, content_type,
+                tags=object_tags
+            )
+        metrics.UPLOAD_BYTES.inc(length, site=site)
+        metrics.UPLOAD_SECONDS.inc(time.monotonic() - start, site=site)
+
+        with tracing.span('catalog'):
+            self.catalog.put(site, result.bucket_name + '/' + result.object_name, length, content_type, tags)
+        self.search_cache.invalidate()
+        return site
 
-        pool = ThreadPool(processes=10)
-
-        async_results = []
-        for k, v in healthy.items():
-            async_result = pool.apply_async(self.__get_total_bytes, ((k, v), file_size))
-            async_results.append(async_result)
-
-        found = []
-        for async_result in async_results:
-            results = async_result.get()
-            if results is not None:
-                found.append(results)
-
-        max_dict = max(found, key=lambda d: max(d.values()))
-
-        max_key = max(max_dict, key=max_dict.get)
-
-        client = self.clients[max_key]
-
-        object_tags = self.__create_tags(tags)
-
-        result = client.put_object(
-            'dataspace',
-            file.filename,
-            io.BytesIO(file.file.read()),
-            -1, file.content_type,
-            part_size=1024*1024*5,
-            tags=object_tags
-        )
-
-        pool.close()
-        pool.join()
+    @staticmethod
+    def __replica_failed(path: str, site: str, error: BaseException):
+        print(f'Could not write {path} to {site} in the background: {error}')
+        metrics.REPLICATED_WRITES.inc(outcome='background_failed')
 
-        if result is not None:
-            return result.bucket_name + '/' + result.object_name, max_key
+    @staticmethod
+    def __file_size(data: BinaryIO, size: int | None) -> int:
+        # Multipart parts do not always come with a size, the spooled file then tells it.
+        if size is not None:
+            return size
+
+        data.seek(0, os.SEEK_END)
+        size = data.tell()
+        data.seek(0)
+        return size
+
+    def __place(self, object_name: str, file_size: int) -> List[str]:
+        # Only the chosen sites would report how the upload went, so half open sites are left to the health checks.
+        with tracing.span('health'):
+            healthy = self.__health()
+
+        with tracing.span('capacity'):
+            capacity = self.capacity_monitor.metrics(healthy.keys())
+
+        free = {
+            site: site_metrics.free_bytes - file_size
+            for site, site_metrics in capacity.items()
+            if site_metrics.free_bytes is not None and site_metrics.free_bytes >= file_size
+            and not (site_metrics.drives_online == 0 and site_metrics.drives_offline > 0)
+        }
+
+        with tracing.span('placement', strategy=settings.PLACEMENT_STRATEGY):
+            sites = self.placement.choose_many(free, object_name, max(settings.REPLICATION_FACTOR, 1))
+        for site in sites or ['none']:
+            metrics.PLACEMENTS.inc(site=site, strategy=settings.PLACEMENT_STRATEGY)
+        return sites
 
     def get_dataset(self, url: str, name: str) -> List[Dict[str, List[str]]]:
-        find_name = [f' --name="{name}" ']
-
-        result = self.__search_name((url, url.split("//")[-1].split(".")[0]), find_name)
-        if result:
-            dataset_link = self.__get_file(url.split("//")[-1].split(".")[0]+"/"+result[list(result.keys())[0]][0])
-            if dataset_link[0] == "success":
-                return dataset_link[1]
-            else:
-                return "failed"
-        else:
+        site = self.__resolve_site(url)
+        if site is None:
             return "failed"
-    
-    def get_dataset_tags(self, url: str, name: str) -> List[Dict[str, List[str]]]:
-        dataset_link = self.__get_tags(url.split("//")[-1].split(".")[0]+"/"+name)
-        if dataset_link[0] == "success":
-            return dataset_link[1]
-        else:
+
+        result = self.catalog.search_name(name, [site])
+        # An object the rebalancer moved away from the site is still found under the site it was reported on.
+        paths = result[0][site] if result else self.catalog.search_moved(name, site)
+        if len(paths) == 0:
             return "failed"
 
-    
-    def get_dataset_metadata(self, url: str, name: str) -> List[Dict[str, List[str]]]:
-        dataset_link = self.__get_metadata(url.split("//")[-1].split(".")[0]+"/"+name)
-        if dataset_link[0] == "success":
-            return dataset_link[1]
-        else:
+        try:
+            # Handing out a link costs the instance nothing yet, so its latency says nothing about the instance.
+            return self.__read(site, paths[0], 'presign',
+                               lambda replica, path: self.presigned_urls.get(replica, self.clients[replica], path),
+                               measure_latency=False)
+        except Exception:
             return "failed"
+    
+    def stat_dataset(self, url: str, name: str) -> Object | None:
+        site = self.__resolve_site(url)
+        if site is None or "/" not in name:
+            return None
 
+        site = self.__holder(site, name)
+        bucket, object_name = name.split("/", 1)
+        try:
+            with self.__track(site, 'stat'):
+                return self.clients[site].stat_object(bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket"):
+                return None
+            raise
+
+    def download_dataset(self, url: str, name: str, offset: int = 0, length: int = 0) -> Iterator[bytes]:
+        site = self.__holder(self.__resolve_site(url), name)
+        bucket, object_name = name.split("/", 1)
+
+        with self.__track(site, 'download'):
+            response = self.clients[site].get_object(bucket, object_name, offset=offset, length=length)
+        try:
+            for chunk in response.stream(settings.DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+    def get_dataset_tags(self, url: str, name: str) -> Dict[str, str] | str:
+        site = self.__resolve_site(url)
+        if site is None or "/" not in name:
+            return "failed"
 
-    @staticmethod
-    def __search_tags(health: tuple, tags: Dict[str, str]) -> Dict[Any, List[str]] | None:
-        search_string = f'mc.exe find {health[1]} {"".join(tags)}'
-        data = subprocess.check_output(search_string, shell=True).decode('utf-8').split('\n')[:-1]
-        data = ["/".join(d.split('/')[1:]) for d in data]
-        return None if len(data) == 0 else {health[0]: data}
+        try:
+            return self.__read(site, name, 'tags', lambda replica, path: self.__get_tags(self.clients[replica], path))
+        except Exception:
+            return "failed"
 
-    @staticmethod
-    def __search_extension(health: tuple, extension: str) -> Dict[Any, List[str]] | None:
-        search_string = f'mc.exe find {health[1]} {extension}'
-        data = subprocess.check_output(search_string, shell=True).decode('utf-8').split('\n')[:-1]
-        data = ["/".join(d.split('/')[1:]) for d in data]
-        return None if len(data) == 0 else {health[0]: data}
+    def get_dataset_metadata(self, url: str, name: str) -> Dict[str, str] | str:
+        site = self.__resolve_site(url)
+        if site is None or "/" not in name:
+            return "failed"
 
-    @staticmethod
-    def __search_content_type(health: tuple, content_type: str) -> Dict[Any, List[str]] | None:
-        search_string = f'mc.exe find {health[1]} {content_type}'
-        data = subprocess.check_output(search_string, shell=True).decode('utf-8').split('\n')[:-1]
-        data = ["/".join(d.split('/')[1:]) for d in data]
-        return None if len(data) == 0 else {health[0]: data}
-    
-    @staticmethod
-    def __search_name(health: tuple, dataset_name: str) -> Dict[Any, List[str]] | None:
-        search_string = f'mc.exe find {health[1]} {"".join(dataset_name)}'
-        data = subprocess.check_output(search_string, shell=True).decode('utf-8').split('\n')[:-1]
-        data = ["/".join(d.split('/')[1:]) for d in data]
-        return None if len(data) == 0 else {health[0]: data}
+        try:
+            return self.__read(site, name, 'metadata',
+                               lambda replica, path: self.__get_metadata(self.clients[replica], path))
+        except Exception:
+            return "failed"
 
-    @staticmethod
-    def __get_all(site: str, alias: str) -> Dict[Any, List[str]] | None:
-        search_string = f'mc.exe find {alias} '
-        data = subprocess.check_output(search_string, shell=True).decode('utf-8').split('\n')[:-1]
-        data = ["/".join(d.split('/')[1:]) for d in data]
-        return None if len(data) == 0 else {site: data}
-
-    def __get_total_bytes(self, health: (str, str), file_size: int) -> Dict[str, float]:
-        token = self.tokens[health[0]]
-
-        headers = {'Authorization': f'Bearer {token}'}
-        response = requests.get(
-            f'https://{health[1]}.sedimark.work:9000/minio/v2/metrics/cluster',
-            headers=headers)
-
-        if response.status_code == 200:
-            text = response.content.decode('utf-8')
-            index = text.find('minio_cluster_capacity_raw_free_bytes{server="127.0.0.1:9000"}')
-            pattern = r'[0-9.e+]+'
-            matches = re.findall(pattern, text[index + 62:index + 80])
-            result = ''.join(matches)
-            total_size = float(result)
-            return {health[0]: total_size - file_size}
-        else:
-            return {health[0]: 0}
+    def __read(self, site: str, path: str, operation: str, read: Callable[[str, str], Any],
+               measure_latency: bool = True, order: List[str] | None = None) -> Any:
+        # Tries the replicas of the object in turn, the first one to answer wins.
+        error: Exception = LookupError(f'No replica of {path} is available')
+        for attempt, replica in enumerate(self.__read_order(site, path) if order is None else order):
+            try:
+                with self.inflight.track(replica), self.__track(replica, operation, measure_latency):
+                    value = read(replica, path)
+            except Exception as e:
+                error = e
+                continue
+            metrics.REPLICA_READS.inc(site=replica, operation=operation, fallback=str(attempt > 0).lower())
+            return value
+
+        raise error
+
+    def __read_order(self, site: str, path: str) -> List[str]:
+        # The healthy replicas with a closed circuit breaker, then the site named by the caller as the last resort,
+        # unless the object is known to have moved away from it.
+        healthy = self.health_monitor.healthy
+        holders = self.catalog.replicas(path)
+        replicas = [replica for replica in holders if replica in healthy and self.breaker.allows(replica)]
+        ordered = self.replica_selector.order(replicas)
+        if site not in ordered and (site in holders or len(holders) == 0):
+            ordered.append(site)
+        return ordered
+
+    def __holder(self, site: str, path: str) -> str:
+        # The named site, or when the object moved away from it, its first healthy replica. Unlike __read_order this
+        # always picks the same site, so the stat and the download of a request read the same copy.
+        holders = self.catalog.replicas(path)
+        if site in holders or len(holders) == 0:
+            return site
+        healthy = self.health_monitor.healthy
+        return next((replica for replica in holders if replica in healthy and self.breaker.allows(replica)), holders[0])
+
+    def get_datasets_details(self, datasets: List[Tuple[str, str]]) \
+            -> (List[Dict[str, Any] | None], Dict[int, str], Dict[str, Dict[str, Any]]):
+        # Returns the details, None for the datasets that do not exist or could not be read, the datasets that were
+        # never read, with the status of the site they were left to, and the status of every site.
+        details: List[Dict[str, Any] | None] = [None] * len(datasets)
+        attempted = set()
+        unread = {}
+
+        # Every dataset is read from the replica a single read would try first and grouped by that replica, the
+        # other replicas are only tried when it fails.
+        by_replica = {}
+        orders = {}
+        skipped = {}
+        for index, (url, name) in enumerate(datasets):
+            site = self.__resolve_site(url)
+            if site is None or "/" not in name:
+                continue
+            order = self.__read_order(site, name)
+            if len(order) == 0:
+                continue
+            if order[0] not in by_replica and order[0] not in skipped and \
+                    not self.breaker.allows(order[0], trial=True):
+                skipped[order[0]] = {'status': 'open', 'elapsed_ms': 0.0, 'hedged': False,
+                                     'error': 'circuit breaker open'}
+            if order[0] in skipped:
+                unread[index] = 'open'
+                continue
+            by_replica.setdefault(order[0], []).append(index)
+            orders[index] = order
+
+        # Each site gets at most DETAILS_SITE_CONCURRENCY workers, each one walking its own share of the datasets and
+        # storing every detail as soon as it has it. A share takes as long as its size, so there is no per-site
+        # timeout or hedging, only the deadline, and the details read by then are kept.
+        stop = threading.Event()
+        calls = {}
+        for site, indexes in by_replica.items():
+            workers = min(settings.DETAILS_SITE_CONCURRENCY, len(indexes))
+            for worker in range(workers):
+                calls[(site, worker)] = functools.partial(
+                    self.__get_details, site, [(i, datasets[i][1], orders[i]) for i in indexes[worker::workers]],
+                    details, attempted, stop)
+
+        # Every stat and tag request already reports its outcome to the circuit breaker, a share cut off by the
+        # deadline only means the share was large.
+        outcomes = gather(self.workers, calls, settings.SCATTER_DEADLINE)
+        # Workers still running past the deadline give up before their next dataset, and write to a list nobody reads.
+        stop.set()
+        # A dataset is only counted as attempted once its detail was stored, so `read` never misses a stored detail.
+        read = set(attempted)
+        result = list(details)
+
+        sites = by_site(outcomes, lambda key: key[0])
+        for site, indexes in by_replica.items():
+            for index in indexes:
+                if index not in read and result[index] is None:
+                    unread[index] = sites[site]['status']
+
+        return result, unread, {**sites, **skipped}
+
+    def stream_datasets_details(self, datasets: List[Tuple[str, str]]) \
+            -> Iterator[Tuple[Tuple[str, str], Dict[str, Any] | None, str | None]]:
+        # Every dataset comes with its details and, when it was never read, the status of the site it was left to.
+        for i in range(0, len(datasets), settings.STREAM_BATCH_SIZE):
+            batch = datasets[i:i + settings.STREAM_BATCH_SIZE]
+            details, unread, _ = self.get_datasets_details(batch)
+            for index, dataset in enumerate(batch):
+                yield dataset, details[index], unread.get(index)
+
+    def __get_details(self, site: str, datasets: List[Tuple[int, str, List[str]]],
+                      details: List[Dict[str, Any] | None], attempted: set, stop: threading.Event):
+        for index, name, order in datasets:
+            if stop.is_set():
+                return
+            try:
+                details[index] = self.__read(site, name, 'details', lambda replica, path: {
+                    "metadata": self.__get_metadata(self.clients[replica], path),
+                    "tags": self.__get_tags(self.clients[replica], path)
+                }, order=order)
+            except Exception:
+                pass
+            attempted.add(index)
+
+    def rebalance(self) -> Dict[str, Any]:
+        self.rebalancer.trigger()
+        return self.rebalancer.stats()
+
+    def rebalance_stats(self) -> Dict[str, Any]:
+        return self.rebalancer.stats()
+
+    def __moved(self, source: str, path: str):
+        self.presigned_urls.discard(source, path)
+        self.search_cache.invalidate()
+
+    def site_stats(self) -> Dict[str, Dict[str, Any]]:
+        healthy = self.health_monitor.healthy
+        breakers = self.breaker.stats()
+        return {
+            site: {'alias': alias, 'healthy': site in healthy, 'breaker': breakers.get(site)}
+            for site, alias in self.aliases.items()
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {'search': self.search_cache.stats(), 'presign': self.presigned_urls.stats()}
+
+    def render_metrics(self) -> str:
+        healthy = self.health_monitor.healthy
+        breakers = self.breaker.stats()
+        for site in list(self.aliases):
+            metrics.SITE_HEALTHY.set(1 if site in healthy else 0, site=site)
+            state = breakers[site]['state'] if site in breakers else CLOSED
+            for breaker_state in (CLOSED, OPEN, HALF_OPEN):
+                metrics.SITE_BREAKER.set(1 if state == breaker_state else 0, site=site, state=breaker_state)
+
+        metrics.SITE_FREE_BYTES.clear()
+        for site, site_metrics in self.capacity_monitor.cached().items():
+            if site_metrics.free_bytes is not None:
+                metrics.SITE_FREE_BYTES.set(site_metrics.free_bytes, site=site)
+
+        for cache, stats in self.cache_stats().items():
+            metrics.CACHE_HITS.sample(stats['hits'], cache=cache)
+            metrics.CACHE_MISSES.sample(stats['misses'], cache=cache)
+            metrics.CACHE_HIT_RATIO.set(stats['hit_ratio'], cache=cache)
+
+        pools = self.pool_stats()
+        for pool in ('workers', 'monitors', 'uploads', 'replication', 'rebalance'):
+            metrics.POOL_SIZE.set(pools[pool]['size'], pool=pool)
+            metrics.POOL_QUEUED.set(pools[pool]['queued'], pool=pool)
+            metrics.POOL_ACTIVE.set(pools[pool]['active'], pool=pool)
+            metrics.POOL_COMPLETED.sample(pools[pool]['completed'], pool=pool)
+        for site, stats in pools['http'].items():
+            metrics.HTTP_POOL_CONNECTIONS.set(stats['connections'], site=site)
+            metrics.HTTP_POOL_IN_USE.set(stats['in_use'], site=site)
+            metrics.HTTP_POOL_REQUESTS.sample(stats['requests'], site=site)
+
+        return metrics.render()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers.stats(),
+            'monitors': self.monitor_workers.stats(),
+            'uploads': self.upload_workers.stats(),
+            'replication': self.replication_workers.stats(),
+            'rebalance': self.rebalancer.workers.stats(),
+            'http': self.http_pools.stats()
+        }
+
+    def __resolve_site(self, url: str) -> str | None:
+        if url in self.clients:
+            return url
+
+        name = url.split("//")[-1].split(".")[0]
+        for site in self.clients:
+            if site.split("//")[-1].split(".")[0] == name or self.aliases[site] == url:
+                return site
+
+        return None
 
     @staticmethod
     def __create_tags(tags: Dict[str, str]) -> Tags:
@@ -359,31 +659,13 @@ class MinIO:
         return minio_tags
 
     @staticmethod
-    def __get_health(alias: str, site: str) -> (str, str, str):
-        data = json.loads(subprocess.check_output(
-            'mc.exe ping {} --count 1 --json'.format(alias), shell=True).decode('utf-8'))
-        return data['status'], site, alias
-    
-    @staticmethod
-    def __get_file(dataset_path: str) -> (str, str):
-        data = json.loads(subprocess.check_output(
-            'mc.exe share download --expire=10m {} --json'.format(dataset_path), shell=True).decode('utf-8'))
-            
-        return data['status'], data["share"]
-    
-    @staticmethod
-    def __get_tags(dataset_path: str) -> (str, str):
-        data = json.loads(subprocess.check_output(
-            'mc.exe tag list {} --json'.format(dataset_path), shell=True).decode('utf-8'))
-        
-        try:
-            return data['status'], data["tagset"]
-        except:
-            return data['status']
-    
+    def __get_tags(client: Minio, dataset_path: str) -> Dict[str, str]:
+        bucket, object_name = dataset_path.split("/", 1)
+        return dict(client.get_object_tags(bucket, object_name) or {})
+
     @staticmethod
-    def __get_metadata(dataset_path: str) -> (str, str):
-        data = json.loads(subprocess.check_output(
-            'mc.exe stat {} --json'.format(dataset_path), shell=True).decode('utf-8'))
-        
-        return data['status'], data["metadata"]
+    def __get_metadata(client: Minio, dataset_path: str) -> Dict[str, str]:
+        bucket, object_name = dataset_path.split("/", 1)
+        stat = client.stat_object(bucket, object_name)
+        # Keep the header capitalisation `mc stat` used, e.g. X-Amz-Meta-Uploaddate.
+        return {"-".join(part.capitalize() for part in k.split("-")): v for k, v in stat.metadata.items()}
@@ -1,16 +1,21 @@
 import json
 import platform
-from typing import Annotated, Optional
+import time
+from typing import Annotated, AsyncIterator, Optional
 
 import requests
 import os
 import uvicorn
 from tqdm import tqdm
-from fastapi import FastAPI, status, UploadFile, Form, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, status, UploadFile, Form, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from load_balancer import MinIO
-from models import Servers, Tags, Instance, Extension, ContentType, DatasetSearcher, Dataset, Metadata
+from async_load_balancer import AsyncMinIO
+import metrics
+import settings
+import tracing
+from models import Servers, Tags, Instance, Extension, ContentType, Search, DatasetSearcher, Dataset, Metadata
 
 tags_metadata = [
     {
@@ -29,25 +34,44 @@ tags_metadata = [
         "name": "search_by_tags",
         "description": "This methode allows the user the search all the Minio instances based on some specified tags. "
                        "This methode receives a dictionary, where the key is the Minio instance and the value is a list"
-                       " of the paths to the files that were found."
+                       " of the paths to the files that were found. With stream=true the results are sent as NDJSON,"
+                       " one line per batch of paths of an instance."
     },
     {
         "name": "search_by_extension",
         "description": "This methode allows the user the search all the Minio instances based on file extension. "
                        "This methode receives a dictionary, where the key is the Minio instance and the value is a list"
-                       " of the paths to the files that were found."
+                       " of the paths to the files that were found. With stream=true the results are sent as NDJSON,"
+                       " one line per batch of paths of an instance."
     },
     {
         "name": "search_by_content_type",
         "description": "This methode allows the user the search all the Minio instances based on content type. "
                        "This methode receives a dictionary, where the key is the Minio instance and the value is a list"
-                       " of the paths to the files that were found."
+                       " of the paths to the files that were found. With stream=true the results are sent as NDJSON,"
+                       " one line per batch of paths of an instance."
+    },
+    {
+        "name": "search",
+        "description": "This methode allows the user to search all the Minio instances with a filter combining tags, "
+                       "file extension, content type, size, last modified date and path prefix. The filter is a JSON "
+                       "object such as {\"and\": [{\"tags\": {\"k\": \"v\"}}, {\"not\": {\"extension\": \"csv\"}}, "
+                       "{\"size\": {\"min\": 0, \"max\": 1024}}, {\"last_modified\": {\"from\": \"2024-01-01\"}}, "
+                       "{\"prefix\": \"dataspace/\"}]}, with and, or and not combining the criteria. With "
+                       "live=true the instances are listed directly instead of using the catalog, and the response "
+                       "also holds the status of every instance, so the results of the instances that answered in time "
+                       "are returned even when others failed or timed out. This methode receives a dictionary, where "
+                       "the key is the Minio instance and the value is a list of the paths to the files that were "
+                       "found."
     },
     {
         "name": "get_all_objects",
         "description": "This methode allows the user to get all the objects from all instances "
                        "This methode receives a dictionary, where the key is the Minio instance and the value is a list"
-                       " of the paths to the files that were found."
+                       " of the paths to the files that were found. With stream=true the results are sent as NDJSON,"
+                       " one line per batch of paths of an instance. With a limit the objects of all instances are "
+                       "listed one page at a time, ordered by path, and the returned continuation_token is passed "
+                       "back to get the next page."
     },
     {
         "name": "put_object",
@@ -64,10 +88,49 @@ tags_metadata = [
         "description": "This methode allows the user to get a shared link to download the required file."
                        ". This methode receives the db client url and the dataset name."
     },
+    {
+        "name": "pool_stats",
+        "description": "This methode allows the user to see the usage of the load balancer's worker pools and of "
+                       "the HTTP connection pools kept for every Minio instance. This methode doesn't receive any data."
+    },
+    {
+        "name": "metrics",
+        "description": "This methode exposes the load balancer's own metrics in the Prometheus text format: requests "
+                       "and latency per endpoint, operations and latency per Minio instance, health and circuit "
+                       "breaker state, uploaded bytes, placement decisions, cache hit ratios, pool usage and the HTTP "
+                       "and subprocess calls made. This methode doesn't receive any data."
+    },
+    {
+        "name": "site_stats",
+        "description": "This methode allows the user to see, for every Minio instance, whether it passes the health "
+                       "checks and the state of its circuit breaker (closed, open or half_open), with the reason it "
+                       "was opened and the recent latency. This methode doesn't receive any data."
+    },
+    {
+        "name": "cache_stats",
+        "description": "This methode allows the user to see the hits, misses and size of the search result cache. "
+                       "This methode doesn't receive any data."
+    },
+    {
+        "name": "rebalance",
+        "description": "This methode starts a round of the rebalancer right away, moving objects from the fullest "
+                       "Minio instances to the emptiest ones, and returns its progress. GET /rebalance_stats returns "
+                       "the progress of the current or last round: the planned, moved, skipped and failed objects, "
+                       "the bytes transferred and the moves in progress. These methodes don't receive any data."
+    },
+    {
+        "name": "download_dataset",
+        "description": "This methode allows the user to download a dataset through the load balancer. The methode "
+                       "receives the Minio instance alias and the dataset path, and supports the Range and "
+                       "If-None-Match headers."
+    },
     {
         "name": "get_all_objects_with_details",
         "description": "This methode allows the user to get all the datasets and their corresponding metadata and tags."
-                       ". This methode doesn't receive any data."
+                       ". This methode optionally receives an offset and a limit to page through the datasets, the "
+                       "total number of datasets is returned in the X-Total-Count header and the status of every "
+                       "instance in the X-Site-Status header. With stream=true the datasets are sent as NDJSON, one "
+                       "line per dataset."
     }
 ]
 
@@ -91,6 +154,39 @@ app.add_middleware(
 minio_instance = None
 
 
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    start = time.monotonic()
+    try:
+        with tracing.span(f"{request.method} {request.url.path}", root=tracing.enabled(),
+                          method=request.method, path=request.url.path) as root:
+            response = await call_next(request)
+            if root is not None and settings.SERVER_TIMING:
+                response.headers["Server-Timing"] = tracing.server_timing(root)
+    except BaseException:
+        observe_request(request, 500, start)
+        raise
+
+    # The body of a streamed response is still being produced here, so the request is timed until it was sent
+    response.body_iterator = observe_body(response.body_iterator, request, response.status_code, start)
+    return response
+
+
+async def observe_body(body: AsyncIterator, request: Request, response_status: int, start: float):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        observe_request(request, response_status, start)
+
+
+def observe_request(request: Request, response_status: int, start: float):
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    metrics.REQUESTS.inc(method=request.method, endpoint=endpoint, status=str(response_status))
+    metrics.REQUEST_DURATION.observe(time.monotonic() - start, method=request.method, endpoint=endpoint)
+
+
 def init():
     operating_system = platform.system()
     if operating_system == 'Windows':
@@ -120,8 +216,8 @@ def init():
 async def add_instances(servers: Servers):
     if len(servers.servers) > 0:
         global minio_instance
-        if isinstance(minio_instance, MinIO):
-            result = minio_instance.add_instances(servers.servers)
+        if isinstance(minio_instance, AsyncMinIO):
+            result = await minio_instance.add_instances(servers.servers)
             if len(result) == 0:
                 return {"message": "Added instances successfully!"}
             else:
@@ -140,8 +236,8 @@ async def add_instances(servers: Servers):
 async def add_instance(instance: Instance):
     if len(instance.url) > 0 and len(instance.token) > 0:
         global minio_instance
-        if isinstance(minio_instance, MinIO):
-            result = minio_instance.add_instances([{
+        if isinstance(minio_instance, AsyncMinIO):
+            result = await minio_instance.add_instances([{
                 'url': instance.url,
                 'token': instance.token,
                 'access_key': instance.access_key,
@@ -161,10 +257,13 @@ async def add_instance(instance: Instance):
 
 
 @app.post("/search_by_tags", status_code=200, tags=["search_by_tags"])
-async def search_by_tags(tags: Tags):
+async def search_by_tags(tags: Tags, stream: bool = False):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        return minio_instance.search_by_tags(tags.tags)
+    if isinstance(minio_instance, AsyncMinIO):
+        if stream:
+            return StreamingResponse(ndjson(minio_instance.stream_by_tags(tags.tags)),
+                                     media_type="application/x-ndjson")
+        return await minio_instance.search_by_tags(tags.tags)
     else:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -173,10 +272,13 @@ async def search_by_tags(tags: Tags):
 
 
 @app.post("/search_by_extension", tags=["search_by_extension"])
-async def search_by_extension(extension: Extension):
+async def search_by_extension(extension: Extension, stream: bool = False):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        return minio_instance.search_by_file_extension(extension.extension)
+    if isinstance(minio_instance, AsyncMinIO):
+        if stream:
+            return StreamingResponse(ndjson(minio_instance.stream_by_file_extension(extension.extension)),
+                                     media_type="application/x-ndjson")
+        return await minio_instance.search_by_file_extension(extension.extension)
     else:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -185,10 +287,31 @@ async def search_by_extension(extension: Extension):
 
 
 @app.post("/search_by_content_type", tags=["search_by_content_type"])
-async def search_by_content_type(content_type: ContentType):
+async def search_by_content_type(content_type: ContentType, stream: bool = False):
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        if stream:
+            return StreamingResponse(ndjson(minio_instance.stream_by_content_type(content_type.content_type)),
+                                     media_type="application/x-ndjson")
+        return await minio_instance.search_by_content_type(content_type.content_type)
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+@app.post("/search", tags=["search"])
+async def search(query: Search):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        return minio_instance.search_by_content_type(content_type.content_type)
+    if isinstance(minio_instance, AsyncMinIO):
+        try:
+            if query.live:
+                results, sites = await minio_instance.search_live(query.filter)
+                return {"results": results, "sites": sites}
+            return await minio_instance.search(query.filter)
+        except ValueError as e:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=f'Invalid filter: {e}')
     else:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -197,10 +320,22 @@ async def search_by_content_type(content_type: ContentType):
 
 
 @app.get("/get_all_objects", tags=["get_all_objects"])
-async def get_all_objects():
+async def get_all_objects(stream: bool = False, limit: Optional[int] = None,
+                          continuation_token: Optional[str] = None):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        return minio_instance.get_all_objects()
+    if isinstance(minio_instance, AsyncMinIO):
+        if limit is not None:
+            if limit < 1:
+                return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content="The limit must be positive")
+            try:
+                objects, next_token = await minio_instance.list_objects_page(limit, continuation_token)
+            except ValueError:
+                return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content="Invalid continuation token")
+            return {"objects": objects, "continuation_token": next_token}
+        if stream:
+            return StreamingResponse(ndjson(minio_instance.stream_all_objects()),
+                                     media_type="application/x-ndjson")
+        return await minio_instance.get_all_objects()
     else:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -208,39 +343,157 @@ async def get_all_objects():
         )
 
 @app.get("/get_all_objects_with_details", tags=["get_all_objects_with_details"])
-async def get_all_objects():
+async def get_all_objects_with_details(offset: int = 0, limit: Optional[int] = None, stream: bool = False):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        datasets_with_details = []
-        datasets = minio_instance.get_all_objects()
-        for entry in datasets:
+    if isinstance(minio_instance, AsyncMinIO):
+        if offset < 0:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content="The offset must not be negative")
+        if limit is not None and limit < 1:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content="The limit must be positive")
+
+        datasets = []
+        for entry in await minio_instance.get_all_objects():
             for key in entry:
                 for dataset in entry[key]:
-                    if "/" in dataset:
-                        if "jsonld" in dataset.lower():
-                            metadata = minio_instance.get_dataset_metadata(key, dataset)
-                            tags     = minio_instance.get_dataset_tags(key, dataset)
-                            if metadata != "failed" and tags != "failed":
-                                dataset_with_details = {
-                                    "name": dataset.split("/")[-1],
-                                    "metadata": {
-                                        "MetaAccess": metadata[
-                                            'X-Amz-Meta-Access'] if 'X-Amz-Meta-Access' in metadata else None,
-                                        "MetaDownload": metadata[
-                                            'X-Amz-Meta-Download'] if 'X-Amz-Meta-Download' in metadata else None,
-                                        "MetaUploadDate": metadata[
-                                            'X-Amz-Meta-Uploaddate'] if 'X-Amz-Meta-Uploaddate' in metadata else None,
-                                        "MetaTagCount":metadata[
-                                        'X-Amz-Tagging-Count'] if 'X-Amz-Tagging-Count' in metadata else None,
-                                        "Source": key
-                                    },
-                                    "tags": tags
-                                }
-                                datasets_with_details.append(dataset_with_details)
+                    if "/" in dataset and "jsonld" in dataset.lower():
+                        datasets.append((key, dataset))
+
+        page = datasets[offset:] if limit is None else datasets[offset:offset + limit]
+
+        if stream:
+            async def stream_details():
+                # Datasets that were never read get a line with the status of their site instead of their details.
+                async for (key, dataset), details, unread in minio_instance.stream_datasets_details(page):
+                    if details is not None:
+                        yield dataset_with_details(key, dataset, details)
+                    elif unread is not None:
+                        yield {"name": dataset.split("/")[-1], "source": key, "status": unread}
+
+            return StreamingResponse(
+                ndjson(stream_details()),
+                media_type="application/x-ndjson",
+                headers={"X-Total-Count": str(len(datasets))}
+            )
+
+        datasets_with_details = []
+        page_details, unread, sites = await minio_instance.get_datasets_details(page)
+        for (key, dataset), details in zip(page, page_details):
+            if details is not None:
+                datasets_with_details.append(dataset_with_details(key, dataset, details))
+        # Datasets of sites that timed out or whose circuit breaker is open are left out, the response then says how
+        # many of them were never read.
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content=datasets_with_details
+            content=datasets_with_details,
+            headers={
+                "X-Total-Count": str(len(datasets)),
+                "X-Unread-Count": str(len(unread)),
+                "X-Partial": str(len(unread) > 0).lower(),
+                "X-Site-Status": ", ".join(f"{site}={site_status['status']}" for site, site_status in sites.items())
+            }
+        )
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+def dataset_with_details(key: str, dataset: str, details: dict) -> dict:
+    metadata = details["metadata"]
+    return {
+        "name": dataset.split("/")[-1],
+        "metadata": {
+            "MetaAccess": metadata[
+                'X-Amz-Meta-Access'] if 'X-Amz-Meta-Access' in metadata else None,
+            "MetaDownload": metadata[
+                'X-Amz-Meta-Download'] if 'X-Amz-Meta-Download' in metadata else None,
+            "MetaUploadDate": metadata[
+                'X-Amz-Meta-Uploaddate'] if 'X-Amz-Meta-Uploaddate' in metadata else None,
+            "MetaTagCount":metadata[
+            'X-Amz-Tagging-Count'] if 'X-Amz-Tagging-Count' in metadata else None,
+            "Source": key
+        },
+        "tags": details["tags"]
+    }
+
+
+async def ndjson(items: AsyncIterator) -> AsyncIterator[str]:
+    async for item in items:
+        yield json.dumps(item) + "\n"
+
+
+@app.get("/metrics", tags=["metrics"])
+async def get_metrics():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        return Response(minio_instance.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
         )
+
+
+@app.get("/site_stats", tags=["site_stats"])
+async def site_stats():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        return minio_instance.site_stats()
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+@app.get("/cache_stats", tags=["cache_stats"])
+async def cache_stats():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        return minio_instance.cache_stats()
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+@app.post("/rebalance", status_code=202, tags=["rebalance"])
+async def rebalance():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        stats = minio_instance.rebalance()
+        if stats['state'] == 'disabled':
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content='The rebalancer is disabled, it needs CATALOG_PATH to keep track of the objects it moves.'
+            )
+        return stats
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+@app.get("/rebalance_stats", tags=["rebalance"])
+async def rebalance_stats():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        return minio_instance.rebalance_stats()
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content='The Minio instance was not created.'
+        )
+
+
+@app.get("/pool_stats", tags=["pool_stats"])
+async def pool_stats():
+    global minio_instance
+    if isinstance(minio_instance, AsyncMinIO):
+        return minio_instance.pool_stats()
     else:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -251,8 +504,8 @@ async def get_all_objects():
 @app.post("/get_dataset", tags=["get_dataset"])
 async def get_dataset(dataset_searcher: DatasetSearcher):
     global minio_instance
-    if isinstance(minio_instance, MinIO):
-        dataset_link = minio_instance.get_dataset(dataset_searcher.url, dataset_searcher.name)
+    if isinstance(minio_instance, AsyncMinIO):
+        dataset_link = await minio_instance.get_dataset(dataset_searcher.url, dataset_searcher.name)
         if dataset_link == "failed":
             return JSONResponse(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -270,16 +523,96 @@ async def get_dataset(dataset_searcher: DatasetSearcher):
         )
 
 
+@app.get("/datasets/{site}/{name:path}/download", tags=["download_dataset"])
+async def download_dataset(site: str, name: str, range_header: Optional[str] = Header(None, alias="Range"),
+                     if_none_match: Optional[str] = Header(None)):
+    global minio_instance
+    if not isinstance(minio_instance, AsyncMinIO):
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED, content='The Minio instance was not created.'
+        )
+
+    stat = await minio_instance.stat_dataset(site, name)
+    if stat is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content='The dataset was not found.'
+        )
+
+    etag = f'"{stat.etag}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": stat.last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    }
+
+    if if_none_match is not None and (if_none_match.strip() == "*" or etag in [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        byte_range = parse_range(range_header, stat.size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{stat.size}"}
+        )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(stat.size)
+        return StreamingResponse(
+            minio_instance.download_dataset(site, name),
+            status_code=status.HTTP_200_OK,
+            media_type=stat.content_type,
+            headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+    return StreamingResponse(
+        minio_instance.download_dataset(site, name, start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=stat.content_type,
+        headers=headers
+    )
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    if range_header is None or not range_header.startswith("bytes="):
+        return None
+
+    ranges = range_header[len("bytes="):].split(",")
+    if len(ranges) != 1:
+        # Multipart byte ranges are not supported, send the whole dataset instead.
+        return None
+
+    first, _, last = ranges[0].strip().partition("-")
+    if first == "":
+        if not last.isdigit() or int(last) == 0 or size == 0:
+            raise ValueError(range_header)
+        return max(size - int(last), 0), size - 1
+
+    if not first.isdigit() or (last != "" and not last.isdigit()):
+        return None
+    start = int(first)
+    end = size - 1 if last == "" else min(int(last), size - 1)
+    if start >= size or start > end:
+        raise ValueError(range_header)
+
+    return start, end
+
+
 @app.put("/put_object", status_code=201, tags=["put_object"])
-async def put_object(file: Annotated[bytes, File()], file_name: Annotated[str, Form()],
+async def put_object(file: UploadFile, file_name: Annotated[str, Form()],
                      tags: Optional[str] = Form(None)):
     global minio_instance
-    file_size = len(file)
+    file_size = file.size
     tags = json.loads(tags) if tags is not None else json.loads('{}')
-    if isinstance(minio_instance, MinIO):
-        result, site = minio_instance.put_object((file, file_name), file_size, tags)
+    if isinstance(minio_instance, AsyncMinIO):
+        result, site = await minio_instance.put_object((file.file, file_name), file_size, tags)
         if result is not None and site is not None:
-            return {f"Uploaded file {file} to {result} on client {site}"}
+            return {f"Uploaded file {file_name} to {result} on client {site}"}
         else:
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -295,8 +628,8 @@ async def put_object(file: Annotated[bytes, File()], file_name: Annotated[str, F
 async def upload_object(file: UploadFile, tags: Optional[str] = Form(None)):
     global minio_instance
     tags = json.loads(tags) if tags is not None else json.loads('{}')
-    if isinstance(minio_instance, MinIO):
-        result, site = minio_instance.upload_object(file, tags)
+    if isinstance(minio_instance, AsyncMinIO):
+        result, site = await minio_instance.upload_object(file, tags)
         if result is not None and site is not None:
             return {f"Uploaded file {file} to {result} on client {site}"}
         else:
@@ -313,6 +646,6 @@ async def upload_object(file: UploadFile, tags: Optional[str] = Form(None)):
 if __name__ == '__main__':
     init()
 
-    minio_instance = MinIO()
+    minio_instance = AsyncMinIO(MinIO())
 
     uvicorn.run(app, host="0.0.0.0", port=8000)
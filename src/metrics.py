@@ -0,0 +1,160 @@
+import bisect
+import math
+import threading
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = dict(self.values)
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}' for key, value in sorted(values.items())]
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} expects the labels {", ".join(self.labels)}')
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+# Totals counted elsewhere, such as the pool and cache statistics, copied in when the metrics are scraped
+class SampledCounter(Metric):
+    kind = 'counter'
+
+    def sample(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, totals = self.histograms.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            totals[0] += value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            histograms = {key: (list(counts), totals[0]) for key, (counts, totals) in self.histograms.items()}
+
+        lines = []
+        for key, (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labels + ("le",), key + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.description}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if len(names) == 0:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for v in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+REQUESTS = Counter('balancer_requests_total', 'Requests handled by the balancer.', ('method', 'endpoint', 'status'))
+REQUEST_DURATION = Histogram('balancer_request_duration_seconds', 'Time spent handling a request.',
+                             ('method', 'endpoint'))
+SITE_OPERATIONS = Counter('balancer_site_operations_total', 'Operations sent to a Minio instance.',
+                          ('site', 'operation', 'outcome'))
+SITE_OPERATION_DURATION = Histogram('balancer_site_operation_duration_seconds',
+                                    'Duration of the operations sent to a Minio instance.', ('site', 'operation'))
+SITE_HEALTHY = Gauge('balancer_site_healthy', 'Whether a Minio instance passes the health checks.', ('site',))
+SITE_BREAKER = Gauge('balancer_site_breaker_state', 'Circuit breaker state of a Minio instance.', ('site', 'state'))
+SITE_FREE_BYTES = Gauge('balancer_site_free_bytes', 'Last scraped free space of a Minio instance.', ('site',))
+UPLOAD_BYTES = Counter('balancer_upload_bytes_total', 'Bytes uploaded to a Minio instance.', ('site',))
+UPLOAD_SECONDS = Counter('balancer_upload_seconds_total',
+                         'Time spent uploading to a Minio instance, rate(bytes) / rate(seconds) gives the throughput.',
+                         ('site',))
+PLACEMENTS = Counter('balancer_placement_decisions_total', 'Instances chosen for uploads, none when no instance fit.',
+                     ('site', 'strategy'))
+REPLICATED_WRITES = Counter('balancer_replicated_writes_total',
+                            'Uploads by whether their write quorum was reached, or no_placement when too few '
+                            'instances fit, and background_failed for every replica failing after the upload was '
+                            'answered.', ('outcome',))
+REPLICA_READS = Counter('balancer_replica_reads_total',
+                        'Reads answered by a replica, fallback is true when an earlier replica failed.',
+                        ('site', 'operation', 'fallback'))
+REBALANCE_MOVES = Counter('balancer_rebalance_moves_total', 'Objects the rebalancer moved, skipped or failed to move.',
+                          ('outcome',))
+REBALANCE_BYTES = Counter('balancer_rebalance_bytes_total', 'Bytes streamed between instances by the rebalancer.',
+                          ('source', 'target'))
+CACHE_HITS = SampledCounter('balancer_cache_hits_total', 'Cache lookups answered from memory.', ('cache',))
+CACHE_MISSES = SampledCounter('balancer_cache_misses_total', 'Cache lookups that had to be computed.', ('cache',))
+CACHE_HIT_RATIO = Gauge('balancer_cache_hit_ratio', 'Share of the cache lookups answered from memory.', ('cache',))
+POOL_SIZE = Gauge('balancer_pool_size', 'Threads of a worker pool.', ('pool',))
+POOL_QUEUED = Gauge('balancer_pool_queued', 'Tasks waiting for a thread of a worker pool.', ('pool',))
+POOL_ACTIVE = Gauge('balancer_pool_active', 'Tasks running on a worker pool.', ('pool',))
+POOL_COMPLETED = SampledCounter('balancer_pool_completed_total', 'Tasks completed by a worker pool.', ('pool',))
+HTTP_POOL_CONNECTIONS = Gauge('balancer_http_pool_connections', 'Connections opened to a Minio instance.', ('site',))
+HTTP_POOL_IN_USE = Gauge('balancer_http_pool_in_use', 'Connections to a Minio instance in use.', ('site',))
+HTTP_POOL_REQUESTS = SampledCounter('balancer_http_pool_requests_total', 'HTTP requests sent to a Minio instance.',
+                             ('site',))
+HTTP_CALLS = Counter('balancer_http_calls_total', 'Health checks and metrics scrapes sent to a Minio instance.',
+                     ('site', 'call', 'outcome'))
+SUBPROCESS_CALLS = Counter('balancer_subprocess_calls_total', 'External commands run by the balancer.',
+                           ('command', 'outcome'))
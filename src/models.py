@@ -24,6 +24,11 @@ class Extension(BaseModel):
 class ContentType(BaseModel):
     content_type: str
 
+class Search(BaseModel):
+    filter: dict
+    live: bool = False
+
+
 class DatasetSearcher(BaseModel):
     url: str
     name: str
@@ -39,4 +44,4 @@ class Metadata(BaseModel):
     MetaAccess: str | None = ""
     MetaDownload: str | None = ""
     MetaUploadDate: str | None = ""
-    MetaTagCount: str | None =
+    MetaTagCount: str | None = ""
@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from concurrent.futures import wait
+from typing import BinaryIO, Dict, List
+
+from minio import Minio
+from minio.commonconfig import Tags
+from minio.datatypes import Part
+from minio.helpers import ObjectWriteResult, genheaders
+
+import settings
+import tracing
+from pools import WorkerPool
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_COUNT = 10000
+
+
+class MultipartUploader:
+    # Sends the parts of an upload in parallel, which Minio.put_object does not. It calls the client's private
+    # _create_multipart_upload, _upload_part, _complete_multipart_upload and _abort_multipart_upload, so minio is
+    # pinned in requirements.txt and tests/test_multipart.py has to pass before the pin is moved.
+
+    def __init__(self, part_size: int, parallelism: int, retries: int, pool: WorkerPool):
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.parallelism = max(parallelism, 1)
+        self.retries = retries
+        self.pool = pool
+
+    def upload(self, client: Minio, bucket: str, object_name: str, data: BinaryIO, length: int,
+               content_type: str | None, tags: Tags | None = None,
+               metadata: Dict[str, str] | None = None) -> ObjectWriteResult:
+        part_size = max(self.part_size, math.ceil(length / MAX_PART_COUNT))
+        if length <= part_size:
+            return client.put_object(bucket, object_name, data, length, content_type or 'application/octet-stream',
+                                     metadata=metadata, tags=tags)
+
+        headers = genheaders(metadata, None, tags, None, False)
+        headers['Content-Type'] = content_type or 'application/octet-stream'
+        upload_id = client._create_multipart_upload(bucket, object_name, headers)
+
+        # At most `parallelism` parts of this upload are read into memory at once.
+        slots = threading.Semaphore(self.parallelism)
+        futures = []
+        try:
+            part_count = math.ceil(length / part_size)
+            for part_number in range(1, part_count + 1):
+                size = min(part_size, length - (part_number - 1) * part_size)
+                slots.acquire()
+                try:
+                    part_data = self.__read(data, size)
+                except BaseException:
+                    slots.release()
+                    raise
+                future = self.pool.submit(
+                    self.__upload_part, client, bucket, object_name, upload_id, part_number, part_data, slots)
+                futures.append(future)
+
+                failed = [f for f in futures if f.done() and f.exception() is not None]
+                if len(failed) > 0:
+                    failed[0].result()
+
+            parts: List[Part] = [future.result() for future in futures]
+            result = client._complete_multipart_upload(bucket, object_name, upload_id, parts)
+        except BaseException:
+            wait(futures)
+            try:
+                client._abort_multipart_upload(bucket, object_name, upload_id)
+            except Exception as e:
+                print(f'Could not abort the upload of {bucket}/{object_name}: {e}')
+            raise
+
+        return ObjectWriteResult(result.bucket_name, result.object_name, result.version_id, result.etag,
+                                 result.http_headers, location=result.location)
+
+    def __upload_part(self, client: Minio, bucket: str, object_name: str, upload_id: str, part_number: int,
+                      part_data: bytes, slots: threading.Semaphore) -> Part:
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    with tracing.span('upload_part', part_number=part_number, attempt=attempt):
+                        etag = client._upload_part(bucket, object_name, part_data, None, upload_id, part_number)
+                    return Part(part_number, etag)
+                except Exception:
+                    if attempt == self.retries:
+                        raise
+                    time.sleep(settings.UPLOAD_RETRY_BACKOFF * 2 ** attempt)
+        finally:
+            slots.release()
+
+    @staticmethod
+    def __read(data: BinaryIO, size: int) -> bytes:
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = data.read(remaining)
+            if not chunk:
+                raise IOError(f'stream ended {remaining} bytes before the expected {size} bytes')
+            chunks.append(chunk)
+            remaining -= len(chunk)
+
+        return b''.join(chunks)
@@ -0,0 +1,157 @@
+import threading
+from typing import Any, Dict
+from urllib.parse import unquote_plus, urlsplit
+
+import urllib3
+from minio import Minio
+from minio.error import S3Error
+
+import settings
+from catalog import Catalog
+from search_engine import SearchEngine
+
+EVENTS = ('s3:ObjectCreated:*', 's3:ObjectRemoved:*')
+
+
+class StreamEnded(Exception):
+    pass
+
+
+class NotificationStreams(urllib3.PoolManager):
+    # The http_client of a listener's Minio client. The client reopens a dropped notification stream by itself, that
+    # second request is refused here so the listener notices the gap, resyncs and listens again. The open streams are
+    # kept so that stopping the listener can interrupt the reads blocked on them.
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.local = threading.local()
+        self.streams: Dict[int, urllib3.BaseHTTPResponse] = {}
+        self.streams_lock = threading.Lock()
+        self.closed = False
+
+    def urlopen(self, method: str, url: str, redirect: bool = True, **kwargs) -> urllib3.BaseHTTPResponse:
+        stream = 'events=' in urlsplit(url).query
+        if stream and getattr(self.local, 'opened', False):
+            raise StreamEnded('the notification stream ended')
+
+        response = super().urlopen(method, url, redirect=redirect, **kwargs)
+        if stream:
+            self.local.opened = True
+            with self.streams_lock:
+                self.streams[threading.get_ident()] = response
+                closed = self.closed
+            if closed:
+                self.__interrupt(response)
+        return response
+
+    def finished(self):
+        # Called by a listener thread once its stream is done, the next one may be opened.
+        self.local.opened = False
+        with self.streams_lock:
+            self.streams.pop(threading.get_ident(), None)
+
+    def close(self):
+        with self.streams_lock:
+            self.closed = True
+            streams = list(self.streams.values())
+        for response in streams:
+            self.__interrupt(response)
+
+    @staticmethod
+    def __interrupt(response: urllib3.BaseHTTPResponse):
+        # shutdown() wakes a read blocked in another thread, close() alone would wait for the next keepalive.
+        try:
+            if hasattr(response, 'shutdown'):
+                response.shutdown()
+            response.close()
+        except Exception:
+            pass
+
+
+class SiteListener:
+
+    def __init__(self, site: str, client: Minio, streams: NotificationStreams, catalog: Catalog,
+                 search_engine: SearchEngine):
+        self.site = site
+        self.client = client
+        self.streams = streams
+        self.catalog = catalog
+        self.search_engine = search_engine
+        self.buckets: Dict[str, threading.Thread] = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__watch_buckets, name=f'listener-{site}', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.streams.close()
+
+    def alive(self) -> bool:
+        return self.thread.is_alive() or any(thread.is_alive() for thread in list(self.buckets.values()))
+
+    def __watch_buckets(self):
+        while not self.stopped.is_set():
+            try:
+                for bucket in self.client.list_buckets():
+                    if bucket.name not in self.buckets:
+                        thread = threading.Thread(target=self.__listen, args=(bucket.name,),
+                                                  name=f'listener-{self.site}-{bucket.name}', daemon=True)
+                        self.buckets[bucket.name] = thread
+                        thread.start()
+            except Exception as e:
+                print(f'Could not list buckets of {self.site}: {e}')
+
+            self.stopped.wait(settings.LISTENER_BUCKET_POLL_INTERVAL)
+
+    def __listen(self, bucket: str):
+        # Every stream but the first one starts with a resync of the bucket, the first one follows the initial index.
+        # Events sent in between are only lost until that resync.
+        resync = False
+        while not self.stopped.is_set():
+            try:
+                if resync:
+                    self.__resync(bucket)
+                resync = True
+                with self.client.listen_bucket_notification(bucket, events=EVENTS) as events:
+                    for event in events:
+                        if self.stopped.is_set():
+                            return
+                        for record in event['Records']:
+                            self.__apply(record)
+            except StreamEnded:
+                continue
+            except Exception as e:
+                if self.stopped.is_set():
+                    return
+                print(f'Lost notifications from {self.site}/{bucket}: {e}')
+                self.stopped.wait(settings.LISTENER_RETRY_INTERVAL)
+            finally:
+                self.streams.finished()
+
+    def __resync(self, bucket: str):
+        self.catalog.replace_site(self.site, self.search_engine.describe(self.site, bucket), f'{bucket}/')
+
+    def __apply(self, record: Dict[str, Any]):
+        bucket = record['s3']['bucket']['name']
+        name = unquote_plus(record['s3']['object']['key'])
+        path = f'{bucket}/{name}'
+
+        if record['eventName'].startswith('s3:ObjectRemoved:') and 'Tagging' not in record['eventName']:
+            self.catalog.remove(self.site, path)
+            return
+
+        try:
+            entry = self.search_engine.describe_object(self.site, bucket, name)
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                self.catalog.remove(self.site, path)
+            else:
+                print(f'Could not describe {self.site}/{path}: {e}')
+            return
+        except Exception as e:
+            print(f'Could not describe {self.site}/{path}: {e}')
+            return
+
+        self.catalog.put(self.site, path, entry['size'], entry['content_type'], entry['tags'], entry['last_modified'])
@@ -0,0 +1,59 @@
+import base64
+import heapq
+import itertools
+import json
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+def encode_token(cursors: Dict[str, Tuple[str, str] | None], last: Tuple[str, str]) -> str:
+    token = json.dumps({'sites': cursors, 'last': last}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('utf-8')
+
+
+def decode_token(token: str | None) -> (Dict[str, Tuple[str, str] | None], Tuple[str, str] | None):
+    if not token:
+        return {}, None
+
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode('utf-8')).decode('utf-8'))
+        cursors = {site: None if cursor is None else (cursor[0], cursor[1])
+                   for site, cursor in decoded['sites'].items()}
+        last = (decoded['last'][0], decoded['last'][1])
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        raise ValueError('invalid continuation token')
+
+    return cursors, last
+
+
+def paginate(sites: List[str], iterate: Callable[[str, Tuple[str, str] | None], Iterator[Tuple[str, str]]],
+             limit: int, token: str | None = None) -> (List[Dict[str, str]], str | None):
+    cursors, last = decode_token(token)
+    if token is None:
+        cursors = {site: None for site in sites}
+
+    # Every site resumes after the last key it contributed, or from the start when it contributed none yet, so its
+    # copy of a key that another site's copy ended the page with comes on the next page. A site that joined since
+    # the first page resumes after the last key of the whole page. The sites' listings are only read as far as the
+    # page needs.
+    streams = [_site_stream(site, iterate(site, cursors[site] if site in cursors else last)) for site in sites]
+    merged = heapq.merge(*streams)
+
+    page = list(itertools.islice(merged, limit))
+    more = next(merged, None) is not None
+
+    for site in sites:
+        cursors.setdefault(site, last)
+    for bucket, key, site in page:
+        cursors[site] = (bucket, key)
+        last = (bucket, key)
+
+    objects = [{'site': site, 'path': f'{bucket}/{key}'} for bucket, key, site in page]
+    return objects, encode_token(cursors, last) if more and last is not None else None
+
+
+def _site_stream(site: str, iterator: Iterator[Tuple[str, str]]) -> Iterator[Tuple[str, str, str]]:
+    try:
+        for bucket, key in iterator:
+            yield bucket, key, site
+    except Exception as e:
+        print(f'Could not list {site}: {e}')
@@ -0,0 +1,169 @@
+import bisect
+import contextlib
+import hashlib
+import random
+import threading
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class Inflight:
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def track(self, site: str) -> Iterator[None]:
+        with self.lock:
+            self.counts[site] = self.counts.get(site, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.counts[site] -= 1
+
+    def get(self, site: str) -> int:
+        return self.counts.get(site, 0)
+
+
+class PlacementStrategy:
+
+    def __init__(self, inflight: Inflight):
+        self.inflight = inflight
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        raise NotImplementedError
+
+    def choose_many(self, free: Dict[str, float], object_name: str, count: int) -> List[str]:
+        free = dict(free)
+        chosen = []
+        while len(chosen) < count:
+            site = self.choose(free, object_name)
+            if site is None:
+                break
+            chosen.append(site)
+            del free[site]
+
+        return chosen
+
+
+class MaxFreeSpace(PlacementStrategy):
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        if len(free) == 0:
+            return None
+
+        return max(free, key=free.get)
+
+
+class WeightedRandom(PlacementStrategy):
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        if len(free) == 0:
+            return None
+
+        sites = list(free.keys())
+        return random.choices(sites, weights=[max(free[site], 0) + 1 for site in sites])[0]
+
+
+class LeastInflight(PlacementStrategy):
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        if len(free) == 0:
+            return None
+
+        return min(free, key=lambda site: (self.inflight.get(site), -free[site]))
+
+
+class PowerOfTwoChoices(PlacementStrategy):
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        if len(free) == 0:
+            return None
+
+        sites = random.sample(list(free.keys()), min(2, len(free)))
+        return min(sites, key=lambda site: (self.inflight.get(site), -free[site]))
+
+
+class ConsistentHashing(PlacementStrategy):
+
+    replicas = 100
+
+    def __init__(self, inflight: Inflight):
+        super().__init__(inflight)
+        self.rings: Dict[Tuple[str, ...], List[Tuple[int, str]]] = {}
+
+    def choose(self, free: Dict[str, float], object_name: str) -> str | None:
+        if len(free) == 0:
+            return None
+
+        ring = self.__ring(tuple(sorted(free.keys())))
+        index = bisect.bisect(ring, (self.__hash(object_name), ''))
+        return ring[index % len(ring)][1]
+
+    def choose_many(self, free: Dict[str, float], object_name: str, count: int) -> List[str]:
+        # The replicas are the next distinct sites clockwise, so an object keeps its replicas when sites are added.
+        if len(free) == 0:
+            return []
+
+        ring = self.__ring(tuple(sorted(free.keys())))
+        index = bisect.bisect(ring, (self.__hash(object_name), ''))
+        chosen = []
+        for i in range(len(ring)):
+            site = ring[(index + i) % len(ring)][1]
+            if site not in chosen:
+                chosen.append(site)
+                if len(chosen) == min(count, len(free)):
+                    break
+
+        return chosen
+
+    def __ring(self, sites: Tuple[str, ...]) -> List[Tuple[int, str]]:
+        ring = self.rings.get(sites)
+        if ring is None:
+            ring = sorted((self.__hash(f'{site}#{i}'), site) for site in sites for i in range(self.replicas))
+            self.rings = {sites: ring}
+
+        return ring
+
+    @staticmethod
+    def __hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class ReplicaSelector:
+    # Orders the replicas of an object for reading: the less loaded of two random replicas first, by in-flight
+    # requests and average latency, then the others from the least to the most loaded.
+
+    def __init__(self, inflight: Inflight, latency: Callable[[str], float | None]):
+        self.inflight = inflight
+        self.latency = latency
+
+    def order(self, sites: List[str]) -> List[str]:
+        if len(sites) < 2:
+            return list(sites)
+
+        scores = {site: self.__score(site) for site in sites}
+        first = min(random.sample(sites, 2), key=scores.get)
+        return [first] + sorted((site for site in sites if site != first), key=scores.get)
+
+    def __score(self, site: str) -> Tuple[float, int]:
+        # A replica without a measured latency scores 0, so it is tried and measured.
+        inflight = self.inflight.get(site)
+        return (inflight + 1) * (self.latency(site) or 0.0), inflight
+
+
+STRATEGIES = {
+    'max_free_space': MaxFreeSpace,
+    'weighted_random': WeightedRandom,
+    'least_inflight': LeastInflight,
+    'power_of_two_choices': PowerOfTwoChoices,
+    'consistent_hashing': ConsistentHashing
+}
+
+
+def create_strategy(name: str, inflight: Inflight) -> PlacementStrategy:
+    if name not in STRATEGIES:
+        raise ValueError(f'Unknown placement strategy {name}, expected one of {", ".join(STRATEGIES)}')
+
+    return STRATEGIES[name](inflight)
@@ -0,0 +1,115 @@
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import certifi
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+import settings
+import tracing
+
+
+class WorkerPool(ThreadPoolExecutor):
+
+    def __init__(self, name: str, size: int):
+        super().__init__(max_workers=size, thread_name_prefix=name)
+        self.name = name
+        self.size = size
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.stats_lock = threading.Lock()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        with self.stats_lock:
+            self.queued += 1
+        # Tasks run in the submitter's context, so their spans belong to the request that queued them.
+        context = contextvars.copy_context()
+        future = super().submit(context.run, self.__track, functools.partial(fn, *args, **kwargs), time.time_ns())
+        future.add_done_callback(self.__cancelled)
+        return future
+
+    def __cancelled(self, future: Future):
+        # A task cancelled before it started never reaches __track.
+        if future.cancelled():
+            with self.stats_lock:
+                self.queued -= 1
+
+    def __track(self, fn: Callable, submitted: int) -> Any:
+        with self.stats_lock:
+            self.queued -= 1
+            self.active += 1
+        tracing.record('queue', submitted, time.time_ns(), pool=self.name)
+        try:
+            return fn()
+        finally:
+            with self.stats_lock:
+                self.active -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self.stats_lock:
+            return {'size': self.size, 'queued': self.queued, 'active': self.active, 'completed': self.completed}
+
+
+class HttpPools:
+
+    def __init__(self, size: int):
+        self.size = size
+        self.sessions: Dict[str, requests.Session] = {}
+        self.managers: Dict[str, urllib3.PoolManager] = {}
+        self.lock = threading.Lock()
+
+    def session(self, site: str) -> requests.Session:
+        with self.lock:
+            if site not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[site] = session
+            return self.sessions[site]
+
+    def manager(self, site: str) -> urllib3.PoolManager:
+        with self.lock:
+            if site not in self.managers:
+                self.managers[site] = urllib3.PoolManager(**manager_options(self.size))
+            return self.managers[site]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            managers = {site: [manager] for site, manager in self.managers.items()}
+            for site, session in self.sessions.items():
+                managers.setdefault(site, []).extend(
+                    adapter.poolmanager for adapter in set(session.adapters.values()))
+
+        stats = {}
+        for site, site_managers in managers.items():
+            site_stats = {'size': self.size, 'connections': 0, 'in_use': 0, 'requests': 0}
+            for manager in site_managers:
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    if pool is None:
+                        continue
+                    site_stats['connections'] += pool.num_connections
+                    site_stats['in_use'] += pool.pool.maxsize - pool.pool.qsize() if pool.pool is not None else 0
+                    site_stats['requests'] += pool.num_requests
+            stats[site] = site_stats
+
+        return stats
+
+
+def manager_options(size: int) -> Dict[str, Any]:
+    # Same settings as the Minio client's default http_client, with a configurable pool size.
+    return {
+        'timeout': urllib3.Timeout(connect=settings.HTTP_CONNECT_TIMEOUT, read=settings.HTTP_READ_TIMEOUT),
+        'maxsize': size,
+        'cert_reqs': 'CERT_REQUIRED',
+        'ca_certs': certifi.where(),
+        'retries': urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+    }
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from minio import Minio
+
+
+class PresignedUrlCache:
+
+    def __init__(self, expiry: int, refresh_margin: int, max_entries: int):
+        self.expiry = expiry
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.urls: OrderedDict[Tuple[str, str], Tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, site: str, client: Minio, path: str) -> str:
+        key = (site, path)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.urls.get(key)
+            if cached is not None and now < cached[1] - self.refresh_margin:
+                self.urls.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        bucket, object_name = path.split('/', 1)
+        url = client.presigned_get_object(bucket, object_name, expires=timedelta(seconds=self.expiry))
+
+        with self.lock:
+            self.urls[key] = (url, now + self.expiry)
+            self.urls.move_to_end(key)
+            while len(self.urls) > self.max_entries:
+                self.urls.popitem(last=False)
+
+        return url
+
+    def discard(self, site: str, path: str):
+        with self.lock:
+            self.urls.pop((site, path), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.urls),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups > 0 else 0.0
+            }
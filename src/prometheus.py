@@ -0,0 +1,144 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, NamedTuple, Set
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+
+@dataclass
+class SiteMetrics:
+    free_bytes: float | None = None
+    total_bytes: float | None = None
+    used_bytes: float | None = None
+    drives_online: int = 0
+    drives_offline: int = 0
+    requests_total: float = 0
+    requests_rate: float | None = None
+    servers: Set[str] = field(default_factory=set)
+
+
+CLUSTER_CAPACITY = {
+    'minio_cluster_capacity_usable_free_bytes': 'usable_free',
+    'minio_cluster_capacity_usable_total_bytes': 'usable_total',
+    'minio_cluster_capacity_raw_free_bytes': 'raw_free',
+    'minio_cluster_capacity_raw_total_bytes': 'raw_total'
+}
+
+NODE_CAPACITY = {
+    'minio_node_disk_free_bytes': 'disk_free',
+    'minio_node_disk_total_bytes': 'disk_total',
+    'minio_node_disk_used_bytes': 'disk_used'
+}
+
+DRIVES_ONLINE = ('minio_cluster_drive_online_total', 'minio_cluster_disk_online_total')
+DRIVES_OFFLINE = ('minio_cluster_drive_offline_total', 'minio_cluster_disk_offline_total')
+REQUESTS = 'minio_s3_requests_total'
+
+
+def parse(lines: Iterable[str]) -> Iterator[Sample]:
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        brace = line.find('{')
+        space = line.find(' ')
+        if brace != -1 and (space == -1 or brace < space):
+            name = line[:brace]
+            try:
+                labels, end = _parse_labels(line, brace + 1)
+            except (ValueError, IndexError):
+                continue
+            rest = line[end:].split()
+        else:
+            name = line[:space] if space != -1 else line
+            labels = {}
+            rest = line[len(name):].split()
+
+        if len(rest) == 0:
+            continue
+        try:
+            value = float(rest[0])
+        except ValueError:
+            continue
+
+        yield Sample(name, labels, value)
+
+
+def _parse_labels(line: str, start: int) -> (Dict[str, str], int):
+    labels = {}
+    i = start
+    while i < len(line):
+        while i < len(line) and line[i] in ' ,':
+            i += 1
+        if i < len(line) and line[i] == '}':
+            return labels, i + 1
+
+        equals = line.index('=', i)
+        key = line[i:equals].strip()
+        i = line.index('"', equals) + 1
+        value = []
+        while line[i] != '"':
+            if line[i] == '\\':
+                i += 1
+                value.append({'n': '\n', '\\': '\\', '"': '"'}.get(line[i], line[i]))
+            else:
+                value.append(line[i])
+            i += 1
+        labels[key] = ''.join(value)
+        i += 1
+
+    return labels, i
+
+
+def aggregate(samples: Iterable[Sample]) -> SiteMetrics:
+    metrics = SiteMetrics()
+    cluster: Dict[str, float] = {}
+    nodes: Dict[str, float] = {}
+    online: Dict[str, float] = {}
+    offline: Dict[str, float] = {}
+
+    for sample in samples:
+        if math.isnan(sample.value):
+            continue
+        server = sample.labels.get('server')
+        if server is not None:
+            metrics.servers.add(server)
+
+        if sample.name in CLUSTER_CAPACITY:
+            # Every server reports the same cluster-wide figure, keep the largest one seen.
+            key = CLUSTER_CAPACITY[sample.name]
+            cluster[key] = max(cluster.get(key, 0), sample.value)
+        elif sample.name in NODE_CAPACITY:
+            key = NODE_CAPACITY[sample.name]
+            nodes[key] = nodes.get(key, 0) + sample.value
+        elif sample.name in DRIVES_ONLINE:
+            online[sample.name] = max(online.get(sample.name, 0), sample.value)
+        elif sample.name in DRIVES_OFFLINE:
+            offline[sample.name] = max(offline.get(sample.name, 0), sample.value)
+        elif sample.name == REQUESTS:
+            metrics.requests_total += sample.value
+
+    if 'usable_free' in cluster:
+        metrics.free_bytes = cluster['usable_free']
+        metrics.total_bytes = cluster.get('usable_total')
+    elif 'raw_free' in cluster:
+        metrics.free_bytes = cluster['raw_free']
+        metrics.total_bytes = cluster.get('raw_total')
+    elif 'disk_free' in nodes:
+        metrics.free_bytes = nodes['disk_free']
+        metrics.total_bytes = nodes.get('disk_total')
+
+    if metrics.total_bytes is not None and metrics.free_bytes is not None:
+        metrics.used_bytes = metrics.total_bytes - metrics.free_bytes
+    elif 'disk_used' in nodes:
+        metrics.used_bytes = nodes['disk_used']
+
+    metrics.drives_online = int(max(online.values(), default=0))
+    metrics.drives_offline = int(max(offline.values(), default=0))
+
+    return metrics
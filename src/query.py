@@ -0,0 +1,277 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Set, Tuple
+
+# Relative cost of checking a predicate against a listed object: tags need one request per object and the
+# content type may need a stat, everything else comes with the listing.
+LISTING_COST = 1
+STAT_COST = 5
+TAGS_COST = 10
+
+
+class Filter:
+    cost = LISTING_COST
+
+    def estimate(self, catalog) -> int | None:
+        # Upper bound of the matching objects when an index can answer the predicate, None otherwise.
+        return None
+
+    def prefix(self) -> str | None:
+        # A prefix every matching path starts with, used to narrow the listings.
+        return None
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        return {key for key in _universe(catalog, sites) if self.matches(key[1], catalog.entries[key])}
+
+
+class Tags(Filter):
+    cost = TAGS_COST
+
+    def __init__(self, tags: Dict[str, str]):
+        self.tags = tags
+
+    def estimate(self, catalog) -> int | None:
+        if len(self.tags) == 0:
+            return None
+        return min(len(catalog.tag_index.get(f'{k}={v}', ())) for k, v in self.tags.items())
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        tags = entry['tags']
+        return all(tags.get(k) == v for k, v in self.tags.items())
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        if len(self.tags) == 0:
+            return super().select(catalog, sites)
+        postings = sorted((catalog.tag_index.get(f'{k}={v}', set()) for k, v in self.tags.items()), key=len)
+        found = _in_sites(postings[0], sites)
+        for posting in postings[1:]:
+            found &= posting
+        return found
+
+
+class Extension(Filter):
+
+    def __init__(self, extension: str):
+        self.extension = extension.lower()
+
+    def estimate(self, catalog) -> int | None:
+        if '.' in self.extension:
+            return None
+        return len(catalog.extension_index.get(self.extension, ()))
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return path.split('/')[-1].lower().endswith(f'.{self.extension}')
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        if '.' in self.extension:
+            return super().select(catalog, sites)
+        return _in_sites(catalog.extension_index.get(self.extension, set()), sites)
+
+
+class ContentType(Filter):
+    cost = STAT_COST
+
+    def __init__(self, content_type: str):
+        self.content_type = content_type
+
+    def estimate(self, catalog) -> int | None:
+        return len(catalog.content_type_index.get(self.content_type, ()))
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return entry['content_type'] == self.content_type
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        return _in_sites(catalog.content_type_index.get(self.content_type, set()), sites)
+
+
+class Size(Filter):
+
+    def __init__(self, minimum: int | None, maximum: int | None):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        size = entry['size']
+        if size is None:
+            return False
+        return (self.minimum is None or size >= self.minimum) and (self.maximum is None or size <= self.maximum)
+
+
+class LastModified(Filter):
+
+    def __init__(self, start: datetime | None, end: datetime | None):
+        self.start = start
+        self.end = end
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        last_modified = entry['last_modified']
+        if last_modified is None:
+            return False
+        if isinstance(last_modified, str):
+            last_modified = _datetime(last_modified)
+        return (self.start is None or last_modified >= self.start) and (self.end is None or last_modified <= self.end)
+
+
+class Prefix(Filter):
+
+    def __init__(self, prefix: str):
+        self.value = prefix
+
+    def prefix(self) -> str | None:
+        return self.value
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return path.startswith(self.value)
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        return {(site, path) for site in sites for path in catalog.sites.get(site, ()) if path.startswith(self.value)}
+
+
+class And(Filter):
+
+    def __init__(self, children: List[Filter]):
+        # Cheapest checks first, so a listed object is rejected before its tags or stat are fetched.
+        self.children = sorted(children, key=lambda child: child.cost)
+        self.cost = max((child.cost for child in children), default=LISTING_COST)
+
+    def estimate(self, catalog) -> int | None:
+        estimates = [e for e in (child.estimate(catalog) for child in self.children) if e is not None]
+        return min(estimates, default=None)
+
+    def prefix(self) -> str | None:
+        return max((p for p in (child.prefix() for child in self.children) if p is not None), key=len, default=None)
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return all(child.matches(path, entry) for child in self.children)
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        if len(self.children) == 0:
+            return _universe(catalog, sites)
+
+        # Only the most selective child is looked up, the others are checked on its candidates.
+        planned = sorted(self.children, key=lambda child: _selectivity(child, catalog))
+        first = planned[0]
+        candidates = first.select(catalog, sites)
+        rest = planned[1:]
+        return {key for key in candidates if all(child.matches(key[1], catalog.entries[key]) for child in rest)}
+
+
+class Or(Filter):
+
+    def __init__(self, children: List[Filter]):
+        self.children = sorted(children, key=lambda child: child.cost)
+        self.cost = max((child.cost for child in children), default=LISTING_COST)
+
+    def estimate(self, catalog) -> int | None:
+        estimates = [child.estimate(catalog) for child in self.children]
+        if any(e is None for e in estimates):
+            return None
+        return sum(estimates)
+
+    def prefix(self) -> str | None:
+        prefixes = [child.prefix() for child in self.children]
+        if len(prefixes) == 0 or any(p is None for p in prefixes):
+            return None
+        # The longest prefix shared by every alternative.
+        common = prefixes[0]
+        for p in prefixes[1:]:
+            while not p.startswith(common):
+                common = common[:-1]
+        return common
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return any(child.matches(path, entry) for child in self.children)
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        if self.estimate(catalog) is None:
+            # One scan answers every alternative at once.
+            return super().select(catalog, sites)
+        found = set()
+        for child in self.children:
+            found |= child.select(catalog, sites)
+        return found
+
+
+class Not(Filter):
+
+    def __init__(self, child: Filter):
+        self.child = child
+        self.cost = child.cost
+
+    def matches(self, path: str, entry: Mapping[str, Any]) -> bool:
+        return not self.child.matches(path, entry)
+
+    def select(self, catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+        return _universe(catalog, sites) - self.child.select(catalog, sites)
+
+
+def parse(query: Any) -> Filter:
+    if not isinstance(query, dict) or len(query) != 1:
+        raise ValueError('every filter must be an object with exactly one operator')
+
+    operator, value = next(iter(query.items()))
+    if operator in ('and', 'or'):
+        if not isinstance(value, list):
+            raise ValueError(f'{operator} expects a list of filters')
+        children = [parse(child) for child in value]
+        return And(children) if operator == 'and' else Or(children)
+    if operator == 'not':
+        return Not(parse(value))
+    if operator == 'tags':
+        if not isinstance(value, dict) or not all(isinstance(v, str) for v in value.values()):
+            raise ValueError('tags expects an object of tag values')
+        return Tags(value)
+    if operator == 'extension':
+        return Extension(_string(operator, value).lstrip('.'))
+    if operator == 'content_type':
+        return ContentType(_string(operator, value))
+    if operator == 'prefix':
+        return Prefix(_string(operator, value))
+    if operator == 'size':
+        minimum, maximum = _range(operator, value, 'min', 'max')
+        if not all(v is None or (isinstance(v, int) and not isinstance(v, bool)) for v in (minimum, maximum)):
+            raise ValueError('size expects integer bounds')
+        return Size(minimum, maximum)
+    if operator == 'last_modified':
+        start, end = _range(operator, value, 'from', 'to')
+        return LastModified(None if start is None else _datetime(_string(operator, start)),
+                            None if end is None else _datetime(_string(operator, end)))
+
+    raise ValueError(f'unknown filter {operator}')
+
+
+def _string(operator: str, value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f'{operator} expects a string')
+    return value
+
+
+def _range(operator: str, value: Any, low: str, high: str) -> (Any, Any):
+    if not isinstance(value, dict) or not set(value) <= {low, high}:
+        raise ValueError(f'{operator} expects an object with {low} and/or {high}')
+    return value.get(low), value.get(high)
+
+
+def _datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _selectivity(child: Filter, catalog) -> (float, int):
+    estimate = child.estimate(catalog)
+    if estimate is not None:
+        return estimate, 0
+    # Without an index a prefix still beats a full scan, since only the paths under it are kept.
+    return math.inf, 0 if child.prefix() is not None else 1
+
+
+def _in_sites(keys: Set[Tuple[str, str]], sites: List[str]) -> Set[Tuple[str, str]]:
+    sites = set(sites)
+    return {key for key in keys if key[0] in sites}
+
+
+def _universe(catalog, sites: List[str]) -> Set[Tuple[str, str]]:
+    return {(site, path) for site in sites for path in catalog.sites.get(site, ())}
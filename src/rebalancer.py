@@ -0,0 +1,257 @@
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, List, Tuple
+
+from minio import Minio
+
+import metrics
+import settings
+from capacity import CapacityMonitor
+from catalog import Catalog
+from multipart import MultipartUploader
+from pools import WorkerPool
+
+
+class RateLimiter:
+    # Token bucket shared by all the moves, `rate` bytes per second, 0 disables the limit.
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.allowance = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount: int):
+        if self.rate <= 0:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.updated) * self.rate)
+            self.updated = now
+            self.allowance -= amount
+            delay = -self.allowance / self.rate if self.allowance < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _Throttled:
+
+    def __init__(self, data, limiter: RateLimiter, progress: Callable[[int], None]):
+        self.data = data
+        self.limiter = limiter
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.data.read(size if size is not None and size >= 0 else None)
+        self.limiter.take(len(chunk))
+        self.progress(len(chunk))
+        return chunk
+
+
+class Rebalancer:
+    # Moves objects from the instances that are fuller than the cluster as a whole to the emptier ones, until every
+    # instance is within REBALANCE_THRESHOLD of the cluster's used share. The capacity metrics come from the cache of
+    # the capacity monitor, they are only scraped again when they predate the last moves.
+
+    def __init__(self, clients: Dict[str, Minio], catalog: Catalog, capacity_monitor: CapacityMonitor,
+                 uploader: MultipartUploader, healthy: Callable[[], Dict[str, str]],
+                 track: Callable[..., ContextManager], moved: Callable[[str, str], None]):
+        self.clients = clients
+        self.catalog = catalog
+        self.capacity_monitor = capacity_monitor
+        self.uploader = uploader
+        self.healthy = healthy
+        self.track = track
+        self.moved = moved
+        self.limiter = RateLimiter(settings.REBALANCE_BANDWIDTH)
+        self.workers = WorkerPool('rebalance', settings.REBALANCE_CONCURRENCY)
+        self.progress: Dict[str, Any] = {'state': 'idle', 'rounds': 0, 'round': None, 'active': {}}
+        self.last_moved = 0.0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__run, name='rebalancer', daemon=True)
+
+    def start(self):
+        # The records of moved objects only survive a restart in the catalog's SQLite file, without it the objects
+        # would no longer be found under the sites they were reported on.
+        if self.catalog.db is None:
+            self.progress['state'] = 'disabled'
+            print('The rebalancer is disabled, it needs CATALOG_PATH to keep track of the objects it moves')
+            return
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+    def trigger(self):
+        self.wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'enabled': settings.REBALANCE_ENABLED,
+                'state': self.progress['state'],
+                'rounds': self.progress['rounds'],
+                'bandwidth': settings.REBALANCE_BANDWIDTH,
+                'round': None if self.progress['round'] is None else dict(self.progress['round']),
+                'active': [dict(move) for move in self.progress['active'].values()]
+            }
+
+    def plan(self) -> Tuple[List[Tuple[str, str, str, int]], Dict[str, Any]]:
+        # Metrics scraped before the last moves finished would have the same objects moved again.
+        healthy = [site for site in self.healthy() if site in self.clients]
+        capacity = {
+            site: site_metrics for site, site_metrics in self.capacity_monitor.metrics(healthy, self.last_moved).items()
+            if site_metrics.free_bytes is not None and site_metrics.total_bytes
+        }
+        if len(capacity) < 2:
+            return [], {}
+
+        used = {site: m.total_bytes - m.free_bytes for site, m in capacity.items()}
+        target = sum(used.values()) / sum(m.total_bytes for m in capacity.values())
+        # Bytes above the cluster's used share, a negative excess is room left below it.
+        excess = {site: used[site] - target * m.total_bytes for site, m in capacity.items()}
+        room = {site: -value for site, value in excess.items() if value < 0}
+        sources = sorted((site for site, value in excess.items()
+                          if value > settings.REBALANCE_THRESHOLD * capacity[site].total_bytes),
+                         key=excess.get, reverse=True)
+
+        moves = []
+        for source in sources:
+            budget = excess[source]
+            # The largest objects first, fewer moves for the same number of bytes.
+            for path, entry in sorted(self.catalog.objects(source), key=lambda e: e[1]['size'] or 0, reverse=True):
+                size = entry['size'] or 0
+                if size == 0 or size > budget:
+                    continue
+                holders = set(self.catalog.replicas(path))
+                target_site = max((site for site in room if site not in holders and room[site] >= size),
+                                  key=room.get, default=None)
+                if target_site is None:
+                    continue
+                moves.append((path, source, target_site, size))
+                budget -= size
+                room[target_site] -= size
+                if len(moves) >= settings.REBALANCE_MAX_MOVES:
+                    break
+            if len(moves) >= settings.REBALANCE_MAX_MOVES:
+                break
+
+        utilization = {site: round(used[site] / capacity[site].total_bytes, 4) for site in capacity}
+        return moves, {'target_utilization': round(target, 4), 'utilization': utilization}
+
+    def rebalance(self):
+        if self.catalog.db is None:
+            return
+        moves, distribution = self.plan()
+        with self.lock:
+            self.progress['state'] = 'running'
+            self.progress['round'] = {
+                'started_at': time.time(),
+                'finished_at': None,
+                **distribution,
+                'planned_objects': len(moves),
+                'planned_bytes': sum(move[3] for move in moves),
+                'moved_objects': 0,
+                'moved_bytes': 0,
+                'transferred_bytes': 0,
+                'skipped_objects': 0,
+                'failed_objects': 0
+            }
+
+        futures = [self.workers.submit(self.__move, *move) for move in moves]
+        for future in futures:
+            future.exception()
+        if len(moves) > 0:
+            self.last_moved = time.monotonic()
+
+        with self.lock:
+            self.progress['state'] = 'idle'
+            self.progress['rounds'] += 1
+            self.progress['round']['finished_at'] = time.time()
+
+    def __run(self):
+        while not self.stopped.is_set():
+            self.wake.wait(settings.REBALANCE_INTERVAL if settings.REBALANCE_ENABLED else None)
+            triggered = self.wake.is_set()
+            self.wake.clear()
+            if self.stopped.is_set():
+                break
+            if triggered or settings.REBALANCE_ENABLED:
+                try:
+                    self.rebalance()
+                except Exception as e:
+                    print(f'Could not rebalance: {e}')
+
+    def __move(self, path: str, source: str, target: str, size: int):
+        with self.lock:
+            self.progress['active'][path] = {'path': path, 'source': source, 'target': target, 'size': size,
+                                             'transferred': 0}
+        try:
+            outcome = self.__copy(path, source, target)
+        except Exception as e:
+            print(f'Could not move {path} from {source} to {target}: {e}')
+            outcome = 'failed'
+        finally:
+            with self.lock:
+                self.progress['active'].pop(path, None)
+
+        metrics.REBALANCE_MOVES.inc(outcome=outcome)
+        with self.lock:
+            self.progress['round'][f'{outcome}_objects'] += 1
+            if outcome == 'moved':
+                self.progress['round']['moved_bytes'] += size
+
+    def __copy(self, path: str, source: str, target: str) -> str:
+        # Server side copies only work inside one instance, so the object is streamed from the source to the target.
+        bucket, name = path.split('/', 1)
+        source_client = self.clients[source]
+        target_client = self.clients[target]
+
+        with self.track(source, 'rebalance', measure_latency=False):
+            stat = source_client.stat_object(bucket, name)
+            tags = source_client.get_object_tags(bucket, name)
+            response = source_client.get_object(bucket, name)
+        metadata = {k: v for k, v in stat.metadata.items() if k.lower().startswith('x-amz-meta-')}
+
+        try:
+            with self.track(target, 'rebalance', measure_latency=False):
+                if not target_client.bucket_exists(bucket):
+                    target_client.make_bucket(bucket)
+                self.uploader.upload(target_client, bucket, name,
+                                     _Throttled(response, self.limiter, lambda n: self.__transferred(path, source,
+                                                                                                    target, n)),
+                                     stat.size, stat.content_type, tags=tags, metadata=metadata)
+                copied = target_client.stat_object(bucket, name)
+        finally:
+            response.close()
+            response.release_conn()
+
+        with self.track(source, 'rebalance', measure_latency=False):
+            current = source_client.stat_object(bucket, name)
+            if copied.size != stat.size or current.etag != stat.etag:
+                # The object changed while it was copied, the source keeps the newer version.
+                target_client.remove_object(bucket, name)
+                return 'skipped'
+
+            self.catalog.put(target, path, stat.size, stat.content_type, dict(tags or {}),
+                             None if stat.last_modified is None else stat.last_modified.isoformat())
+            placement = self.catalog.placement(path)
+            if len(placement) > 0:
+                self.catalog.place(path, [target if site == source else site for site in placement])
+            self.catalog.move(source, path)
+            source_client.remove_object(bucket, name)
+            self.catalog.remove(source, path)
+
+        self.moved(source, path)
+        return 'moved'
+
+    def __transferred(self, path: str, source: str, target: str, amount: int):
+        metrics.REBALANCE_BYTES.inc(amount, source=source, target=target)
+        with self.lock:
+            self.progress['round']['transferred_bytes'] += amount
+            if path in self.progress['active']:
+                self.progress['active'][path]['transferred'] += amount
@@ -0,0 +1,133 @@
+import functools
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import BinaryIO, Callable, Dict, List, Tuple
+
+import tracing
+from pools import WorkerPool
+
+
+class SharedSource:
+    # Lets the replicas of an upload read the same stream at their own offsets. With `spool` the stream is copied
+    # first, so replicas still being written after the request returned do not depend on the request's file.
+
+    def __init__(self, data: BinaryIO, length: int, spool: bool):
+        self.length = length
+        self.lock = threading.Lock()
+        self.spooled = None
+        if spool:
+            self.spooled = tempfile.TemporaryFile()
+            shutil.copyfileobj(_Limited(data, length), self.spooled)
+            self.data = self.spooled
+            self.start = 0
+        else:
+            self.data = data
+            self.start = data.tell()
+
+    def reader(self) -> '_Reader':
+        return _Reader(self)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        with self.lock:
+            self.data.seek(self.start + offset)
+            return self.data.read(size)
+
+    def close(self):
+        if self.spooled is not None:
+            self.spooled.close()
+
+
+class _Reader:
+
+    def __init__(self, source: SharedSource):
+        self.source = source
+        self.offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.source.length - self.offset
+        size = remaining if size is None or size < 0 else min(size, remaining)
+        if size <= 0:
+            return b''
+        data = self.source.read_at(self.offset, size)
+        self.offset += len(data)
+        return data
+
+
+class _Limited:
+
+    def __init__(self, data: BinaryIO, length: int):
+        self.data = data
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.data.read(size) if size > 0 else b''
+        self.remaining -= len(data)
+        return data
+
+
+def replicate(pool: WorkerPool, sites: List[str], write: Callable[[str, BinaryIO], str], data: BinaryIO,
+              length: int, quorum: int, failed: Callable[[str, BaseException], None] | None = None) \
+        -> Tuple[List[str], Dict[str, BaseException]]:
+    with tracing.span('replicate', replicas=len(sites), quorum=quorum):
+        return _replicate(pool, sites, write, data, length, quorum, failed)
+
+
+def _replicate(pool: WorkerPool, sites: List[str], write: Callable[[str, BinaryIO], str], data: BinaryIO,
+               length: int, quorum: int, failed: Callable[[str, BaseException], None] | None) \
+        -> Tuple[List[str], Dict[str, BaseException]]:
+    # Writes the data to every site and returns once `quorum` of them succeeded, or once that can no longer
+    # happen. The remaining writes go on in the background, `write` records their success itself and `failed` is
+    # called with the site and the error of the ones that fail.
+    if len(sites) == 1:
+        try:
+            return [write(sites[0], data)], {}
+        except Exception as e:
+            return [], {sites[0]: e}
+
+    source = SharedSource(data, length, spool=quorum < len(sites))
+    futures: Dict[Future, str] = {pool.submit(write, site, source.reader()): site for site in sites}
+    remaining = [len(futures)]
+    remaining_lock = threading.Lock()
+
+    def finished(_: Future):
+        with remaining_lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                source.close()
+
+    for future in futures:
+        future.add_done_callback(finished)
+
+    acknowledged: List[str] = []
+    errors: Dict[str, BaseException] = {}
+    running = set(futures)
+    while len(acknowledged) < quorum and len(errors) <= len(sites) - quorum and len(running) > 0:
+        done, running = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                acknowledged.append(future.result())
+            else:
+                errors[futures[future]] = future.exception()
+
+    if source.spooled is None and len(running) > 0:
+        # The writes still read the caller's stream, which may be closed once this returns.
+        done, running = wait(running)
+        for future in done:
+            if future.exception() is None:
+                acknowledged.append(future.result())
+            else:
+                errors[futures[future]] = future.exception()
+
+    if failed is not None:
+        for future in running:
+            future.add_done_callback(functools.partial(_finished_in_background, futures[future], failed))
+
+    return acknowledged, errors
+
+
+def _finished_in_background(site: str, failed: Callable[[str, BaseException], None], future: Future):
+    if future.exception() is not None:
+        failed(site, future.exception())
@@ -0,0 +1,117 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
+
+import tracing
+from pools import WorkerPool
+
+OK = 'ok'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+
+@dataclass
+class Outcome:
+    status: str
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+    hedged: bool = False
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+            'hedged': self.hedged,
+            'error': self.error
+        }
+
+
+def gather(pool: WorkerPool, calls: Dict[Hashable, Callable[[], Any]], deadline: float,
+           timeout: float | None = None, hedge_after: float | None = None) -> Dict[Hashable, Outcome]:
+    with tracing.span('gather', calls=len(calls)):
+        return _gather(pool, calls, deadline, timeout, hedge_after)
+
+
+def _gather(pool: WorkerPool, calls: Dict[Hashable, Callable[[], Any]], deadline: float,
+            timeout: float | None, hedge_after: float | None) -> Dict[Hashable, Outcome]:
+    # Runs every call on the pool and returns by the deadline whatever has finished. `timeout` and `hedge_after`
+    # count from the moment a call starts running, time spent queued in the pool only counts against the deadline.
+    # A call still running after `hedge_after` seconds is started a second time and the first attempt to succeed
+    # wins; calls still running after `timeout` seconds, or at the deadline, are reported as timed out and left to
+    # finish in the background.
+    start = time.monotonic()
+    end = start + deadline
+    hedging = hedge_after is not None and hedge_after > 0
+    started: Dict[Hashable, float] = {}
+
+    def run(key: Hashable) -> Any:
+        started.setdefault(key, time.monotonic())
+        return calls[key]()
+
+    attempts: Dict[Future, Hashable] = {pool.submit(run, key): key for key in calls}
+    outcomes: Dict[Hashable, Outcome] = {}
+    hedged = set()
+
+    while len(outcomes) < len(calls):
+        now = time.monotonic()
+        if now >= end:
+            break
+
+        pending = [key for key in calls if key not in outcomes]
+        for key in pending:
+            if timeout is not None and key in started and now >= started[key] + timeout:
+                outcomes[key] = Outcome(TIMEOUT, error='timed out', elapsed=now - start, hedged=key in hedged)
+            elif hedging and key not in hedged and key in started and now >= started[key] + hedge_after:
+                attempts[pool.submit(run, key)] = key
+                hedged.add(key)
+        pending = [key for key in pending if key not in outcomes]
+        if len(pending) == 0:
+            break
+
+        # A call that has not started yet cannot time out or be hedged sooner than that long from now.
+        wake = end
+        for key in pending:
+            began = started.get(key, now)
+            if timeout is not None:
+                wake = min(wake, began + timeout)
+            if hedging and key not in hedged:
+                wake = min(wake, began + hedge_after)
+        running = [future for future, key in attempts.items() if key not in outcomes]
+        done, _ = wait(running, timeout=max(wake - now, 0), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            key = attempts.pop(future)
+            if key in outcomes:
+                continue
+            elapsed = time.monotonic() - start
+            error = future.exception()
+            if error is None:
+                outcomes[key] = Outcome(OK, future.result(), elapsed=elapsed, hedged=key in hedged)
+            elif key not in attempts.values():
+                # Only give up on a key once none of its attempts can still succeed.
+                outcomes[key] = Outcome(ERROR, error=str(error), elapsed=elapsed, hedged=key in hedged)
+
+    elapsed = time.monotonic() - start
+    for key in calls:
+        if key not in outcomes:
+            outcomes[key] = Outcome(TIMEOUT, error='timed out', elapsed=elapsed, hedged=key in hedged)
+    for future in attempts:
+        future.cancel()
+
+    return outcomes
+
+
+def by_site(outcomes: Dict[Hashable, Outcome], site_of: Callable[[Hashable], str]) -> Dict[str, Dict[str, Any]]:
+    # The worst outcome of a site's calls stands for the site.
+    rank = {OK: 0, ERROR: 1, TIMEOUT: 2}
+    sites: Dict[str, Outcome] = {}
+    for key, outcome in outcomes.items():
+        site = site_of(key)
+        if site not in sites or rank[outcome.status] > rank[sites[site].status] or (
+                outcome.status == sites[site].status and outcome.elapsed > sites[site].elapsed):
+            sites[site] = outcome
+
+    return {site: outcome.report() for site, outcome in sites.items()}
+
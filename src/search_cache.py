@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class SearchCache:
+
+    def __init__(self, ttl: float, max_entries: int, max_paths: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_paths = max_paths
+        self.results: OrderedDict[Hashable, Tuple[List[Dict[str, List[str]]], int, float]] = OrderedDict()
+        self.paths = 0
+        self.version = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable,
+            compute: Callable[[], List[Dict[str, List[str]]]]) -> List[Dict[str, List[str]]]:
+        now = time.monotonic()
+        with self.lock:
+            if version != self.version:
+                # The healthy set changed, none of the cached results can be served anymore.
+                self.__clear()
+                self.version = version
+            cached = self.results.get(key)
+            if cached is not None and now < cached[2]:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            if cached is not None:
+                self.__drop(key)
+            self.misses += 1
+            generation = self.generation
+
+        result = compute()
+        size = sum(len(paths) for entry in result for paths in entry.values())
+
+        with self.lock:
+            # Results computed before an invalidation may miss the write that caused it.
+            if generation != self.generation or version != self.version or size > self.max_paths:
+                return result
+            if key in self.results:
+                self.__drop(key)
+            self.results[key] = (result, size, now + self.ttl)
+            self.paths += size
+            while len(self.results) > self.max_entries or self.paths > self.max_paths:
+                self.__drop(next(iter(self.results)))
+                self.evictions += 1
+
+        return result
+
+    def invalidate(self):
+        with self.lock:
+            self.__clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.results),
+                'paths': self.paths,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups > 0 else 0.0,
+                'evictions': self.evictions
+            }
+
+    def __clear(self):
+        self.results.clear()
+        self.paths = 0
+        self.generation += 1
+
+    def __drop(self, key: Hashable):
+        _, size, _ = self.results.pop(key)
+        self.paths -= size
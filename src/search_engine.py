@@ -0,0 +1,133 @@
+import fnmatch
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from minio import Minio
+from minio.datatypes import Object
+from minio.error import S3Error
+
+
+class SearchEngine:
+
+    def __init__(self, clients: Dict[str, Minio]):
+        self.clients = clients
+
+    def walk(self, site: str, prefix: str | None = None, include_user_meta: bool = False,
+             bucket: str | None = None) -> Iterator[Object]:
+        client = self.clients[site]
+        buckets = [b.name for b in client.list_buckets()] if bucket is None else [bucket]
+        for bucket_name in buckets:
+            for obj in client.list_objects(bucket_name, prefix=prefix, recursive=True,
+                                           include_user_meta=include_user_meta):
+                if not obj.is_dir:
+                    yield obj
+
+    def iterate(self, site: str, start_after: Tuple[str, str] | None = None) -> Iterator[Tuple[str, str]]:
+        # Yields (bucket, key) pairs in (bucket, key) order, resuming strictly after `start_after`.
+        client = self.clients[site]
+        for bucket_name in sorted(b.name for b in client.list_buckets()):
+            if start_after is not None and bucket_name < start_after[0]:
+                continue
+            after = start_after[1] if start_after is not None and bucket_name == start_after[0] else None
+            for obj in client.list_objects(bucket_name, recursive=True, start_after=after):
+                if not obj.is_dir:
+                    yield bucket_name, obj.object_name
+
+    def query(self, site: str, query) -> Iterator[str]:
+        for obj in self.__walk_prefix(site, query.prefix() or ''):
+            path = f'{obj.bucket_name}/{obj.object_name}'
+            if query.matches(path, ListedObject(self, site, obj)):
+                yield path
+
+    def __walk_prefix(self, site: str, prefix: str) -> Iterator[Object]:
+        # A prefix reaching into a bucket is passed on to list_objects, a shorter one only narrows the buckets.
+        bucket, separator, key_prefix = prefix.partition('/')
+        if separator:
+            try:
+                yield from self.walk(site, prefix=key_prefix or None, include_user_meta=True, bucket=bucket)
+            except S3Error as e:
+                if e.code != 'NoSuchBucket':
+                    raise
+            return
+
+        for bucket_name in [b.name for b in self.clients[site].list_buckets() if b.name.startswith(bucket)]:
+            yield from self.walk(site, include_user_meta=True, bucket=bucket_name)
+
+    def find(self, site: str, predicate: Callable[[Object], bool], include_user_meta: bool = False) -> Iterator[str]:
+        for obj in self.walk(site, include_user_meta=include_user_meta):
+            if predicate(obj):
+                yield f'{obj.bucket_name}/{obj.object_name}'
+
+    def all(self, site: str) -> Iterator[str]:
+        return self.find(site, lambda obj: True)
+
+    def by_name(self, site: str, name: str) -> Iterator[str]:
+        return self.find(site, lambda obj: fnmatch.fnmatchcase(obj.object_name.split('/')[-1], name))
+
+    def by_extension(self, site: str, extension: str) -> Iterator[str]:
+        return self.by_name(site, f'*.{extension}')
+
+    def by_content_type(self, site: str, content_type: str) -> Iterator[str]:
+        return self.find(site, lambda obj: self.content_type(site, obj) == content_type, include_user_meta=True)
+
+    def by_tags(self, site: str, tags: Dict[str, str]) -> Iterator[str]:
+        client = self.clients[site]
+
+        def matches(obj: Object) -> bool:
+            object_tags = client.get_object_tags(obj.bucket_name, obj.object_name) or {}
+            return all(object_tags.get(k) == v for k, v in tags.items())
+
+        return self.find(site, matches)
+
+    def content_type(self, site: str, obj: Object) -> str | None:
+        for k, v in (obj.metadata or {}).items():
+            if k.lower() == 'content-type':
+                return v
+
+        return self.clients[site].stat_object(obj.bucket_name, obj.object_name).content_type
+
+    def describe(self, site: str, bucket: str | None = None) -> Iterator[Dict[str, Any]]:
+        client = self.clients[site]
+        for obj in self.walk(site, include_user_meta=True, bucket=bucket):
+            yield {
+                'path': f'{obj.bucket_name}/{obj.object_name}',
+                'size': obj.size,
+                'content_type': self.content_type(site, obj),
+                'last_modified': None if obj.last_modified is None else obj.last_modified.isoformat(),
+                'tags': dict(client.get_object_tags(obj.bucket_name, obj.object_name) or {})
+            }
+
+    def describe_object(self, site: str, bucket: str, name: str) -> Dict[str, Any]:
+        client = self.clients[site]
+        obj = client.stat_object(bucket, name)
+        return {
+            'path': f'{bucket}/{name}',
+            'size': obj.size,
+            'content_type': obj.content_type,
+            'last_modified': None if obj.last_modified is None else obj.last_modified.isoformat(),
+            'tags': dict(client.get_object_tags(bucket, name) or {})
+        }
+
+
+class ListedObject:
+
+    def __init__(self, search_engine: SearchEngine, site: str, obj: Object):
+        self.search_engine = search_engine
+        self.site = site
+        self.obj = obj
+        self.fetched: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'size':
+            return self.obj.size
+        if key == 'last_modified':
+            return self.obj.last_modified
+        # Content type and tags cost a request, they are only fetched when a filter needs them.
+        if key not in self.fetched:
+            if key == 'content_type':
+                self.fetched[key] = self.search_engine.content_type(self.site, self.obj)
+            elif key == 'tags':
+                client = self.search_engine.clients[self.site]
+                self.fetched[key] = dict(client.get_object_tags(self.obj.bucket_name, self.obj.object_name) or {})
+            else:
+                raise KeyError(key)
+        return self.fetched[key]
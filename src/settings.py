@@ -0,0 +1,72 @@
+import os
+
+CATALOG_PATH = os.environ.get('CATALOG_PATH', '')
+
+LISTENER_RETRY_INTERVAL = float(os.environ.get('LISTENER_RETRY_INTERVAL', '5'))
+LISTENER_BUCKET_POLL_INTERVAL = float(os.environ.get('LISTENER_BUCKET_POLL_INTERVAL', '60'))
+
+HEALTH_INTERVAL = float(os.environ.get('HEALTH_INTERVAL', '10'))
+HEALTH_TIMEOUT = float(os.environ.get('HEALTH_TIMEOUT', '2'))
+HEALTH_FAILURE_THRESHOLD = int(os.environ.get('HEALTH_FAILURE_THRESHOLD', '3'))
+HEALTH_SUCCESS_THRESHOLD = int(os.environ.get('HEALTH_SUCCESS_THRESHOLD', '2'))
+
+CAPACITY_INTERVAL = float(os.environ.get('CAPACITY_INTERVAL', '30'))
+CAPACITY_TTL = float(os.environ.get('CAPACITY_TTL', '120'))
+CAPACITY_TIMEOUT = float(os.environ.get('CAPACITY_TIMEOUT', '5'))
+
+PLACEMENT_STRATEGY = os.environ.get('PLACEMENT_STRATEGY', 'max_free_space')
+
+UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE', str(16 * 1024 * 1024)))
+UPLOAD_PARALLELISM = int(os.environ.get('UPLOAD_PARALLELISM', '4'))
+UPLOAD_PART_RETRIES = int(os.environ.get('UPLOAD_PART_RETRIES', '3'))
+UPLOAD_RETRY_BACKOFF = float(os.environ.get('UPLOAD_RETRY_BACKOFF', '0.5'))
+UPLOAD_POOL_SIZE = int(os.environ.get('UPLOAD_POOL_SIZE', '16'))
+
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))
+
+PRESIGN_EXPIRY = int(os.environ.get('PRESIGN_EXPIRY', '600'))
+PRESIGN_REFRESH_MARGIN = int(os.environ.get('PRESIGN_REFRESH_MARGIN', '60'))
+PRESIGN_CACHE_SIZE = int(os.environ.get('PRESIGN_CACHE_SIZE', '10000'))
+
+DETAILS_SITE_CONCURRENCY = int(os.environ.get('DETAILS_SITE_CONCURRENCY', '8'))
+
+REQUEST_EXECUTOR_WORKERS = int(os.environ.get('REQUEST_EXECUTOR_WORKERS', '32'))
+
+WORKER_POOL_SIZE = int(os.environ.get('WORKER_POOL_SIZE', '32'))
+MONITOR_POOL_SIZE = int(os.environ.get('MONITOR_POOL_SIZE', '16'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '32'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '10'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '300'))
+
+REPLICATION_FACTOR = int(os.environ.get('REPLICATION_FACTOR', '1'))
+WRITE_QUORUM = int(os.environ.get('WRITE_QUORUM', '1'))
+REPLICATION_POOL_SIZE = int(os.environ.get('REPLICATION_POOL_SIZE', '16'))
+
+REBALANCE_ENABLED = os.environ.get('REBALANCE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+REBALANCE_INTERVAL = float(os.environ.get('REBALANCE_INTERVAL', '600'))
+REBALANCE_THRESHOLD = float(os.environ.get('REBALANCE_THRESHOLD', '0.05'))
+REBALANCE_BANDWIDTH = float(os.environ.get('REBALANCE_BANDWIDTH', str(50 * 1024 * 1024)))
+REBALANCE_CONCURRENCY = int(os.environ.get('REBALANCE_CONCURRENCY', '2'))
+REBALANCE_MAX_MOVES = int(os.environ.get('REBALANCE_MAX_MOVES', '1000'))
+
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '1000'))
+
+SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', '30'))
+SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', '1000'))
+SEARCH_CACHE_MAX_PATHS = int(os.environ.get('SEARCH_CACHE_MAX_PATHS', '1000000'))
+
+SCATTER_DEADLINE = float(os.environ.get('SCATTER_DEADLINE', '10'))
+SCATTER_SITE_TIMEOUT = float(os.environ.get('SCATTER_SITE_TIMEOUT', '5'))
+SCATTER_HEDGE_AFTER = float(os.environ.get('SCATTER_HEDGE_AFTER', '0'))
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_OPEN_INTERVAL = float(os.environ.get('BREAKER_OPEN_INTERVAL', '30'))
+BREAKER_LATENCY_ALPHA = float(os.environ.get('BREAKER_LATENCY_ALPHA', '0.2'))
+BREAKER_OUTLIER_FACTOR = float(os.environ.get('BREAKER_OUTLIER_FACTOR', '3'))
+BREAKER_OUTLIER_MIN_LATENCY = float(os.environ.get('BREAKER_OUTLIER_MIN_LATENCY', '0.25'))
+BREAKER_OUTLIER_MIN_SAMPLES = int(os.environ.get('BREAKER_OUTLIER_MIN_SAMPLES', '20'))
+BREAKER_MAX_EJECTED = float(os.environ.get('BREAKER_MAX_EJECTED', '0.5'))
+
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', '')
+TRACE_FILE = os.environ.get('TRACE_FILE', './traces.jsonl')
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
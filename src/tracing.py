@@ -0,0 +1,128 @@
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import settings
+
+
+class Trace:
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List['Span'] = []
+        self.lock = threading.Lock()
+
+    def add(self, span: 'Span'):
+        with self.lock:
+            self.spans.append(span)
+
+
+class Span:
+
+    def __init__(self, trace: Trace, name: str, parent: 'Span | None', attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.status = 'ok'
+
+    def export(self) -> Dict[str, Any]:
+        # Field names follow the OTLP JSON encoding of a span.
+        return {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'startTimeUnixNano': self.start,
+            'endTimeUnixNano': self.end,
+            'attributes': self.attributes,
+            'status': self.status
+        }
+
+
+current: contextvars.ContextVar[Span | None] = contextvars.ContextVar('span', default=None)
+export_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.TRACE_EXPORTER in ('console', 'file') or settings.SERVER_TIMING
+
+
+@contextmanager
+def span(name: str, root: bool = False, **attributes) -> Iterator[Span | None]:
+    # Only requests start traces, work done outside of one (background checks, scrapes) is not traced.
+    parent = current.get()
+    if parent is None and not root:
+        yield None
+        return
+
+    trace = parent.trace if parent is not None else Trace()
+    new_span = Span(trace, name, parent, attributes)
+    token = current.set(new_span)
+    try:
+        yield new_span
+    except BaseException:
+        new_span.status = 'error'
+        raise
+    finally:
+        new_span.end = time.time_ns()
+        current.reset(token)
+        trace.add(new_span)
+        if parent is None:
+            export(trace)
+
+
+def record(name: str, start: int, end: int, **attributes):
+    parent = current.get()
+    if parent is None:
+        return
+
+    recorded = Span(parent.trace, name, parent, attributes)
+    recorded.start = start
+    recorded.end = end
+    parent.trace.add(recorded)
+
+
+def export(trace: Trace):
+    if settings.TRACE_EXPORTER not in ('console', 'file'):
+        return
+
+    with trace.lock:
+        lines = [json.dumps(s.export()) for s in trace.spans]
+    with export_lock:
+        if settings.TRACE_EXPORTER == 'console':
+            for line in lines:
+                print(line)
+        else:
+            with open(settings.TRACE_FILE, 'a') as out:
+                out.write('\n'.join(lines) + '\n')
+
+
+def server_timing(root: Span) -> str:
+    # Spans with the same name and site are summed, so a request touching many objects keeps a short header.
+    totals: Dict[tuple, List[float]] = {}
+    with root.trace.lock:
+        spans = [s for s in root.trace.spans if s is not root and s.end is not None]
+    for s in spans:
+        key = (s.name, s.attributes.get('site'))
+        total = totals.setdefault(key, [0.0, 0])
+        total[0] += (s.end - s.start) / 1e6
+        total[1] += 1
+
+    entries = []
+    for (name, site), (duration, count) in totals.items():
+        token = re.sub(r'[^A-Za-z0-9_.-]', '_', name if site is None else f'{name}.{site.split("//")[-1]}')
+        description = f'{count} calls' if count > 1 else None
+        entries.append(f'{token};dur={duration:.1f}' + (f';desc="{description}"' if description else ''))
+    end = root.end if root.end is not None else time.time_ns()
+    entries.append(f'total;dur={(end - root.start) / 1e6:.1f}')
+
+    return ', '.join(entries)
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+from typing import Callable, List
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import settings  # noqa: E402
+from fake_minio import FakeMinIO  # noqa: E402
+from run import write_config  # noqa: E402
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def fakes():
+    # Stand-in Minio instances, filled by the test before the balancer is created.
+    started: List[FakeMinIO] = []
+
+    def create(count: int, capacity: int = 1024 ** 4) -> List[FakeMinIO]:
+        for _ in range(count):
+            fake = FakeMinIO(capacity=capacity)
+            fake.start()
+            fake.make_bucket('dataspace')
+            started.append(fake)
+        return started
+
+    yield create
+    for fake in started:
+        fake.stop()
+
+
+@pytest.fixture
+def balancer(tmp_path, monkeypatch):
+    # A load balancer over the given stand-ins, returned once all of them are healthy and indexed.
+    created = []
+
+    def create(instances: List[FakeMinIO], objects: int, **overrides):
+        write_config(str(tmp_path), instances)
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(settings, 'HEALTH_SUCCESS_THRESHOLD', 1)
+        monkeypatch.setattr(settings, 'REBALANCE_ENABLED', False)
+        for name, value in overrides.items():
+            monkeypatch.setattr(settings, name, value)
+
+        from load_balancer import MinIO
+        minio = MinIO()
+        created.append(minio)
+        sites = [fake.url for fake in instances]
+        wait_for(lambda: len(minio.health_monitor.healthy) == len(sites))
+        wait_for(lambda: sum(len(paths) for entry in minio.catalog.all(sites) for paths in entry.values()) >= objects)
+        return minio
+
+    yield create
+    for minio in created:
+        minio.rebalancer.stop()
+        minio.health_monitor.stop()
+        minio.capacity_monitor.stop()
+        for listener in minio.listeners.values():
+            listener.stop()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # The FastAPI app serving the given load balancer.
+    def create(minio):
+        from fastapi.testclient import TestClient
+
+        import main
+        from async_load_balancer import AsyncMinIO
+        monkeypatch.setattr(main, 'minio_instance', AsyncMinIO(minio))
+        return TestClient(main.app)
+
+    return create
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import settings
+from async_load_balancer import AsyncMinIO
+
+
+def test_calls_run_off_the_event_loop_and_side_by_side(fakes, balancer):
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'd/one.csv', b'1', 'text/csv')
+    facade = AsyncMinIO(balancer([fake], 1))
+    fake.latency = 0.3
+
+    async def run():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        start = time.monotonic()
+        stats = await asyncio.gather(*(facade.stat_dataset(fake.url, 'dataspace/d/one.csv') for _ in range(4)))
+        elapsed = time.monotonic() - start
+        done.set()
+        await ticking
+        return stats, elapsed, ticks
+
+    stats, elapsed, ticks = asyncio.run(run())
+    fake.latency = 0
+    assert [stat.size for stat in stats] == [1, 1, 1, 1]
+    assert elapsed < 4 * 0.3
+    assert ticks >= 10
+    facade.executor.shutdown()
+
+
+def test_streams_are_read_on_the_executor_and_closed_when_left(fakes, balancer, monkeypatch):
+    monkeypatch.setattr(settings, 'DOWNLOAD_CHUNK_SIZE', 1024)
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'd/data.bin', b'x' * 4096)
+    facade = AsyncMinIO(balancer([fake], 1))
+
+    async def run():
+        chunks = []
+        stream = facade.download_dataset(fake.url, 'dataspace/d/data.bin')
+        async for chunk in stream:
+            chunks.append(chunk)
+            break
+        await stream.aclose()
+        # Closing the stream releases the connection of the response it left unread.
+        in_use = facade.pool_stats()['http'][fake.url]['in_use']
+        whole = [chunk async for chunk in facade.download_dataset(fake.url, 'dataspace/d/data.bin')]
+        return chunks, in_use, b''.join(whole)
+
+    first, in_use, whole = asyncio.run(run())
+    assert len(first) == 1 and len(first[0]) <= 4096
+    assert in_use == 0
+    assert whole == b'x' * 4096
+    assert facade.pool_stats()['requests']['active'] == 0
+    facade.executor.shutdown()
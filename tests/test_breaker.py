@@ -0,0 +1,61 @@
+import time
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def breaker(open_interval: float = 0.1) -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=2, open_interval=open_interval, latency_alpha=0.5, outlier_factor=3,
+                          outlier_min_latency=0.1, outlier_min_samples=5, max_ejected=0.5)
+
+
+def test_failures_open_the_breaker():
+    circuit = breaker()
+    circuit.record('a', False)
+    assert circuit.stats()['a']['state'] == CLOSED
+    circuit.record('a', False)
+    assert circuit.stats()['a']['state'] == OPEN
+    assert not circuit.allows('a', trial=True)
+
+
+def test_a_passing_health_check_only_makes_the_breaker_half_open():
+    circuit = breaker()
+    circuit.record('a', False)
+    circuit.record('a', False)
+    assert not circuit.probed('a', True)
+    assert circuit.stats()['a']['state'] == OPEN
+
+    time.sleep(0.15)
+    assert not circuit.probed('a', False)
+    assert circuit.probed('a', True)
+    assert circuit.stats()['a']['state'] == HALF_OPEN
+    assert not circuit.allows('a')
+
+    # Only a trial request closes it.
+    assert circuit.probed('a', True)
+    assert circuit.stats()['a']['state'] == HALF_OPEN
+    assert circuit.allows('a', trial=True)
+    circuit.record('a', True)
+    assert circuit.stats()['a']['state'] == CLOSED
+    assert not circuit.probed('a', True)
+
+
+def test_a_failed_trial_opens_the_breaker_again():
+    circuit = breaker()
+    circuit.record('a', False)
+    circuit.record('a', False)
+    time.sleep(0.15)
+    assert circuit.probed('a', True)
+    assert circuit.allows('a', trial=True)
+    circuit.record('a', False)
+    assert circuit.stats()['a']['state'] == OPEN
+
+
+def test_a_half_open_site_takes_one_trial_at_a_time():
+    circuit = breaker(open_interval=0.1)
+    circuit.record('a', False)
+    circuit.record('a', False)
+    time.sleep(0.15)
+    assert circuit.allows('a', trial=True)
+    assert not circuit.allows('a', trial=True)
+    circuit.record('a', True)
+    assert circuit.stats()['a']['state'] == CLOSED
@@ -0,0 +1,61 @@
+from catalog import Catalog
+
+A = 'http://a:9000'
+B = 'http://b:9000'
+
+
+def filled(path: str = '') -> Catalog:
+    catalog = Catalog(path)
+    catalog.put(A, 'dataspace/one.CSV', 10, 'text/csv', {'kind': 'table', 'owner': 'x'}, '2024-01-01T00:00:00')
+    catalog.put(A, 'dataspace/two.jsonld', 20, 'application/ld+json', {'kind': 'dataset'})
+    catalog.put(B, 'dataspace/three.csv', 30, 'text/csv', {'kind': 'table'})
+    return catalog
+
+
+def test_searches_are_answered_from_the_indexes():
+    catalog = filled()
+    assert catalog.search_tags({'kind': 'table'}, [A, B]) == [{A: ['dataspace/one.CSV']}, {B: ['dataspace/three.csv']}]
+    assert catalog.search_tags({'kind': 'table', 'owner': 'x'}, [A, B]) == [{A: ['dataspace/one.CSV']}]
+    assert catalog.search_tags({'kind': 'missing'}, [A, B]) == []
+    assert catalog.search_extension('csv', [A, B]) == [{A: ['dataspace/one.CSV']}, {B: ['dataspace/three.csv']}]
+    assert catalog.search_content_type('application/ld+json', [A, B]) == [{A: ['dataspace/two.jsonld']}]
+    # Only the given sites are answered, in their order.
+    assert catalog.search_content_type('text/csv', [B]) == [{B: ['dataspace/three.csv']}]
+
+
+def test_updated_and_removed_objects_leave_the_indexes():
+    catalog = filled()
+    catalog.put(A, 'dataspace/one.CSV', 11, 'text/plain', {'kind': 'note'})
+    assert catalog.search_tags({'kind': 'table'}, [A]) == []
+    assert catalog.search_content_type('text/plain', [A]) == [{A: ['dataspace/one.CSV']}]
+    assert catalog.get(A, 'dataspace/one.CSV')['size'] == 11
+
+    catalog.remove(A, 'dataspace/one.CSV')
+    assert catalog.get(A, 'dataspace/one.CSV') is None
+    assert catalog.search_extension('csv', [A, B]) == [{B: ['dataspace/three.csv']}]
+    assert 'kind=note' not in catalog.tag_index
+
+
+def test_replacing_a_site_only_touches_its_prefix():
+    catalog = filled()
+    catalog.replace_site(A, [{'path': 'dataspace/four.csv', 'size': 40, 'content_type': 'text/csv',
+                              'last_modified': None, 'tags': {}}], prefix='dataspace/t')
+    assert catalog.all([A]) == [{A: ['dataspace/four.csv', 'dataspace/one.CSV']}]
+
+    catalog.replace_site(A, [])
+    assert catalog.all([A, B]) == [{B: ['dataspace/three.csv']}]
+
+
+def test_the_catalog_file_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'catalog.db')
+    catalog = filled(path)
+    catalog.remove(B, 'dataspace/three.csv')
+    catalog.replace_site(A, [{'path': 'dataspace/five.jsonld', 'size': 50, 'content_type': 'application/ld+json',
+                              'last_modified': None, 'tags': {'kind': 'dataset'}}], prefix='dataspace/f')
+
+    restarted = Catalog(path)
+    assert restarted.all([A, B]) == [{A: ['dataspace/five.jsonld', 'dataspace/one.CSV', 'dataspace/two.jsonld']}]
+    assert restarted.get(A, 'dataspace/one.CSV') == {'size': 10, 'content_type': 'text/csv',
+                                                     'last_modified': '2024-01-01T00:00:00',
+                                                     'tags': {'kind': 'table', 'owner': 'x'}}
+    assert restarted.search_tags({'kind': 'dataset'}, [A]) == [{A: ['dataspace/five.jsonld', 'dataspace/two.jsonld']}]
@@ -0,0 +1,122 @@
+import json
+import time
+
+from breaker import CLOSED
+from scatter import OK, TIMEOUT
+
+
+def test_details_read_before_the_deadline_are_kept(fakes, balancer):
+    instances = fakes(2)
+    for fake in instances:
+        for i in range(300):
+            fake.put('dataspace', f'object-{i:03d}.csv', b'1', 'text/csv', {'k': str(i)})
+    minio = balancer(instances, 600, SCATTER_DEADLINE=0.5, SCATTER_SITE_TIMEOUT=0.1, DETAILS_SITE_CONCURRENCY=4,
+                     BREAKER_FAILURE_THRESHOLD=2)
+
+    # Every dataset costs two requests of 20 ms, a share of 75 datasets needs 3 seconds.
+    for fake in instances:
+        fake.latency = 0.02
+    datasets = [(fake.url, f'dataspace/object-{i:03d}.csv') for fake in instances for i in range(300)]
+    start = time.monotonic()
+    details, unread, sites = minio.get_datasets_details(datasets)
+    assert time.monotonic() - start < 1.5
+
+    read = [detail for detail in details if detail is not None]
+    assert 0 < len(read) < len(datasets)
+    # Every dataset is either read or reported as never read.
+    assert len(read) + len(unread) == len(datasets)
+    assert set(unread.values()) == {TIMEOUT}
+    assert all(details[index] is None for index in unread)
+    assert all(sites[fake.url]['status'] == TIMEOUT for fake in instances)
+    # A share cut off by the deadline is no failure of its instance.
+    assert all(minio.breaker.stats()[fake.url]['state'] == CLOSED for fake in instances)
+    for (_, name), detail in zip(datasets, details):
+        if detail is not None:
+            assert detail['tags'] == {'k': str(int(name[-7:-4]))}
+
+
+def test_details_of_every_dataset(fakes, balancer):
+    instances = fakes(2)
+    for fake in instances:
+        for i in range(20):
+            fake.put('dataspace', f'object-{i:03d}.csv', b'1', 'text/csv', {'k': str(i)})
+    minio = balancer(instances, 40)
+
+    datasets = [(fake.url, f'dataspace/object-{i:03d}.csv') for fake in instances for i in range(20)]
+    details, unread, sites = minio.get_datasets_details(datasets + [(instances[0].url, 'dataspace/missing.csv')])
+    assert all(detail is not None for detail in details[:-1])
+    assert details[-1] is None
+    assert unread == {}
+    assert all(sites[fake.url]['status'] == OK for fake in instances)
+
+
+def test_details_of_replicated_datasets_are_spread_over_the_replicas(fakes, balancer):
+    first, second = fakes(2)
+    for fake in (first, second):
+        for i in range(40):
+            fake.put('dataspace', f'object-{i:03d}.csv', b'1', 'text/csv', {'k': str(i)})
+    minio = balancer([first, second], 80)
+
+    # Every dataset is named by the first site, whose copy of one of them is gone.
+    first.buckets['dataspace'].delete('object-000.csv')
+    datasets = [(first.url, f'dataspace/object-{i:03d}.csv') for i in range(40)]
+    before = [first.requests, second.requests]
+    details, _, _ = minio.get_datasets_details(datasets)
+    assert all(detail is not None for detail in details)
+    assert details[0]['tags'] == {'k': '0'}
+    assert first.requests > before[0] and second.requests > before[1]
+
+
+def test_datasets_of_a_site_with_an_open_breaker_are_reported_unread(fakes, balancer):
+    first, second = fakes(2)
+    first.put('dataspace', 'one.csv', b'1', 'text/csv', {'k': '1'})
+    second.put('dataspace', 'two.csv', b'1', 'text/csv', {'k': '2'})
+    minio = balancer([first, second], 2, BREAKER_FAILURE_THRESHOLD=1)
+    minio.breaker.record(first.url, False)
+
+    datasets = [(first.url, 'dataspace/one.csv'), (second.url, 'dataspace/two.csv'),
+                (second.url, 'dataspace/missing.csv')]
+    details, unread, sites = minio.get_datasets_details(datasets)
+    assert details[0] is None and details[1]['tags'] == {'k': '2'} and details[2] is None
+    assert unread == {0: 'open'}
+    assert sites[first.url]['status'] == 'open'
+
+    streamed = list(minio.stream_datasets_details(datasets))
+    assert [(dataset, status) for dataset, _, status in streamed] == [(datasets[0], 'open'), (datasets[1], None),
+                                                                     (datasets[2], None)]
+
+
+def test_the_endpoint_marks_unread_datasets(fakes, balancer, client):
+    first, second = fakes(2)
+    first.put('dataspace', 'one.jsonld', b'{}', 'application/ld+json', {'k': '1'})
+    second.put('dataspace', 'two.jsonld', b'{}', 'application/ld+json', {'k': '2'})
+    minio = balancer([first, second], 2, BREAKER_FAILURE_THRESHOLD=1)
+    minio.breaker.record(first.url, False)
+    api = client(minio)
+
+    response = api.get('/get_all_objects_with_details')
+    assert response.status_code == 200
+    assert [dataset['name'] for dataset in response.json()] == ['two.jsonld']
+    assert response.headers['X-Unread-Count'] == '1'
+    assert response.headers['X-Partial'] == 'true'
+
+    response = api.get('/get_all_objects_with_details', params={'stream': 'true'})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {'name': 'one.jsonld', 'source': first.url, 'status': 'open'} in lines
+    assert any(line.get('tags') == {'k': '2'} for line in lines)
+
+
+def test_the_endpoint_pages_and_rejects_invalid_pages(fakes, balancer, client):
+    (fake,) = fakes(1)
+    for i in range(5):
+        fake.put('dataspace', f'object-{i}.jsonld', b'{}', 'application/ld+json', {'k': str(i)})
+    api = client(balancer([fake], 5))
+
+    response = api.get('/get_all_objects_with_details', params={'offset': 1, 'limit': 2})
+    assert response.status_code == 200
+    assert [dataset['name'] for dataset in response.json()] == ['object-1.jsonld', 'object-2.jsonld']
+    assert response.headers['X-Total-Count'] == '5'
+
+    assert api.get('/get_all_objects_with_details', params={'offset': -5}).status_code == 400
+    assert api.get('/get_all_objects_with_details', params={'limit': 0}).status_code == 400
+    assert api.get('/get_all_objects_with_details', params={'limit': -1, 'stream': 'true'}).status_code == 400
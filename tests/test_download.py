@@ -0,0 +1,50 @@
+import pytest
+
+from main import parse_range
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('items=0-10', None),
+    ('bytes=0-9', (0, 9)),
+    ('bytes=100-', (100, 999)),
+    ('bytes=990-5000', (990, 999)),
+    ('bytes=-10', (990, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=0-1, 5-6', None),
+    ('bytes=a-b', None)
+])
+def test_ranges_are_parsed_against_the_size(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header, size', [('bytes=1000-', 1000), ('bytes=9-5', 1000), ('bytes=-0', 1000),
+                                          ('bytes=-10', 0)])
+def test_unsatisfiable_ranges_are_refused(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+def test_datasets_are_downloaded_whole_in_ranges_or_not_at_all(fakes, balancer, client):
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'd/data.bin', DATA, 'application/octet-stream')
+    api = client(balancer([fake], 1))
+    url = '/datasets/minio1/dataspace/d/data.bin/download'
+
+    response = api.get(url)
+    assert response.status_code == 200 and response.content == DATA
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    etag = response.headers['ETag']
+
+    response = api.get(url, headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206 and response.content == DATA[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(DATA)}'
+
+    response = api.get(url, headers={'Range': f'bytes={len(DATA)}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+    assert api.get(url, headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+    assert api.get('/datasets/minio1/dataspace/d/missing.bin/download').status_code == 404
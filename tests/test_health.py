@@ -0,0 +1,89 @@
+import threading
+import time
+
+import settings
+from breaker import CLOSED, OPEN
+from conftest import wait_for
+from health import HealthMonitor
+from pools import HttpPools, WorkerPool
+
+
+def open_breaker(minio, site: str):
+    for _ in range(2):
+        minio.breaker.record(site, False)
+    assert minio.breaker.stats()[site]['state'] == OPEN
+
+
+def test_a_live_site_failing_its_s3_calls_stays_out(fakes, balancer):
+    (fake,) = fakes(1)
+    minio = balancer([fake], 0, HEALTH_INTERVAL=0.1, BREAKER_FAILURE_THRESHOLD=2, BREAKER_OPEN_INTERVAL=0.2)
+    fake.fault = lambda method, path, query: (501, 'InternalError')
+    open_breaker(minio, fake.url)
+
+    # The liveness check keeps passing, the trial listings keep failing.
+    time.sleep(1)
+    assert minio.breaker.stats()[fake.url]['state'] != CLOSED
+    assert not minio.breaker.allows(fake.url)
+
+
+def test_a_recovered_site_is_closed_by_a_trial_after_its_health_check(fakes, balancer):
+    (fake,) = fakes(1)
+    minio = balancer([fake], 0, HEALTH_INTERVAL=0.1, BREAKER_FAILURE_THRESHOLD=2, BREAKER_OPEN_INTERVAL=0.2)
+    open_breaker(minio, fake.url)
+
+    wait_for(lambda: minio.breaker.stats()[fake.url]['state'] == CLOSED, timeout=3)
+    assert minio.breaker.allows(fake.url)
+
+
+def test_catalog_searches_include_sites_with_an_open_breaker(fakes, balancer):
+    first, second = fakes(2)
+    for fake in (first, second):
+        fake.put('dataspace', 'object.csv', b'1', 'text/csv', {'k': 'v'})
+    minio = balancer([first, second], 2, BREAKER_FAILURE_THRESHOLD=2)
+    assert len(minio.search_by_tags({'k': 'v'})) == 2
+
+    open_breaker(minio, first.url)
+    assert minio.search_by_tags({'k': 'v'}) == [{first.url: ['dataspace/object.csv']},
+                                                {second.url: ['dataspace/object.csv']}]
+    assert len(minio.search_by_file_extension('csv')) == 2
+    assert len(minio.get_all_objects()) == 2
+    assert len(list(minio.stream_all_objects())) == 2
+
+
+def test_sites_change_state_only_after_enough_checks_in_a_row(fakes, monkeypatch):
+    monkeypatch.setattr(settings, 'HEALTH_INTERVAL', 0.05)
+    monkeypatch.setattr(settings, 'HEALTH_TIMEOUT', 0.2)
+    monkeypatch.setattr(settings, 'HEALTH_FAILURE_THRESHOLD', 3)
+    monkeypatch.setattr(settings, 'HEALTH_SUCCESS_THRESHOLD', 2)
+    fake, down = fakes(2)
+    down.stop()
+    probes = []
+    lock = threading.Lock()
+
+    def on_probe(site, alive):
+        if site == fake.url:
+            with lock:
+                probes.append((alive, site in monitor.healthy))
+
+    pool = WorkerPool('test', 4)
+    monitor = HealthMonitor(pool, HttpPools(2), on_probe)
+    # The first check decides right away.
+    monitor.add({fake.url: 'up', down.url: 'down'})
+    assert monitor.healthy == {fake.url: 'up'}
+
+    monitor.start()
+    try:
+        fake.latency = 0.5
+        wait_for(lambda: [alive for alive, _ in probes].count(False) >= 3)
+        fake.latency = 0
+        wait_for(lambda: len(probes) >= 6 and probes[-1][0] and probes[-2][0])
+    finally:
+        monitor.stop()
+        fake.latency = 0
+
+    with lock:
+        failed = probes.index((False, True))
+        assert probes[failed:failed + 3] == [(False, True), (False, True), (False, False)]
+        recovered = probes.index((True, False), failed)
+        assert probes[recovered:recovered + 2] == [(True, False), (True, True)]
+    pool.shutdown(wait=False)
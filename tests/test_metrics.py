@@ -0,0 +1,35 @@
+import metrics
+
+
+def request_seconds(endpoint):
+    counts, totals = metrics.REQUEST_DURATION.histograms.get(('GET', endpoint), ([0], [0.0]))
+    return sum(counts), totals[0]
+
+
+def test_totals_copied_at_scrape_time_are_rendered_as_counters(fakes, balancer, client):
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'one.jsonld', b'{}', 'application/ld+json', {'k': '1'})
+    api = client(balancer([fake], 1))
+
+    text = api.get('/metrics').text
+    for name in ('balancer_cache_hits_total', 'balancer_cache_misses_total', 'balancer_pool_completed_total',
+                 'balancer_http_pool_requests_total'):
+        assert f'# TYPE {name} counter' in text
+    assert 'balancer_pool_completed_total{pool="requests"}' in text
+    assert not hasattr(metrics.POOL_COMPLETED, 'inc') and not hasattr(metrics.REQUESTS, 'set')
+
+
+def test_streamed_requests_are_timed_until_their_body_was_sent(fakes, balancer, client):
+    first, second = fakes(2)
+    for i in range(3):
+        first.put('dataspace', f'object-{i}.jsonld', b'{}', 'application/ld+json', {'k': str(i)})
+    api = client(balancer([first, second], 3))
+    count, seconds = request_seconds('/get_all_objects_with_details')
+
+    first.latency = 0.2
+    response = api.get('/get_all_objects_with_details', params={'stream': 'true'})
+    assert len(response.text.splitlines()) == 3
+
+    streamed_count, streamed_seconds = request_seconds('/get_all_objects_with_details')
+    assert streamed_count == count + 1
+    assert streamed_seconds - seconds >= 0.2
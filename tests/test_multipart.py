@@ -0,0 +1,90 @@
+import io
+import os
+import threading
+
+import pytest
+from minio import Minio
+from minio.commonconfig import Tags
+
+import settings
+from multipart import MIN_PART_SIZE, MultipartUploader
+from pools import WorkerPool
+
+LENGTH = 2 * MIN_PART_SIZE + 1024
+
+
+@pytest.fixture
+def uploader(monkeypatch):
+    monkeypatch.setattr(settings, 'UPLOAD_RETRY_BACKOFF', 0.01)
+    pool = WorkerPool('test', 4)
+    yield MultipartUploader(MIN_PART_SIZE, 2, 2, pool)
+    pool.shutdown()
+
+
+def client(fake) -> Minio:
+    return Minio(fake.url.split('//')[1], access_key='test-key', secret_key='test-secret', secure=False)
+
+
+def part_faults(fake, part_number: int, times: int):
+    # Fails the first `times` uploads of a part, with a status urllib3 does not retry by itself.
+    failures = [times]
+    lock = threading.Lock()
+
+    def fault(method, path, query):
+        if method == 'PUT' and query.get('partNumber') == str(part_number):
+            with lock:
+                if failures[0] > 0:
+                    failures[0] -= 1
+                    return 501, 'InternalError'
+        return None
+
+    fake.fault = fault
+
+
+def test_a_large_object_is_uploaded_in_parts(fakes, uploader):
+    (fake,) = fakes(1)
+    data = os.urandom(LENGTH)
+    tags = Tags(for_object=True)
+    tags['k'] = 'v'
+
+    result = uploader.upload(client(fake), 'dataspace', 'large.bin', io.BytesIO(data), LENGTH, 'text/csv', tags=tags,
+                             metadata={'X-Amz-Meta-Access': 'public'})
+    assert result.object_name == 'large.bin'
+    stored = fake.buckets['dataspace'].objects['large.bin']
+    assert stored.data == data
+    assert stored.content_type == 'text/csv'
+    assert stored.tags == {'k': 'v'}
+    assert fake.uploads == {}
+
+
+def test_a_small_object_is_uploaded_at_once(fakes, uploader):
+    (fake,) = fakes(1)
+    uploader.upload(client(fake), 'dataspace', 'small.bin', io.BytesIO(b'small'), 5, None)
+    assert fake.buckets['dataspace'].objects['small.bin'].data == b'small'
+
+
+def test_a_failed_part_is_retried(fakes, uploader):
+    (fake,) = fakes(1)
+    part_faults(fake, 2, 2)
+    data = os.urandom(LENGTH)
+
+    uploader.upload(client(fake), 'dataspace', 'retried.bin', io.BytesIO(data), LENGTH, None)
+    assert fake.buckets['dataspace'].objects['retried.bin'].data == data
+
+
+def test_the_upload_is_aborted_when_a_part_keeps_failing(fakes, uploader):
+    (fake,) = fakes(1)
+    part_faults(fake, 2, 3)
+
+    with pytest.raises(Exception):
+        uploader.upload(client(fake), 'dataspace', 'aborted.bin', io.BytesIO(os.urandom(LENGTH)), LENGTH, None)
+    assert 'aborted.bin' not in fake.buckets['dataspace'].objects
+    assert fake.uploads == {}
+
+
+def test_the_upload_is_aborted_when_the_stream_is_short(fakes, uploader):
+    (fake,) = fakes(1)
+
+    with pytest.raises(IOError):
+        uploader.upload(client(fake), 'dataspace', 'short.bin', io.BytesIO(os.urandom(LENGTH - 10)), LENGTH, None)
+    assert fake.uploads == {}
@@ -0,0 +1,29 @@
+import time
+
+from conftest import wait_for
+
+
+def test_a_dropped_stream_is_resynced_and_reopened(fakes, balancer):
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'before.csv', b'1', 'text/csv', {'k': 'v'})
+    minio = balancer([fake], 1)
+    wait_for(lambda: fake.listens >= 1)
+
+    # Written without a notification, only a resync finds it.
+    fake.put('dataspace', 'missed.csv', b'1', 'text/csv', {'k': 'v'})
+    fake.drop_listeners()
+    wait_for(lambda: minio.catalog.get(fake.url, 'dataspace/missed.csv') is not None)
+    wait_for(lambda: fake.listens >= 2)
+
+
+def test_stopping_interrupts_the_open_streams(fakes, balancer):
+    (fake,) = fakes(1)
+    minio = balancer([fake], 0)
+    listener = minio.listeners[fake.url]
+    wait_for(lambda: fake.listens >= 1)
+
+    start = time.monotonic()
+    listener.stop()
+    wait_for(lambda: not any(thread.is_alive() for thread in listener.buckets.values()), timeout=2)
+    assert time.monotonic() - start < 1
+    assert fake.listens == 1
@@ -0,0 +1,58 @@
+from typing import Dict, List, Tuple
+
+import pytest
+
+from pagination import decode_token, paginate
+
+
+def lister(listings: Dict[str, List[Tuple[str, str]]]):
+    def iterate(site: str, start_after: Tuple[str, str] | None):
+        return iter([entry for entry in sorted(listings[site]) if start_after is None or entry > start_after])
+    return iterate
+
+
+def pages(sites: List[str], iterate, limit: int) -> List[Tuple[str, str]]:
+    listed = []
+    token = None
+    while True:
+        objects, token = paginate(sites, iterate, limit, token)
+        listed.extend((entry['site'], entry['path']) for entry in objects)
+        if token is None:
+            return listed
+
+
+def test_every_copy_of_a_duplicated_key_is_listed_once():
+    listings = {
+        'a': [('dataspace', 'one.csv'), ('dataspace', 'two.csv')],
+        'b': [('dataspace', 'one.csv'), ('dataspace', 'three.csv'), ('dataspace', 'two.csv')],
+        'c': [('dataspace', 'two.csv')]
+    }
+    expected = sorted((site, f'{bucket}/{key}') for site, entries in listings.items() for bucket, key in entries)
+
+    for limit in (1, 2, 3, 10):
+        listed = pages(list(listings), lister(listings), limit)
+        assert sorted(listed) == expected
+        assert len(listed) == len(set(listed))
+
+
+def test_the_token_holds_a_cursor_for_every_site():
+    listings = {'a': [('dataspace', 'one.csv')], 'b': [('dataspace', 'one.csv')]}
+    objects, token = paginate(['a', 'b'], lister(listings), 1)
+    assert objects == [{'site': 'a', 'path': 'dataspace/one.csv'}]
+    cursors, last = decode_token(token)
+    assert cursors == {'a': ('dataspace', 'one.csv'), 'b': None}
+    assert last == ('dataspace', 'one.csv')
+
+
+def test_a_site_that_joined_later_resumes_after_the_page():
+    listings = {'a': [('dataspace', 'one.csv'), ('dataspace', 'two.csv')],
+                'b': [('dataspace', 'one.csv'), ('dataspace', 'two.csv')]}
+    objects, token = paginate(['a'], lister(listings), 1)
+    objects, token = paginate(['a', 'b'], lister(listings), 10, token)
+    assert objects == [{'site': 'a', 'path': 'dataspace/two.csv'}, {'site': 'b', 'path': 'dataspace/two.csv'}]
+    assert token is None
+
+
+def test_invalid_tokens_are_rejected():
+    with pytest.raises(ValueError):
+        decode_token('not a token')
@@ -0,0 +1,73 @@
+import pytest
+
+import settings
+from capacity import CapacityMonitor
+from placement import ConsistentHashing, Inflight, create_strategy
+from pools import HttpPools, WorkerPool
+
+FREE = {'a': 100.0, 'b': 300.0, 'c': 200.0}
+
+
+def test_max_free_space_fills_the_emptiest_sites_first():
+    strategy = create_strategy('max_free_space', Inflight())
+    assert strategy.choose(FREE, 'x') == 'b'
+    assert strategy.choose_many(FREE, 'x', 2) == ['b', 'c']
+    assert strategy.choose_many(FREE, 'x', 5) == ['b', 'c', 'a']
+    assert strategy.choose({}, 'x') is None
+
+
+def test_load_aware_strategies_prefer_the_site_with_fewer_uploads():
+    inflight = Inflight()
+    least = create_strategy('least_inflight', inflight)
+    two_choices = create_strategy('power_of_two_choices', inflight)
+    with inflight.track('b'), inflight.track('c'):
+        assert least.choose(FREE, 'x') == 'a'
+        # With two sites both are drawn, and the one without uploads wins over more free space.
+        assert two_choices.choose({'a': 1.0, 'b': 300.0}, 'x') == 'a'
+    assert inflight.get('b') == 0
+    assert least.choose(FREE, 'x') == 'b'
+
+
+def test_weighted_random_never_picks_outside_the_given_sites():
+    strategy = create_strategy('weighted_random', Inflight())
+    chosen = strategy.choose_many(FREE, 'x', 3)
+    assert sorted(chosen) == ['a', 'b', 'c']
+    assert strategy.choose({'a': -5.0}, 'x') == 'a'
+
+
+def test_consistent_hashing_keeps_most_objects_where_they_were_when_a_site_is_added():
+    strategy = ConsistentHashing(Inflight())
+    names = [f'object-{i}' for i in range(500)]
+    before = {name: strategy.choose(FREE, name) for name in names}
+    assert before == {name: strategy.choose(FREE, name) for name in names}
+
+    after = {name: strategy.choose({**FREE, 'd': 0.0}, name) for name in names}
+    moved = [name for name in names if before[name] != after[name]]
+    assert all(after[name] == 'd' for name in moved)
+    assert len(moved) < len(names) / 2
+
+    replicas = strategy.choose_many(FREE, 'object-1', 2)
+    assert len(set(replicas)) == 2 and replicas[0] == before['object-1']
+
+
+def test_unknown_strategies_are_refused():
+    with pytest.raises(ValueError):
+        create_strategy('round_robin', Inflight())
+
+
+def test_capacity_is_scraped_again_only_when_stale(fakes, monkeypatch):
+    monkeypatch.setattr(settings, 'CAPACITY_TTL', 60)
+    (fake,) = fakes(1, capacity=1000)
+    fake.put('dataspace', 'one', b'x' * 100)
+    pool = WorkerPool('test', 2)
+    monitor = CapacityMonitor({fake.url: 'token'}, pool, HttpPools(2))
+
+    assert monitor.free([fake.url]) == {fake.url: 900}
+    requests = fake.requests
+    fake.put('dataspace', 'two', b'x' * 100)
+    assert monitor.free([fake.url]) == {fake.url: 900}
+    assert fake.requests == requests
+
+    monitor.metrics([fake.url], newer_than=float('inf'))
+    assert monitor.free([fake.url]) == {fake.url: 800}
+    pool.shutdown(wait=False)
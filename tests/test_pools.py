@@ -0,0 +1,33 @@
+import threading
+
+from conftest import wait_for
+from pools import HttpPools, WorkerPool
+
+
+def test_worker_pools_count_queued_active_and_completed_tasks():
+    pool = WorkerPool('test', 1)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    waiting = pool.submit(lambda: 'done')
+    cancelled = pool.submit(lambda: 'never')
+    assert cancelled.cancel()
+
+    wait_for(lambda: pool.stats()['active'] == 1)
+    assert pool.stats() == {'size': 1, 'queued': 1, 'active': 1, 'completed': 0}
+    release.set()
+    assert running.result(5) is True and waiting.result(5) == 'done'
+    assert pool.stats() == {'size': 1, 'queued': 0, 'active': 0, 'completed': 2}
+    pool.shutdown()
+
+
+def test_connections_to_a_site_are_kept_alive_and_shared(fakes):
+    (fake,) = fakes(1)
+    pools = HttpPools(4)
+    assert pools.session(fake.url) is pools.session(fake.url)
+    assert pools.manager(fake.url) is pools.manager(fake.url)
+
+    for _ in range(5):
+        assert pools.session(fake.url).get(f'{fake.url}/minio/health/live').status_code == 200
+        assert pools.manager(fake.url).request('GET', f'{fake.url}/minio/health/live').status == 200
+
+    assert pools.stats()[fake.url] == {'size': 4, 'connections': 2, 'in_use': 0, 'requests': 10}
@@ -0,0 +1,62 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from minio import Minio
+
+import presign
+from presign import PresignedUrlCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(presign, 'time', clock)
+    return clock
+
+
+def client() -> Minio:
+    # With the region given the links are signed without asking the instance.
+    return Minio('127.0.0.1:9', access_key='test-key', secret_key='test-secret', secure=False, region='us-east-1')
+
+
+def test_links_are_reused_until_the_refresh_margin(clock):
+    cache = PresignedUrlCache(600, 60, 10)
+    minio = client()
+    url = cache.get('a', minio, 'dataspace/d/one.csv')
+    assert urlsplit(url).path == '/dataspace/d/one.csv'
+    assert parse_qs(urlsplit(url).query)['X-Amz-Expires'] == ['600']
+
+    clock.now += 539
+    assert cache.get('a', minio, 'dataspace/d/one.csv') == url
+    assert cache.stats()['hits'] == 1
+
+    # Within the margin a link is signed again, so no one is handed a link about to expire.
+    clock.now += 1
+    cache.get('a', minio, 'dataspace/d/one.csv')
+    assert cache.stats()['misses'] == 2
+    clock.now += 539
+    cache.get('a', minio, 'dataspace/d/one.csv')
+    assert cache.stats()['hits'] == 2
+
+
+def test_discarded_and_least_recently_used_links_are_signed_again(clock):
+    cache = PresignedUrlCache(600, 60, 2)
+    minio = client()
+    cache.get('a', minio, 'dataspace/one')
+    cache.get('a', minio, 'dataspace/two')
+    cache.get('a', minio, 'dataspace/one')
+    cache.get('b', minio, 'dataspace/one')
+    assert set(cache.urls) == {('a', 'dataspace/one'), ('b', 'dataspace/one')}
+
+    cache.discard('a', 'dataspace/one')
+    cache.get('a', minio, 'dataspace/one')
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 4, 'hit_ratio': 0.2}
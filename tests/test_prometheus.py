@@ -0,0 +1,63 @@
+import math
+
+from prometheus import Sample, aggregate, parse
+
+
+def test_samples_are_parsed_with_escaped_labels_and_special_values():
+    samples = list(parse([
+        '# HELP minio_s3_requests_total Total requests',
+        '# TYPE minio_s3_requests_total counter',
+        '',
+        'minio_s3_requests_total{server="a:9000",api="put \\"object\\"\\nx"} 12',
+        'minio_cluster_drive_online_total 4 1700000000000',
+        'up{} +Inf',
+        'ratio{ job = "x" , } NaN',
+        'broken{server="a} 1',
+        'no_value',
+        'bad_value{server="a"} abc'
+    ]))
+    assert samples[0] == Sample('minio_s3_requests_total', {'server': 'a:9000', 'api': 'put "object"\nx'}, 12)
+    assert samples[1] == Sample('minio_cluster_drive_online_total', {}, 4)
+    assert samples[2] == Sample('up', {}, math.inf)
+    assert samples[3].name == 'ratio' and samples[3].labels == {'job': 'x'} and math.isnan(samples[3].value)
+    assert len(samples) == 4
+
+
+def test_cluster_capacity_is_preferred_and_reported_once_per_cluster():
+    metrics = aggregate(parse([
+        'minio_cluster_capacity_usable_free_bytes{server="a"} 400',
+        'minio_cluster_capacity_usable_free_bytes{server="b"} 400',
+        'minio_cluster_capacity_usable_total_bytes{server="a"} 1000',
+        'minio_cluster_capacity_raw_free_bytes{server="a"} 800',
+        'minio_node_disk_free_bytes{server="a"} 1',
+        'minio_s3_requests_total{server="a",api="get"} 3',
+        'minio_s3_requests_total{server="b",api="put"} 4',
+        'minio_cluster_drive_online_total{server="a"} 8',
+        'minio_cluster_drive_offline_total{server="a"} 1'
+    ]))
+    assert (metrics.free_bytes, metrics.total_bytes, metrics.used_bytes) == (400, 1000, 600)
+    assert metrics.requests_total == 7
+    assert (metrics.drives_online, metrics.drives_offline) == (8, 1)
+    assert metrics.servers == {'a', 'b'}
+
+
+def test_raw_and_node_capacity_are_fallbacks():
+    raw = aggregate(parse([
+        'minio_cluster_capacity_raw_free_bytes 300',
+        'minio_cluster_capacity_raw_total_bytes 900'
+    ]))
+    assert (raw.free_bytes, raw.total_bytes, raw.used_bytes) == (300, 900, 600)
+
+    nodes = aggregate(parse([
+        'minio_node_disk_free_bytes{server="a"} 100',
+        'minio_node_disk_free_bytes{server="b"} 50',
+        'minio_node_disk_total_bytes{server="a"} 200',
+        'minio_node_disk_total_bytes{server="b"} 200',
+        'minio_cluster_disk_online_total 2',
+        'minio_node_disk_free_bytes{server="c"} NaN'
+    ]))
+    assert (nodes.free_bytes, nodes.total_bytes, nodes.used_bytes) == (150, 400, 250)
+    assert nodes.drives_online == 2
+
+    used_only = aggregate(parse(['minio_node_disk_used_bytes{server="a"} 70']))
+    assert (used_only.free_bytes, used_only.total_bytes, used_only.used_bytes) == (None, None, 70)
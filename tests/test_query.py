@@ -0,0 +1,90 @@
+import pytest
+from minio import Minio
+
+from catalog import Catalog
+from query import And, ContentType, Not, Or, Prefix, Tags, parse
+from search_engine import SearchEngine
+
+A = 'http://a:9000'
+B = 'http://b:9000'
+
+
+def filled() -> Catalog:
+    catalog = Catalog()
+    catalog.put(A, 'dataspace/a/one.csv', 10, 'text/csv', {'kind': 'table'}, '2024-01-01T00:00:00+00:00')
+    catalog.put(A, 'dataspace/a/two.jsonld', 200, 'application/ld+json', {'kind': 'dataset'},
+                '2024-06-01T00:00:00Z')
+    catalog.put(A, 'dataspace/b/three.csv', 3000, 'text/csv', {'kind': 'table', 'rare': 'yes'})
+    catalog.put(B, 'other/four.csv', 40, 'text/plain', {'kind': 'table'}, '2023-01-01T00:00:00')
+    return catalog
+
+
+def selected(query, catalog=None, sites=(A, B)):
+    catalog = catalog or filled()
+    return sorted(path for _, path in parse(query).select(catalog, list(sites)))
+
+
+def test_filters_are_parsed_and_evaluated_against_the_catalog():
+    assert selected({'and': [{'extension': '.CSV'}, {'size': {'max': 100}}]}) == ['dataspace/a/one.csv',
+                                                                                  'other/four.csv']
+    assert selected({'or': [{'content_type': 'application/ld+json'}, {'tags': {'rare': 'yes'}}]}) == \
+        ['dataspace/a/two.jsonld', 'dataspace/b/three.csv']
+    assert selected({'not': {'tags': {'kind': 'table'}}}) == ['dataspace/a/two.jsonld']
+    assert selected({'last_modified': {'from': '2024-01-01T00:00:00Z'}}) == ['dataspace/a/one.csv',
+                                                                             'dataspace/a/two.jsonld']
+    assert selected({'prefix': 'dataspace/a/'}, sites=[A]) == ['dataspace/a/one.csv', 'dataspace/a/two.jsonld']
+    assert selected({'and': []}, sites=[B]) == ['other/four.csv']
+
+
+@pytest.mark.parametrize('query', [
+    [], {'and': {}}, {'tags': {'k': 1}}, {'size': {'min': '1'}}, {'size': {'from': 1}}, {'size': {'max': True}},
+    {'extension': 5}, {'unknown': 'x'}, {'tags': {}, 'prefix': 'x'}, {'last_modified': {'from': 'yesterday'}}
+])
+def test_invalid_filters_are_refused(query):
+    with pytest.raises(ValueError):
+        parse(query)
+
+
+def test_and_looks_up_only_its_most_selective_child():
+    catalog = filled()
+    looked_up = []
+
+    class Spy(Tags):
+        def select(self, catalog, sites):
+            looked_up.append(self.tags)
+            return super().select(catalog, sites)
+
+    query = And([Spy({'kind': 'table'}), Spy({'rare': 'yes'}), ContentType('text/csv')])
+    assert {path for _, path in query.select(catalog, [A, B])} == {'dataspace/b/three.csv'}
+    assert looked_up == [{'rare': 'yes'}]
+    # Cheap checks run first when matching listed objects.
+    assert [type(child) for child in query.children] == [ContentType, Spy, Spy]
+
+
+def test_prefixes_are_pushed_down_through_and_or_but_not_not():
+    assert And([Prefix('data'), Prefix('dataspace/a'), Tags({'k': 'v'})]).prefix() == 'dataspace/a'
+    assert Or([Prefix('dataspace/a/x'), Prefix('dataspace/b')]).prefix() == 'dataspace/'
+    assert Or([Prefix('dataspace/a'), Tags({'k': 'v'})]).prefix() is None
+    assert Not(Prefix('dataspace')).prefix() is None
+
+
+def test_live_queries_only_list_under_their_prefix(fakes):
+    (fake,) = fakes(1)
+    fake.make_bucket('other')
+    fake.put('dataspace', 'a/one.csv', b'1', 'text/csv', {'kind': 'table'})
+    fake.put('dataspace', 'b/two.csv', b'2', 'text/csv', {'kind': 'table'})
+    fake.put('other', 'a/three.csv', b'3', 'text/csv', {'kind': 'table'})
+    listed = []
+
+    def record_listings(method, path, query):
+        if 'list-type' in query:
+            listed.append((path, query.get('prefix')))
+        return None
+
+    fake.fault = record_listings
+    engine = SearchEngine({fake.url: Minio(fake.url.split('//')[1], access_key='test-key', secret_key='test-secret',
+                                           secure=False)})
+
+    query = parse({'and': [{'prefix': 'dataspace/a/'}, {'tags': {'kind': 'table'}}]})
+    assert list(engine.query(fake.url, query)) == ['dataspace/a/one.csv']
+    assert listed == [('/dataspace', 'a/')]
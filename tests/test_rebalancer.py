@@ -0,0 +1,44 @@
+import os
+
+from catalog import Catalog
+
+
+def test_moved_objects_stay_reachable_through_the_site_they_were_reported_on(fakes, balancer, tmp_path):
+    source, target = fakes(2, capacity=10 * 1024 * 1024)
+    contents = {f'{i:02d}.bin': os.urandom(512 * 1024) for i in range(12)}
+    for name, data in contents.items():
+        source.put('dataspace', f'd/{name}', data, 'application/octet-stream', {'k': 'v'})
+    catalog_path = str(tmp_path / 'catalog.db')
+    minio = balancer([source, target], 12, REBALANCE_BANDWIDTH=0, CATALOG_PATH=catalog_path)
+
+    minio.rebalancer.rebalance()
+    moved = sorted(target.buckets['dataspace'].keys)
+    assert len(moved) > 0
+    for key in moved:
+        path = f'dataspace/{key}'
+        assert minio.catalog.replicas(path) == [target.url]
+
+        link = minio.get_dataset(source.url, key.split('/')[-1])
+        assert link.startswith(target.url)
+        assert minio.stat_dataset(source.url, path).size == 512 * 1024
+        assert b''.join(minio.download_dataset(source.url, path)) == contents[key.split('/')[-1]]
+
+    assert minio.get_dataset(source.url, 'missing.bin') == "failed"
+    assert minio.stat_dataset(source.url, 'dataspace/d/missing.bin') is None
+
+    # The records of the moves survive a restart.
+    restarted = Catalog(catalog_path)
+    assert all(restarted.replicas(f'dataspace/{key}') == [target.url] for key in moved)
+
+
+def test_the_rebalancer_refuses_to_run_without_a_catalog_file(fakes, balancer, client):
+    source, target = fakes(2, capacity=10 * 1024 * 1024)
+    for i in range(4):
+        source.put('dataspace', f'd/{i}.bin', os.urandom(512 * 1024), 'application/octet-stream', {'k': 'v'})
+    minio = balancer([source, target], 4, REBALANCE_BANDWIDTH=0, CATALOG_PATH='')
+    api = client(minio)
+
+    assert api.post('/rebalance').status_code == 409
+    minio.rebalancer.rebalance()
+    assert len(target.buckets['dataspace'].keys) == 0
+    assert api.get('/rebalance_stats').json()['state'] == 'disabled'
@@ -0,0 +1,53 @@
+import io
+import threading
+
+from pools import WorkerPool
+from replication import replicate
+
+
+def test_background_failures_are_reported():
+    release = threading.Event()
+    reported = []
+    done = threading.Event()
+
+    def write(site, data):
+        body = data.read()
+        if site != 'a':
+            release.wait(2)
+            raise IOError(f'{site} is down')
+        assert body == b'payload'
+        return site
+
+    def failed(site, error):
+        reported.append((site, str(error)))
+        if len(reported) == 2:
+            done.set()
+
+    pool = WorkerPool('test', 3)
+    acknowledged, errors = replicate(pool, ['a', 'b', 'c'], write, io.BytesIO(b'payload'), 7, 1, failed)
+    assert acknowledged == ['a']
+    assert errors == {}
+    assert reported == []
+
+    release.set()
+    assert done.wait(2)
+    assert sorted(reported) == [('b', 'b is down'), ('c', 'c is down')]
+    pool.shutdown()
+
+
+def test_failures_before_returning_are_not_reported_again():
+    reported = []
+
+    def write(site, data):
+        data.read()
+        if site == 'b':
+            raise IOError('b is down')
+        return site
+
+    pool = WorkerPool('test', 2)
+    acknowledged, errors = replicate(pool, ['a', 'b'], write, io.BytesIO(b'payload'), 7, 2,
+                                     lambda site, error: reported.append(site))
+    pool.shutdown()
+    assert acknowledged == ['a']
+    assert list(errors) == ['b']
+    assert reported == []
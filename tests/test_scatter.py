@@ -0,0 +1,79 @@
+import threading
+import time
+
+from pools import WorkerPool
+from scatter import ERROR, OK, TIMEOUT, gather
+
+
+def sleeper(seconds: float, value=None):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+
+def test_queued_time_does_not_count_against_the_timeout():
+    pool = WorkerPool('test', 1)
+    outcomes = gather(pool, {'a': sleeper(0.3, 'a'), 'b': sleeper(0.3, 'b')}, deadline=5, timeout=0.5)
+    assert {key: outcome.status for key, outcome in outcomes.items()} == {'a': OK, 'b': OK}
+    assert outcomes['b'].value == 'b'
+    pool.shutdown()
+
+
+def test_timeout_starts_when_the_call_runs():
+    pool = WorkerPool('test', 1)
+    outcomes = gather(pool, {'a': sleeper(0.3), 'b': sleeper(2)}, deadline=5, timeout=0.5)
+    assert outcomes['a'].status == OK
+    assert outcomes['b'].status == TIMEOUT
+    assert 0.7 <= outcomes['b'].elapsed < 1.5
+    pool.shutdown(wait=False)
+
+
+def test_deadline_cuts_off_without_a_timeout():
+    pool = WorkerPool('test', 2)
+    start = time.monotonic()
+    outcomes = gather(pool, {'fast': sleeper(0.01, 1), 'slow': sleeper(1)}, deadline=0.2, timeout=5)
+    assert time.monotonic() - start < 0.5
+    assert outcomes['fast'].status == OK
+    assert outcomes['slow'].status == TIMEOUT
+    pool.shutdown(wait=False)
+
+
+def test_errors_are_reported():
+    def fail():
+        raise ValueError('broken')
+
+    pool = WorkerPool('test', 2)
+    outcomes = gather(pool, {'a': fail}, deadline=1)
+    assert outcomes['a'].status == ERROR
+    assert outcomes['a'].error == 'broken'
+    pool.shutdown()
+
+
+def test_hedge_wins_over_a_stuck_attempt():
+    release = threading.Event()
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(2)
+        return len(attempts)
+
+    pool = WorkerPool('test', 2)
+    outcomes = gather(pool, {'a': call}, deadline=1, hedge_after=0.1)
+    release.set()
+    assert outcomes['a'].status == OK
+    assert outcomes['a'].hedged
+    assert outcomes['a'].elapsed < 0.5
+    pool.shutdown()
+
+
+def test_hedging_does_not_busy_wait_after_a_fast_call():
+    pool = WorkerPool('test', 4)
+    cpu = time.process_time()
+    outcomes = gather(pool, {'fast': sleeper(0.01), 'slow': sleeper(0.6)}, deadline=2, hedge_after=0.05)
+    assert outcomes['slow'].status == OK
+    # Waiting out the slow call should cost next to no CPU time, a spinning loop burns most of the 0.6 seconds.
+    assert time.process_time() - cpu < 0.2
+    pool.shutdown()
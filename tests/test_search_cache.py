@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+import search_cache
+from search_cache import SearchCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache, 'time', clock)
+    return clock
+
+
+def counting(result):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return result
+    return compute, calls
+
+
+def test_results_are_served_until_they_expire_or_the_healthy_set_changes(clock):
+    cache = SearchCache(30, 10, 100)
+    compute, calls = counting([{'a': ['dataspace/one']}])
+    assert cache.get('key', 1, compute) == [{'a': ['dataspace/one']}]
+    assert cache.get('key', 1, compute) == [{'a': ['dataspace/one']}]
+    assert len(calls) == 1
+
+    clock.now += 31
+    cache.get('key', 1, compute)
+    cache.get('key', 2, compute)
+    assert len(calls) == 3
+    assert cache.stats()['hits'] == 1
+
+
+def test_a_write_during_a_search_keeps_its_result_out_of_the_cache(clock):
+    cache = SearchCache(30, 10, 100)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return [{'a': ['dataspace/old']}]
+
+    searching = threading.Thread(target=cache.get, args=('key', 1, slow))
+    searching.start()
+    started.wait(5)
+    cache.invalidate()
+    release.set()
+    searching.join(5)
+
+    compute, calls = counting([{'a': ['dataspace/old', 'dataspace/new']}])
+    assert cache.get('key', 1, compute) == [{'a': ['dataspace/old', 'dataspace/new']}]
+    assert len(calls) == 1
+
+
+def test_entries_and_paths_are_bounded(clock):
+    cache = SearchCache(30, 2, 5)
+    for key in ('one', 'two', 'three'):
+        cache.get(key, 1, lambda: [{'a': ['p']}])
+    assert list(cache.results) == ['two', 'three']
+
+    cache.get('large', 1, lambda: [{'a': ['p'] * 4}])
+    assert list(cache.results) == ['three', 'large'] and cache.stats()['paths'] == 5
+    # A result larger than the whole cache is answered without evicting anything.
+    cache.get('huge', 1, lambda: [{'a': ['p'] * 6}])
+    assert list(cache.results) == ['three', 'large']
+    assert cache.stats()['evictions'] == 2
@@ -0,0 +1,50 @@
+from typing import Tuple
+
+from minio import Minio
+
+from search_engine import SearchEngine
+
+
+def client(fake) -> Minio:
+    return Minio(fake.url.split('//')[1], access_key='test-key', secret_key='test-secret', secure=False)
+
+
+def filled(fakes) -> Tuple[SearchEngine, str]:
+    (fake,) = fakes(1)
+    fake.make_bucket('other')
+    fake.put('dataspace', 'a/one.csv', b'1', 'text/csv', {'kind': 'table', 'owner': 'x'})
+    fake.put('dataspace', 'a/two.jsonld', b'{}', 'application/ld+json', {'kind': 'dataset'})
+    fake.put('dataspace', 'b/three.CSV', b'3', 'text/csv', {'kind': 'table'})
+    fake.put('other', 'four.csv', b'4', 'text/plain', {'kind': 'table', 'owner': 'y'})
+    return SearchEngine({fake.url: client(fake)}), fake.url
+
+
+def test_every_object_of_every_bucket_is_walked(fakes):
+    engine, site = filled(fakes)
+    assert sorted(engine.all(site)) == ['dataspace/a/one.csv', 'dataspace/a/two.jsonld', 'dataspace/b/three.CSV',
+                                        'other/four.csv']
+
+
+def test_names_and_extensions_match_case_sensitively(fakes):
+    engine, site = filled(fakes)
+    assert sorted(engine.by_extension(site, 'csv')) == ['dataspace/a/one.csv', 'other/four.csv']
+    assert list(engine.by_name(site, 'three.*')) == ['dataspace/b/three.CSV']
+    assert list(engine.by_name(site, 'missing')) == []
+
+
+def test_content_types_and_tags_are_filtered_in_process(fakes):
+    engine, site = filled(fakes)
+    assert sorted(engine.by_content_type(site, 'text/csv')) == ['dataspace/a/one.csv', 'dataspace/b/three.CSV']
+    assert sorted(engine.by_tags(site, {'kind': 'table'})) == ['dataspace/a/one.csv', 'dataspace/b/three.CSV',
+                                                              'other/four.csv']
+    assert list(engine.by_tags(site, {'kind': 'table', 'owner': 'y'})) == ['other/four.csv']
+
+
+def test_objects_are_described_with_their_tags(fakes):
+    engine, site = filled(fakes)
+    described = {entry['path']: entry for entry in engine.describe(site, bucket='dataspace')}
+    assert sorted(described) == ['dataspace/a/one.csv', 'dataspace/a/two.jsonld', 'dataspace/b/three.CSV']
+    assert described['dataspace/a/two.jsonld']['content_type'] == 'application/ld+json'
+    assert described['dataspace/a/one.csv']['tags'] == {'kind': 'table', 'owner': 'x'}
+    assert described['dataspace/a/one.csv']['size'] == 1
+    assert engine.describe_object(site, 'other', 'four.csv')['content_type'] == 'text/plain'
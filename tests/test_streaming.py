@@ -0,0 +1,42 @@
+import json
+from typing import Dict, List
+
+
+def merged(lines: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    merged = {}
+    for line in lines:
+        for site, paths in line.items():
+            merged.setdefault(site, []).extend(paths)
+    return merged
+
+
+def test_streamed_listings_and_searches_match_the_plain_responses_in_batches(fakes, balancer, client):
+    first, second = fakes(2)
+    for i in range(7):
+        first.put('dataspace', f'd/first-{i}.csv', b'1', 'text/csv', {'k': 'v' if i % 2 else 'w'})
+    for i in range(3):
+        second.put('dataspace', f'd/second-{i}.jsonld', b'{}', 'application/ld+json', {'k': 'v'})
+    api = client(balancer([first, second], 10, STREAM_BATCH_SIZE=3))
+
+    requests = [
+        ('get', '/get_all_objects', None),
+        ('post', '/search_by_tags', {'tags': {'k': 'v'}}),
+        ('post', '/search_by_extension', {'extension': 'csv'}),
+        ('post', '/search_by_content_type', {'content_type': 'application/ld+json'})
+    ]
+    for method, url, body in requests:
+        plain = api.request(method, url, json=body).json()
+        response = api.request(method, url, json=body, params={'stream': 'true'})
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert all(len(line) == 1 and 0 < len(next(iter(line.values()))) <= 3 for line in lines)
+        # Site by site, a site's batches are not interleaved with another's.
+        sites = [next(iter(line)) for line in lines]
+        runs = [site for i, site in enumerate(sites) if i == 0 or sites[i - 1] != site]
+        assert len(runs) == len(set(runs))
+        assert {site: sorted(paths) for site, paths in merged(lines).items()} == \
+            {site: sorted(paths) for site, paths in merged(plain).items()}
+
+    listing = api.get('/get_all_objects', params={'stream': 'true'}).text.splitlines()
+    assert len(listing) == 4
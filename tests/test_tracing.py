@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import settings
+import tracing
+from pools import WorkerPool
+
+
+def test_spans_only_exist_inside_a_request_and_share_its_trace(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'TRACE_EXPORTER', 'file')
+    monkeypatch.setattr(settings, 'TRACE_FILE', str(tmp_path / 'traces.jsonl'))
+    with tracing.span('background') as background:
+        assert background is None
+
+    def listing():
+        with tracing.span('list'):
+            pass
+
+    pool = WorkerPool('test', 1)
+    with tracing.span('GET /x', root=True) as root:
+        with tracing.span('stat', site='http://a:9000') as child:
+            assert child.parent_id == root.span_id
+        # Work queued on a pool belongs to the request, with the time it waited for a thread.
+        pool.submit(listing).result(5)
+        with pytest.raises(RuntimeError):
+            with tracing.span('failing'):
+                raise RuntimeError()
+    pool.shutdown()
+
+    with open(settings.TRACE_FILE) as traces_in:
+        spans = {span['name']: span for span in map(json.loads, traces_in)}
+    assert {span['traceId'] for span in spans.values()} == {root.trace.trace_id}
+    assert set(spans) == {'GET /x', 'stat', 'queue', 'list', 'failing'}
+    assert spans['list']['parentSpanId'] == root.span_id
+    assert spans['GET /x']['parentSpanId'] == ''
+    assert spans['queue']['attributes'] == {'pool': 'test'}
+    assert spans['failing']['status'] == 'error' and spans['stat']['status'] == 'ok'
+
+
+def test_server_timing_sums_the_spans_of_a_request(fakes, balancer, client, monkeypatch):
+    (fake,) = fakes(1)
+    fake.put('dataspace', 'd/one.csv', b'1', 'text/csv')
+    api = client(balancer([fake], 1, SERVER_TIMING=True))
+
+    response = api.get('/datasets/minio1/dataspace/d/one.csv/download')
+    entries = [entry.strip() for entry in response.headers['Server-Timing'].split(',')]
+    assert entries[-1].startswith('total;dur=')
+    host = fake.url.split('//')[-1].replace(':', '_')
+    assert any(entry.startswith(f'stat.{host};dur=') for entry in entries)
+
+    monkeypatch.setattr(settings, 'SERVER_TIMING', False)
+    assert 'Server-Timing' not in api.get('/datasets/minio1/dataspace/d/one.csv/download').headers
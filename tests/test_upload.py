@@ -0,0 +1,24 @@
+import io
+
+
+def test_put_object_without_a_size_measures_the_file(fakes, balancer):
+    (fake,) = fakes(1)
+    minio = balancer([fake], 0)
+
+    path, site = minio.put_object((io.BytesIO(b'{"a": 1}'), 'sized.json'), None, {'k': 'v'})
+    assert path == 'dataspace/sized.json'
+    assert site == fake.url
+    stored = fake.buckets['dataspace'].objects['sized.json']
+    assert stored.data == b'{"a": 1}'
+    assert stored.tags == {'k': 'v'}
+    assert minio.catalog.get(fake.url, path)['size'] == 8
+
+
+def test_the_endpoint_uploads_a_file(fakes, balancer, client):
+    (fake,) = fakes(1)
+    api = client(balancer([fake], 0))
+
+    response = api.put('/put_object', files={'file': ('ignored.json', b'[1, 2]', 'application/json')},
+                       data={'file_name': 'named.json', 'tags': '{"k": "v"}'})
+    assert response.status_code == 201
+    assert fake.buckets['dataspace'].objects['named.json'].data == b'[1, 2]'